@@ -16,21 +16,44 @@ BEST PRACTICE: Todos os exemplos usam System Prompt para definir comportamento!
 # CONFIGURAÇÃO INICIAL (Base Técnica)
 # =============================================================================
 
-import os
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from llm.cache import print_cache_stats
+from llm.cassette import print_cassette_stats
+from llm.classify import BatchClassifier, LabelClassifier
+from llm.client import print_pool_stats, start_warm_up
+from llm.completion import acomplete, complete
+from llm.examples import ExampleStore
+from llm.hedging import print_hedge_stats
+from llm.metrics import format_usage, last_usage, print_metrics_summary
+from llm.pipeline import Pipeline, Stage
+from llm.router import choose_model, print_router_stats
+from llm.runner import Prefetcher
+from llm.semantic_cache import print_semantic_cache_stats
+from llm.singleflight import print_single_flight_stats
+from llm.startup import print_startup_report, startup
+from llm.streaming import TimedStream, print_stream
 
 load_dotenv()
 
-# Inicializa o cliente da OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# O cliente da OpenAI é criado sob demanda, na primeira chamada
+# (llm.client.get_client), para o menu abrir sem esperar o SDK
+
+# Modelo padrão. Com LLM_ROUTER=1, o roteador (llm/router.py) pode trocar por
+# chamada conforme a tarefa (ex.: um modelo menor para classificação) e a
+# latência recente
+MODEL = "gpt-4.1-mini"
 
 
 def run_prompt(
     prompt: str,
     system_prompt: str = None,
-    temperature: float = 0.2
-) -> str:
+    temperature: float = 0.2,
+    stream: bool = False,
+    examples: list = None,
+    task: str = None,
+    **params
+) -> str | TimedStream:
     """
     Função base para executar prompts.
 
@@ -39,9 +62,19 @@ def run_prompt(
         system_prompt: Instruções de sistema que definem o comportamento do modelo.
                       BEST PRACTICE: sempre usar para definir papel e restrições!
         temperature: Controla criatividade (0.2 = conservador, 0.9 = criativo)
+        stream: Se True, devolve a resposta em pedaços à medida que é gerada
+        examples: Pares (entrada, saída) de few-shot, enviados como turnos
+                  user/assistant logo após o system prompt
+        task: Dica de tarefa para o roteador de modelos ("classify", "edit",
+              "generate"...); sem dica, usa o modelo padrão (ou "classify"
+              se max_tokens for bem pequeno)
+        **params: Parâmetros extras da API (ex.: max_tokens, logit_bias,
+                  logprobs), repassados como estão; deadline=segundos
+                  limita a chamada inteira (DeadlineExceeded ao estourar)
 
     Returns:
-        Resposta do modelo como string
+        Resposta do modelo como string, ou um TimedStream com os pedaços
+        do texto se stream=True (use print_stream para exibir)
 
     Nota sobre System Prompt (Best Practice):
         - System prompt define QUEM o modelo é e COMO ele deve se comportar
@@ -54,15 +87,48 @@ def run_prompt(
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
 
-    # User prompt contém a tarefa/pergunta específica
+    # Exemplos (few-shot) logo após o system: junto com ele formam um
+    # prefixo fixo, que a API reaproveita do cache entre chamadas
+    for example_input, example_output in examples or ():
+        messages.append({"role": "user", "content": example_input})
+        messages.append({"role": "assistant", "content": example_output})
+
+    # User prompt contém a tarefa/pergunta específica (a parte que varia
+    # fica por último)
     messages.append({"role": "user", "content": prompt})
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=messages,
-        temperature=temperature
-    )
-    return response.choices[0].message.content
+    # Cache, limite de taxa, streaming e métricas: llm/completion.py
+    # O roteador escolhe o modelo pela tarefa e pela latência recente
+    model = choose_model(task, MODEL, params)
+    return complete(messages, model=model, temperature=temperature, stream=stream,
+                    task=task, **params)
+
+
+async def arun_prompt(
+    prompt: str,
+    system_prompt: str = None,
+    temperature: float = 0.2,
+    examples: list = None,
+    task: str = None,
+    **params
+) -> str:
+    """
+    Versão assíncrona de run_prompt (mesmos argumentos e mesmo retorno).
+
+    Permite disparar várias chamadas ao mesmo tempo. Para muitos prompts,
+    use llm.concurrency.gather_prompts, que limita a concorrência e
+    mantém a ordem dos resultados.
+    """
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    for example_input, example_output in examples or ():
+        messages.append({"role": "user", "content": example_input})
+        messages.append({"role": "assistant", "content": example_output})
+    messages.append({"role": "user", "content": prompt})
+
+    model = choose_model(task, MODEL, params)
+    return await acomplete(messages, model=model, temperature=temperature, task=task, **params)
 
 
 # =============================================================================
@@ -115,7 +181,7 @@ e reajustes automáticos anuais vinculados a índices econômicos."""
     print(f"[User Prompt]:\n{user_prompt}")
     print("-" * 40)
     print("Resposta:")
-    print(run_prompt(user_prompt, system_prompt=system_prompt))
+    print_stream(run_prompt(user_prompt, system_prompt=system_prompt, stream=True))
 
     print("\n" + "-" * 40)
     print("Best Practice:")
@@ -133,8 +199,8 @@ def desafio_02_few_shot_classificacao():
     """
     DESAFIO 2: Few-Shot Prompting
 
-    Técnica: System prompt define o classificador, User prompt dá exemplos.
-    O modelo infere o padrão a partir dos exemplos.
+    Técnica: System prompt define o classificador, exemplos vão como turnos
+    user/assistant. O modelo infere o padrão a partir dos exemplos.
     """
     print("\n" + "=" * 60)
     print("DESAFIO 2: FEW-SHOT PROMPTING")
@@ -148,35 +214,69 @@ def desafio_02_few_shot_classificacao():
 Regras:
 - Classifique como: Positivo, Negativo ou Neutro
 - Responda APENAS com a classificação, sem explicações
-- Seja consistente com os exemplos fornecidos pelo usuário
+- Seja consistente com os exemplos fornecidos
 - Em caso de ambiguidade, considere o tom geral"""
 
-    # User prompt contém os exemplos (few-shot) e a tarefa
-    user_prompt = """Exemplos de classificação:
-
-Texto: "Amei a nova meditação!"
-Sentimento: Positivo
-
-Texto: "O app travou no meio."
-Sentimento: Negativo
-
-Texto: "Poderia ter mais opções."
-Sentimento: Neutro
-
----
-Agora classifique:
-Texto: "Não sei se gostei da voz."
-Sentimento:"""
+    # Banco de exemplos rotulados: cada texto recebe só os 3 mais parecidos
+    # (few-shot dinâmico), como turnos user/assistant. Mais exemplos no
+    # banco não deixam o prompt maior
+    banco = ExampleStore([
+        ("Amei a nova meditação!", "Positivo"),
+        ("O app travou no meio.", "Negativo"),
+        ("Poderia ter mais opções.", "Neutro"),
+        ("Durmo muito melhor desde que comecei.", "Positivo"),
+        ("A voz da narradora é muito calma, adorei.", "Positivo"),
+        ("Não consigo cancelar a assinatura.", "Negativo"),
+        ("Os áudios não baixam para ouvir offline.", "Negativo"),
+        ("Cobram caro para o que oferecem.", "Negativo"),
+        ("Uso de vez em quando.", "Neutro"),
+        ("Mudaram o layout do app.", "Neutro"),
+    ])
+    exemplos_rotulados = banco.examples[:3]  # prefixo fixo do lote
+    modelo_entrada = 'Texto: "{text}"\nSentimento:'
+
+    # A parte variável (o texto a classificar) vai sempre por último
+    textos = [
+        "Não sei se gostei da voz.",
+        "As meditações guiadas me ajudam a dormir melhor.",
+        "Fui cobrado duas vezes na assinatura.",
+    ]
 
     print(f"\n[System Prompt]:\n{system_prompt}\n")
-    print(f"[User Prompt com Few-Shot]:\n{user_prompt}")
+    print(f"[Banco de exemplos few-shot: {len(banco)}, os 3 mais parecidos vão em cada chamada]:")
+    for entrada, saida in banco.examples:
+        print(f'"{entrada}" -> {saida}')
     print("-" * 40)
-    print("Resposta:")
-    print(run_prompt(user_prompt, system_prompt=system_prompt))
+    classificador = LabelClassifier(
+        ["Positivo", "Negativo", "Neutro"], call=run_prompt,
+        system_prompt=system_prompt, model=MODEL,
+    )
+    # Sem logit_bias (tiktoken indisponível), o token mais provável pode não ser um rótulo
+    garantia = "rótulo garantido" if classificador.logit_bias else "rótulo provável"
+    print(f"Respostas (1 token + logprobs: {garantia} e confiança):")
+    # Os exemplos de todos os textos saem de uma única busca no banco
+    exemplos_por_texto = banco.few_shot(textos, k=3, template=modelo_entrada)
+    for texto, exemplos in zip(textos, exemplos_por_texto):
+        resultado = classificador.classify(modelo_entrada.format(text=texto), examples=exemplos)
+        distribuicao = ", ".join(f"{rotulo} {p:.0%}" for rotulo, p in resultado.probabilities.items())
+        print(f'"{texto}" -> {resultado}')
+        print(f"   [{distribuicao}] [{format_usage(last_usage())}]")
+        print(f"   [exemplos: {', '.join(rotulo for _, rotulo in exemplos)}]")
+
+    # Em volume: vários textos numerados em uma só requisição
+    # (system prompt e exemplos vão uma vez por lote, não uma vez por texto)
+    em_lote = BatchClassifier(
+        ["Positivo", "Negativo", "Neutro"], call=run_prompt, system_prompt=system_prompt,
+        examples=exemplos_rotulados,
+    )
+    rotulos = em_lote.classify_many(textos)
+    print(f"\nEm lote: {len(textos)} textos, {em_lote.requests} requisição(ões)")
+    for texto, rotulo in zip(textos, rotulos):
+        print(f'"{texto}" -> {rotulo or "?"}')
 
     print("\n" + "-" * 40)
     print("Best Practice:")
-    print("'System define o classificador, User fornece exemplos e tarefa.'")
+    print("'System define o classificador, exemplos relevantes no início, texto variável no fim.'")
 
 
 # =============================================================================
@@ -261,7 +361,7 @@ e uma estratégia de SEO."""
     print(f"[User Prompt]:\n{user_prompt}")
     print("-" * 40)
     print("Resposta:")
-    print(run_prompt(user_prompt, system_prompt=system_prompt))
+    print_stream(run_prompt(user_prompt, system_prompt=system_prompt, stream=True))
 
     print("\n" + "-" * 40)
     print("Problema identificado:")
@@ -273,6 +373,9 @@ def desafio_04_pipeline_correto():
     DESAFIO 4B: Pipeline Correto (3 Etapas)
 
     Best Practice: Cada etapa tem seu próprio System prompt especializado.
+
+    O pipeline é declarado como um grafo: PASSO 2 e PASSO 3 dependem apenas
+    do PASSO 1, então rodam em paralelo assim que a análise fica pronta.
     """
     print("\n" + "=" * 60)
     print("DESAFIO 4B: PIPELINE CORRETO (3 ETAPAS)")
@@ -281,10 +384,6 @@ def desafio_04_pipeline_correto():
     print("-" * 60)
 
     # ----- PASSO 1: Pesquisa de Mercado -----
-    print("\n" + "-" * 40)
-    print("PASSO 1: Pesquisa de Mercado")
-    print("-" * 40)
-
     # System prompt especializado para análise de mercado
     system_prompt_analista = """Você é um analista de mercado especializado em SaaS B2B.
 
@@ -300,16 +399,7 @@ Formato de resposta:
 
     user_passo_1 = "Analise o mercado de CRMs e identifique os principais diferenciais competitivos para um novo SaaS."
 
-    print(f"[System]: Analista de mercado SaaS B2B")
-    print(f"[User]: {user_passo_1}")
-    analise_mercado = run_prompt(user_passo_1, system_prompt=system_prompt_analista)
-    print(f"\nResultado:\n{analise_mercado}")
-
     # ----- PASSO 2: Conteúdo (LinkedIn) -----
-    print("\n" + "-" * 40)
-    print("PASSO 2: Conteúdo para LinkedIn")
-    print("-" * 40)
-
     # System prompt especializado para social media
     system_prompt_social = """Você é um especialista em conteúdo para LinkedIn B2B.
 
@@ -324,20 +414,12 @@ Formato:
 - Cada post com 3-4 parágrafos curtos
 - Inclua CTA sutil no final"""
 
-    user_passo_2 = f"""Com base nos diferenciais abaixo, crie 5 posts para LinkedIn:
+    user_passo_2 = """Com base nos diferenciais abaixo, crie 5 posts para LinkedIn:
 
 Diferenciais:
 {analise_mercado}"""
 
-    print(f"[System]: Especialista em LinkedIn B2B")
-    posts_linkedin = run_prompt(user_passo_2, system_prompt=system_prompt_social)
-    print(f"\nResultado:\n{posts_linkedin}")
-
     # ----- PASSO 3: SEO -----
-    print("\n" + "-" * 40)
-    print("PASSO 3: Estratégia de SEO")
-    print("-" * 40)
-
     # System prompt especializado para SEO
     system_prompt_seo = """Você é um especialista em SEO para empresas de tecnologia.
 
@@ -351,16 +433,48 @@ Formato de resposta:
 - Lista de palavras-chave de cauda longa (5-7)
 - 3 temas de conteúdo prioritários"""
 
-    user_passo_3 = f"""Com base nos diferenciais do CRM abaixo, sugira uma estratégia de SEO:
+    user_passo_3 = """Com base nos diferenciais do CRM abaixo, sugira uma estratégia de SEO:
 
 Diferenciais:
 {analise_mercado}"""
 
+    # Grafo do pipeline: LinkedIn e SEO dependem só da análise de mercado.
+    # memoize=True: mesmo com a temperature padrão (0.2), ao ajustar um prompt
+    # as outras etapas são reaproveitadas (LLM_PIPELINE_MEMO)
+    pipeline = Pipeline([
+        Stage("analise_mercado", system_prompt_analista, user_passo_1, memoize=True),
+        # 5 posts longos: com o roteador, um modelo maior para geração
+        Stage("posts_linkedin", system_prompt_social, user_passo_2,
+              depends_on=("analise_mercado",), task="generate", memoize=True),
+        Stage("seo_strategy", system_prompt_seo, user_passo_3,
+              depends_on=("analise_mercado",), memoize=True),
+    ], call=arun_prompt, model=MODEL)
+
+    resultado = pipeline.run()
+
+    print("\n" + "-" * 40)
+    print("PASSO 1: Pesquisa de Mercado")
+    print("-" * 40)
+    print(f"[System]: Analista de mercado SaaS B2B")
+    print(f"[User]: {user_passo_1}")
+    print(f"\nResultado:\n{resultado.outputs['analise_mercado']}")
+
+    print("\n" + "-" * 40)
+    print("PASSO 2: Conteúdo para LinkedIn (em paralelo com o PASSO 3)")
+    print("-" * 40)
+    print(f"[System]: Especialista em LinkedIn B2B")
+    print(f"\nResultado:\n{resultado.outputs['posts_linkedin']}")
+
+    print("\n" + "-" * 40)
+    print("PASSO 3: Estratégia de SEO (em paralelo com o PASSO 2)")
+    print("-" * 40)
     print(f"[System]: Especialista em SEO para SaaS")
-    seo_strategy = run_prompt(user_passo_3, system_prompt=system_prompt_seo)
-    print(f"\nResultado:\n{seo_strategy}")
+    print(f"\nResultado:\n{resultado.outputs['seo_strategy']}")
 
     print("\n" + "-" * 40)
+    print(resultado.timing_report())
+    if resultado.memo_report():
+        print(resultado.memo_report())
     print("Best Practice:")
     print("'Cada etapa = System prompt especializado = resultado de qualidade'")
 
@@ -369,18 +483,24 @@ Diferenciais:
 # MENU PRINCIPAL - EXECUÇÃO DOS DESAFIOS
 # =============================================================================
 
+# Desafios do menu (também usados pela linha de comando: python -m llm.runner)
+DESAFIOS = {
+    "1": ("Arquiteto de Personas (System + User)", desafio_01_arquiteto_personas),
+    "2": ("Few-Shot Prompting (System + Exemplos)", desafio_02_few_shot_classificacao),
+    "3": ("Laboratório de Temperature", desafio_03_laboratorio_temperature),
+    "4a": ("Prompt Frankenstein (Anti-padrão)", desafio_04_prompt_frankenstein),
+    "4b": ("Pipeline Correto (System por etapa)", desafio_04_pipeline_correto),
+}
+
+
 def menu_desafios():
     """
     Menu interativo para executar os desafios individualmente.
     """
-    desafios = {
-        "1": ("Arquiteto de Personas (System + User)", desafio_01_arquiteto_personas),
-        "2": ("Few-Shot Prompting (System + Exemplos)", desafio_02_few_shot_classificacao),
-        "3": ("Laboratório de Temperature", desafio_03_laboratorio_temperature),
-        "4a": ("Prompt Frankenstein (Anti-padrão)", desafio_04_prompt_frankenstein),
-        "4b": ("Pipeline Correto (System por etapa)", desafio_04_pipeline_correto),
-        "0": ("Executar TODOS os desafios", None),
-    }
+    desafios = {**DESAFIOS, "0": ("Executar TODOS os desafios", None)}
+
+    # Abre a conexão com a API em segundo plano (LLM_WARMUP=1)
+    start_warm_up(MODEL)
 
     while True:
         print("\n" + "=" * 60)
@@ -395,6 +515,7 @@ def menu_desafios():
         print("\n  [q] Sair")
         print("=" * 60)
 
+        startup.mark("menu")
         escolha = input("\nDigite sua escolha: ").strip().lower()
 
         if escolha == "q":
@@ -409,14 +530,26 @@ def menu_desafios():
             print("  - Pipeline: Cada etapa = System especializado")
             print("\nBest Practice: SEMPRE separe System e User prompts!")
             print("=" * 60)
+            print_metrics_summary()
+            print_cache_stats()
+            print_semantic_cache_stats()
+            print_single_flight_stats()
+            print_router_stats()
+            print_hedge_stats()
+            print_cassette_stats()
+            print_startup_report()
+            print_pool_stats()
             break
 
         if escolha == "0":
-            # Executa todos os desafios em sequência
-            for key, (_, func) in desafios.items():
-                if func is not None:
-                    func()
-                    input("\n[Pressione ENTER para continuar...]")
+            # Executa todos os desafios em sequência; as chamadas da próxima já
+            # começam em segundo plano enquanto a atual está na tela
+            with Prefetcher(DESAFIOS.values()) as execucoes:
+                for resultado in execucoes:
+                    print(resultado.output, end="")
+                    resposta = input("\n[Pressione ENTER para continuar, q para voltar ao menu...]")
+                    if resposta.strip().lower() == "q":
+                        break
         elif escolha in desafios:
             _, func = desafios[escolha]
             if func:
@@ -428,7 +561,9 @@ def menu_desafios():
 # =============================================================================
 # EXECUÇÃO DIRETA (para rodar desafios sem menu)
 # =============================================================================
-# Descomente a função que deseja executar:
+# Descomente a função que deseja executar, ou use a linha de comando:
+#     python -m llm.runner desafio:4b
+#     python -m llm.runner desafios --parallel 5
 
 if __name__ == "__main__":
 
@@ -0,0 +1,10 @@
+"""
+=============================================================================
+INFRAESTRUTURA COMPARTILHADA PARA CHAMADAS AO LLM
+=============================================================================
+
+Módulos de apoio usados por main.py (call_llm) e challenges.py (run_prompt).
+As demos continuam didáticas; aqui fica a parte de engenharia
+(cache, concorrência, métricas...) que não precisa aparecer em sala.
+=============================================================================
+"""
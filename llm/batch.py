@@ -0,0 +1,257 @@
+"""
+=============================================================================
+EXECUÇÃO EM LOTE (JSONL) COM CHECKPOINT
+=============================================================================
+
+Processa um arquivo JSONL de requisições, uma por linha:
+
+    {"id": "opcional", "system_prompt": "...", "prompt": "...", "temperature": 0}
+
+Cada linha passa por call_llm (ou run_prompt) em um pool de threads, e o
+resultado é gravado imediatamente em um JSONL de saída:
+
+    {"line": 12, "id": "opcional", "response": "..."}
+    {"line": 13, "id": "opcional", "error": "RateLimitError: ..."}
+
+Os resultados saem na ordem em que terminam (use "line" para reordenar).
+
+Checkpoint: a cada 100 linhas concluídas ou 1 segundo (e sempre ao sair,
+mesmo com erro), grava em <saida>.checkpoint o offset até onde tudo já foi
+processado (mais as linhas concluídas fora de ordem logo depois dele). Se a
+execução cair, rodar o mesmo comando retoma do ponto em que parou.
+
+A memória usada é constante: a leitura só avança até 2 x workers linhas
+além da primeira linha pendente. Uma linha lenta segura a leitura, em vez
+de acumular linhas concluídas (e um checkpoint cada vez maior) atrás dela.
+
+Uso:
+    python -m llm.batch entrada.jsonl saida.jsonl --workers 16
+    python -m llm.batch entrada.jsonl saida.jsonl --helper run_prompt
+=============================================================================
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_WORKERS = 8
+DEFAULT_SAVE_EVERY = 100      # linhas concluídas entre gravações do checkpoint
+DEFAULT_SAVE_INTERVAL = 1.0   # segundos entre gravações do checkpoint
+
+
+class Checkpoint:
+    """
+    Marca d'água de progresso sobre o arquivo de entrada.
+
+    `offset`/`line` apontam para a primeira linha ainda não garantida;
+    `done` guarda as linhas depois dela que já terminaram fora de ordem.
+
+    Args:
+        path: Arquivo do checkpoint
+        save_every: maybe_save() grava a cada N linhas concluídas...
+        save_interval: ...ou a cada tantos segundos, o que vier primeiro
+    """
+
+    def __init__(
+        self,
+        path: str,
+        save_every: int = DEFAULT_SAVE_EVERY,
+        save_interval: float = DEFAULT_SAVE_INTERVAL
+    ):
+        self.path = path
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.offset = 0
+        self.line = 0
+        self.done = set()
+        self._inflight = deque()  # (line, offset_fim) na ordem do arquivo
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.offset = data["offset"]
+            self.line = data["line"]
+            self.done = set(data.get("done", []))
+
+    def track(self, line: int, end_offset: int):
+        """Registra uma linha lida do arquivo (ainda não concluída)."""
+        self._inflight.append((line, end_offset))
+
+    def complete(self, line: int):
+        """Marca uma linha como concluída e avança a marca d'água."""
+        self.done.add(line)
+        while self._inflight and self._inflight[0][0] in self.done:
+            finished, end_offset = self._inflight.popleft()
+            self.done.discard(finished)
+            self.line = finished + 1
+            self.offset = end_offset
+
+    def save(self):
+        """Grava o checkpoint de forma atômica (arquivo temporário + rename)."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"offset": self.offset, "line": self.line, "done": sorted(self.done)}, f
+            )
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+    def maybe_save(self):
+        """Conta uma linha concluída e grava só a cada save_every linhas ou save_interval segundos."""
+        self._unsaved += 1
+        if (self._unsaved >= self.save_every
+                or time.monotonic() - self._saved_at >= self.save_interval):
+            self.save()
+
+
+def _process_record(call, raw: bytes) -> dict:
+    """Executa uma linha do JSONL e monta o registro de saída."""
+    try:
+        record = json.loads(raw)
+    except ValueError as exc:
+        return {"error": f"JSON inválido: {exc}"}
+    if not isinstance(record, dict):
+        # JSON válido, mas não um objeto (ex.: [1, 2]): erro só desta linha
+        return {"error": f"Linha não é um objeto JSON: {type(record).__name__}"}
+
+    result = {"id": record["id"]} if "id" in record else {}
+    kwargs = {"system_prompt": record.get("system_prompt")}
+    if record.get("temperature") is not None:
+        kwargs["temperature"] = record["temperature"]
+
+    try:
+        result["response"] = call(record["prompt"], **kwargs)
+    except Exception as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    return result
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    call,
+    workers: int = DEFAULT_WORKERS,
+    checkpoint_path: str = None,
+    progress_every: int = 100
+) -> dict:
+    """
+    Processa um JSONL de requisições com um pool de threads.
+
+    Args:
+        input_path: Arquivo JSONL de entrada
+        output_path: Arquivo JSONL de saída (aberto em modo append)
+        call: Função no formato de call_llm/run_prompt
+        workers: Número de chamadas simultâneas
+        checkpoint_path: Arquivo de checkpoint (padrão: <saida>.checkpoint)
+        progress_every: Imprime o progresso a cada N linhas concluídas
+
+    Returns:
+        Dicionário com contagens (processed, errors, skipped) e tempo total
+
+    Nota: a garantia é "pelo menos uma vez". Erros e Ctrl+C gravam o
+    checkpoint antes de sair; se o processo for morto de vez (kill -9,
+    queda de energia), as linhas concluídas desde a última gravação podem
+    aparecer duplicadas na saída (mesmo "line").
+    """
+    checkpoint = Checkpoint(checkpoint_path or output_path + ".checkpoint")
+    stats = {"processed": 0, "errors": 0, "skipped": 0}
+    window = workers * 2  # linhas lidas além da primeira pendente (limita a memória)
+    start = time.perf_counter()
+
+    if checkpoint.line:
+        print(f"Retomando da linha {checkpoint.line} (offset {checkpoint.offset})")
+
+    with open(input_path, "rb") as src, \
+            open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+
+        pending = {}
+
+        def drain(return_when):
+            finished, _ = wait(pending, return_when=return_when)
+            for future in finished:
+                line = pending.pop(future)
+                result = future.result()
+                if "error" in result:
+                    stats["errors"] += 1
+
+                out.write(json.dumps({"line": line, **result}, ensure_ascii=False) + "\n")
+                out.flush()
+                checkpoint.complete(line)
+                checkpoint.maybe_save()
+
+                stats["processed"] += 1
+                if progress_every and stats["processed"] % progress_every == 0:
+                    rate = stats["processed"] / (time.perf_counter() - start)
+                    print(f"  {stats['processed']} linhas ({rate:.1f}/s)")
+
+        src.seek(checkpoint.offset)
+        line = checkpoint.line
+        already_done = set(checkpoint.done)
+
+        try:
+            while True:
+                # Janela: não lê além de `window` linhas depois da primeira
+                # pendente, nem com `window` linhas em andamento
+                while pending and (len(pending) >= window or line - checkpoint.line >= window):
+                    drain(FIRST_COMPLETED)
+
+                raw = src.readline()
+                if not raw:
+                    break
+                checkpoint.track(line, src.tell())
+
+                if line in already_done or not raw.strip():
+                    # Concluída antes da queda, ou linha em branco
+                    checkpoint.complete(line)
+                    stats["skipped"] += 1
+                else:
+                    pending[pool.submit(_process_record, call, raw)] = line
+                line += 1
+
+            if pending:
+                drain(ALL_COMPLETED)
+        finally:
+            # Também em erros e Ctrl+C: o checkpoint acompanha a saída já gravada
+            checkpoint.save()
+
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Executa um JSONL de prompts em lote, com checkpoint."
+    )
+    parser.add_argument("input", help="JSONL de entrada")
+    parser.add_argument("output", help="JSONL de saída")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Chamadas simultâneas (padrão: %(default)s)")
+    parser.add_argument("--helper", choices=("call_llm", "run_prompt"), default="call_llm",
+                        help="Helper usado em cada linha (padrão: %(default)s)")
+    parser.add_argument("--checkpoint", help="Arquivo de checkpoint")
+    args = parser.parse_args()
+
+    if args.helper == "call_llm":
+        from main import call_llm as call
+    else:
+        from challenges import run_prompt as call
+
+    stats = run_batch(
+        args.input, args.output, call,
+        workers=args.workers, checkpoint_path=args.checkpoint,
+    )
+    print(
+        f"Concluído: {stats['processed']} processadas, {stats['errors']} com erro, "
+        f"{stats['skipped']} puladas em {stats['elapsed']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
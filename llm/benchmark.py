@@ -0,0 +1,407 @@
+"""
+=============================================================================
+BENCHMARK OFFLINE CONTRA O SERVIDOR SIMULADO
+=============================================================================
+
+Mede o desempenho do código das aulas sem rede e sem custo: sobe o
+servidor local de llm.mockserver, aponta o SDK para ele e executa:
+
+    overhead     call_llm em sequência com o servidor sem latência;
+                 o sobrecusto do cliente é o tempo mediano por chamada
+                 menos o de uma requisição HTTP crua ao mesmo servidor
+    async        acall_llm via gather_prompts (vazão com concorrência)
+    threads      run_prompt em um pool de threads (caminho síncrono)
+    streaming    run_prompt com stream=True (TTFT)
+    pipeline     demo_04_pipeline_correto e desafio_04_pipeline_correto
+    hedging      acall_llm com latência de cauda longa, sem e com requisições
+                 de reserva (llm.hedging); compara o p99 das duas rodadas
+
+Para cada cenário: vazão (req/s) e latência p50/p95/p99.
+
+Uso:
+    python -m llm.benchmark
+    python -m llm.benchmark --requests 500 --concurrency 32 --latency lognormal:0.2,0.6
+    python -m llm.benchmark --json atual.json --baseline referencia.json
+
+Com --baseline, compara com um resultado anterior (--json) e termina com
+código 1 se algum cenário piorar mais que a tolerância (padrão: 20%).
+=============================================================================
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from urllib.parse import urlparse
+
+from llm.mockserver import (
+    LatencySpec, MockConfig, add_config_arguments, config_from_args, start_server
+)
+
+SCENARIOS = ("overhead", "async", "threads", "streaming", "pipeline", "hedging")
+
+# Cauda longa do cenário hedging: mediana de 20 ms, p99 perto de 10x a mediana
+HEDGING_LATENCY = LatencySpec("lognormal", (0.02, 1.0))
+
+# Métricas comparadas com o baseline: nome -> True se "maior é melhor"
+COMPARED = {"throughput": True, "p95": False, "overhead_ms": False}
+
+
+@dataclass
+class ScenarioResult:
+    """Resultado de um cenário do benchmark (tempos em segundos)."""
+    name: str
+    requests: int
+    elapsed: float
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+    extra: dict = field(default_factory=dict)
+
+    def row(self) -> str:
+        extra = " ".join(f"{key}={value:.2f}" for key, value in self.extra.items())
+        return (
+            f"{self.name:<10} {self.requests:>5} {self.elapsed:>7.2f}s {self.throughput:>8.1f} "
+            f"{self.p50 * 1000:>8.1f} {self.p95 * 1000:>8.1f} {self.p99 * 1000:>8.1f}  {extra}"
+        )
+
+
+HEADER = (
+    f"{'Cenário':<10} {'Req':>5} {'Tempo':>8} {'Req/s':>8} "
+    f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+)
+
+
+def _result(name: str, requests: int, elapsed: float, **extra) -> ScenarioResult:
+    """Monta o resultado com os percentis registrados em llm.metrics."""
+    from llm.metrics import metrics, percentile
+
+    latencies = metrics.latency.samples(caller=f"bench:{name}")
+    return ScenarioResult(
+        name=name,
+        requests=requests,
+        elapsed=elapsed,
+        throughput=requests / elapsed if elapsed else 0.0,
+        p50=percentile(latencies, 50),
+        p95=percentile(latencies, 95),
+        p99=percentile(latencies, 99),
+        extra=extra,
+    )
+
+
+def _prompts(name: str, count: int) -> list:
+    # Prompts distintos: nenhuma otimização por prompt repetido entra na conta
+    return [f"[{name}] Pergunta número {i}: explique o conceito {i % 7}." for i in range(count)]
+
+
+# =============================================================================
+# CENÁRIOS
+# =============================================================================
+
+def raw_request_time(base_url: str, requests: int) -> float:
+    """Tempo mediano de uma requisição HTTP crua (keep-alive) ao servidor."""
+    url = urlparse(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port)
+    body = json.dumps({
+        "model": "mock", "messages": [{"role": "user", "content": "ping"}]
+    })
+    durations = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        connection.request("POST", url.path + "/chat/completions", body,
+                           {"content-type": "application/json"})
+        connection.getresponse().read()
+        durations.append(time.perf_counter() - start)
+    connection.close()
+    return statistics.median(durations)
+
+
+def bench_overhead(server, requests: int) -> ScenarioResult:
+    """call_llm em sequência, com o servidor temporariamente sem latência."""
+    from llm.metrics import caller_scope
+    from main import call_llm
+
+    # O cliente é único no processo: em vez de outro servidor, troca a configuração
+    config, server.config = server.config, MockConfig()
+    try:
+        floor = raw_request_time(server.base_url, requests)
+        durations = []
+        start = time.perf_counter()
+        with caller_scope("bench:overhead"):
+            for prompt in _prompts("overhead", requests):
+                call_start = time.perf_counter()
+                call_llm(prompt)
+                durations.append(time.perf_counter() - call_start)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.config = config
+
+    # Medianas: a 1ª chamada (criação do cliente) não distorce o resultado
+    per_call = statistics.median(durations)
+    return _result(
+        "overhead", requests, elapsed,
+        overhead_ms=(per_call - floor) * 1000, http_ms=floor * 1000,
+    )
+
+
+def bench_async(requests: int, concurrency: int) -> ScenarioResult:
+    """acall_llm com concorrência limitada (gather_prompts)."""
+    from llm.concurrency import gather_prompts_sync
+    from llm.metrics import caller_scope
+    from main import acall_llm
+
+    start = time.perf_counter()
+    with caller_scope("bench:async"):
+        gather_prompts_sync(acall_llm, _prompts("async", requests), concurrency=concurrency)
+    return _result("async", requests, time.perf_counter() - start)
+
+
+def bench_threads(requests: int, concurrency: int) -> ScenarioResult:
+    """run_prompt (síncrono) em um pool de threads."""
+    from challenges import run_prompt
+    from llm.metrics import caller_scope
+
+    def worker(prompt):
+        with caller_scope("bench:threads"):
+            return run_prompt(prompt)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, _prompts("threads", requests)))
+    return _result("threads", requests, time.perf_counter() - start)
+
+
+def bench_streaming(requests: int) -> ScenarioResult:
+    """run_prompt com stream=True, em sequência (mede TTFT)."""
+    from challenges import run_prompt
+    from llm.metrics import caller_scope, metrics, percentile
+
+    start = time.perf_counter()
+    with caller_scope("bench:streaming"):
+        for prompt in _prompts("streaming", requests):
+            for _ in run_prompt(prompt, stream=True):
+                pass
+    elapsed = time.perf_counter() - start
+
+    ttft = metrics.ttft.samples(caller="bench:streaming")
+    return _result(
+        "streaming", requests, elapsed,
+        ttft_p50_ms=percentile(ttft, 50) * 1000, ttft_p95_ms=percentile(ttft, 95) * 1000,
+    )
+
+
+def bench_pipeline(runs: int) -> ScenarioResult:
+    """As demos de pipeline (saída descartada), `runs` vezes cada."""
+    from challenges import desafio_04_pipeline_correto
+    from llm.metrics import caller_scope, metrics
+    from main import demo_04_pipeline_correto
+
+    start = time.perf_counter()
+    with caller_scope("bench:pipeline"), contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(runs):
+            demo_04_pipeline_correto()
+            desafio_04_pipeline_correto()
+    elapsed = time.perf_counter() - start
+
+    calls = metrics.latency.samples(caller="bench:pipeline")
+    return _result("pipeline", len(calls), elapsed, run_s=elapsed / (2 * runs))
+
+
+def bench_hedging(server, requests: int, concurrency: int) -> ScenarioResult:
+    """acall_llm com cauda longa: primeiro sem hedging, depois com (mesma carga)."""
+    from llm.concurrency import gather_prompts_sync
+    from llm.hedging import get_hedger
+    from llm.metrics import caller_scope, metrics, percentile
+    from main import acall_llm
+
+    config, server.config = server.config, MockConfig(latency=HEDGING_LATENCY)
+    previous = os.environ.get("LLM_HEDGE")
+    try:
+        os.environ["LLM_HEDGE"] = "0"
+        with caller_scope("bench:hedging-off"):
+            gather_prompts_sync(
+                acall_llm, _prompts("hedging-off", requests), concurrency=concurrency
+            )
+
+        # A rodada sem hedging ensina a latência normal de cada modelo
+        os.environ["LLM_HEDGE"] = "1"
+        hedger = get_hedger()
+        for key, series in metrics.latency.series.items():
+            labels = dict(key)
+            if labels["caller"] == "bench:hedging-off" and labels["source"] == "api":
+                for latency in series["samples"]:
+                    hedger.observe(labels["model"], latency)
+        before = hedger.stats()
+
+        start = time.perf_counter()
+        with caller_scope("bench:hedging"):
+            gather_prompts_sync(acall_llm, _prompts("hedging", requests), concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.config = config
+        if previous is None:
+            os.environ.pop("LLM_HEDGE", None)
+        else:
+            os.environ["LLM_HEDGE"] = previous
+
+    stats = hedger.stats()
+    calls = stats["calls"] - before["calls"]
+    hedged = stats["hedged"] - before["hedged"]
+    off = metrics.latency.samples(caller="bench:hedging-off")
+    return _result(
+        "hedging", requests, elapsed,
+        p99_off_ms=percentile(off, 99) * 1000,
+        hedge_rate=hedged / calls if calls else 0.0,
+        hedge_wins=stats["hedge_wins"] - before["hedge_wins"],
+    )
+
+
+# =============================================================================
+# EXECUÇÃO E COMPARAÇÃO
+# =============================================================================
+
+def run_benchmarks(
+    config: MockConfig,
+    scenarios=SCENARIOS,
+    requests: int = 100,
+    concurrency: int = 16,
+    stream_requests: int = 20,
+    pipeline_runs: int = 3
+) -> list:
+    """
+    Executa os cenários contra servidores simulados locais.
+
+    Args:
+        config: Comportamento do servidor dos cenários de carga
+        scenarios: Cenários a executar (ver SCENARIOS)
+        requests: Chamadas nos cenários overhead/async/threads/hedging
+        concurrency: Chamadas simultâneas nos cenários async/threads/hedging
+        stream_requests: Chamadas no cenário streaming
+        pipeline_runs: Execuções de cada demo no cenário pipeline
+
+    Returns:
+        Lista de ScenarioResult, na ordem de `scenarios`
+    """
+    # O SDK lê estas variáveis ao criar o cliente; o cache ficaria com
+    # respostas simuladas e esconderia as chamadas
+    os.environ["OPENAI_API_KEY"] = "mock"
+    os.environ["LLM_CACHE"] = "0"
+
+    server = start_server(config)
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    results = []
+    try:
+        for name in scenarios:
+            if name == "overhead":
+                result = bench_overhead(server, requests)
+            elif name == "async":
+                result = bench_async(requests, concurrency)
+            elif name == "threads":
+                result = bench_threads(requests, concurrency)
+            elif name == "streaming":
+                result = bench_streaming(stream_requests)
+            elif name == "pipeline":
+                result = bench_pipeline(pipeline_runs)
+            elif name == "hedging":
+                result = bench_hedging(server, requests, concurrency)
+            else:
+                raise ValueError(f"Cenário desconhecido: {name}")
+            results.append(result)
+            print(result.row())
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """Compara com um baseline (--json anterior); retorna as regressões encontradas."""
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if not previous:
+            continue
+        current = {**asdict(result), **result.extra}
+        reference = {**previous, **previous.get("extra", {})}
+        for metric, higher_is_better in COMPARED.items():
+            if metric not in current or metric not in reference or not reference[metric]:
+                continue
+            change = (current[metric] - reference[metric]) / abs(reference[metric])
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    f"{result.name}.{metric}: {reference[metric]:.4g} -> {current[metric]:.4g} "
+                    f"({change:+.0%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark offline de call_llm/run_prompt contra um servidor simulado."
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="Cenários separados por vírgula (padrão: todos)")
+    parser.add_argument("--requests", type=int, default=100,
+                        help="Chamadas por cenário de carga (padrão: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Chamadas simultâneas (padrão: %(default)s)")
+    parser.add_argument("--stream-requests", type=int, default=20,
+                        help="Chamadas no cenário streaming (padrão: %(default)s)")
+    parser.add_argument("--pipeline-runs", type=int, default=3,
+                        help="Execuções de cada demo de pipeline (padrão: %(default)s)")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    parser.add_argument("--baseline", help="Resultado anterior (--json) para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Piora tolerada antes de acusar regressão (padrão: %(default)s)")
+    add_config_arguments(parser)
+    parser.set_defaults(latency="fixed:0.05", tokens_per_second=500.0, seed=42)
+    args = parser.parse_args()
+
+    if isinstance(args.latency, str):
+        args.latency = LatencySpec.parse(args.latency)
+    config = config_from_args(args)
+
+    print(
+        f"Servidor simulado: latência {config.latency}, {config.tokens_per_second:g} tokens/s, "
+        f"{config.completion_tokens} tokens por resposta, {config.error_rate:.0%} de erros\n"
+    )
+    print(HEADER)
+    results = run_benchmarks(
+        config,
+        scenarios=[name.strip() for name in args.scenarios.split(",") if name.strip()],
+        requests=args.requests,
+        concurrency=args.concurrency,
+        stream_requests=args.stream_requests,
+        pipeline_runs=args.pipeline_runs,
+    )
+
+    from llm.ratelimit import get_rate_limiter
+    stats = get_rate_limiter().stats()
+    print(f"\nNovas tentativas: {stats['retries']} ({stats['rate_limited']} por 429)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({result.name: asdict(result) for result in results}, f, indent=2)
+        print(f"Resultados gravados em {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nREGRESSÕES (tolerância {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nSem regressões em relação a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
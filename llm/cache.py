@@ -0,0 +1,265 @@
+"""
+=============================================================================
+CACHE DE RESPOSTAS EM DISCO (SQLite + LRU)
+=============================================================================
+
+Chamadas com temperature=0 são (praticamente) determinísticas: repetir a
+mesma requisição só custa tempo e dinheiro. Este módulo guarda a resposta
+em um arquivo SQLite, indexada por modelo + lista completa de mensagens +
+temperature, e a devolve em milissegundos nas execuções seguintes.
+
+Ativação (opt-in) via variáveis de ambiente:
+    LLM_CACHE=1                  Liga o cache
+    LLM_CACHE_PATH=...           Caminho do arquivo (padrão: .llm_cache.sqlite3)
+    LLM_CACHE_MAX_ENTRIES=...    Máximo de respostas guardadas (padrão: 1000)
+    LLM_CACHE_MAX_BYTES=...      Tamanho máximo das respostas (padrão: sem limite)
+    LLM_CACHE_TTL=...            Validade em segundos (padrão: sem expiração)
+=============================================================================
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = ".llm_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def make_cache_key(model: str, messages: list, temperature: float, params: dict = None) -> str:
+    """
+    Gera a chave do cache a partir de tudo que influencia a resposta.
+
+    A serialização usa sort_keys para que dicionários equivalentes gerem
+    sempre a mesma chave. `params` são parâmetros extras da API
+    (ex.: max_tokens, logit_bias) e só entram na chave quando existem.
+    """
+    request = {"model": model, "messages": messages, "temperature": temperature}
+    if params:
+        request["params"] = params
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache persistente de respostas com expiração (TTL) e despejo LRU.
+
+    Args:
+        path: Arquivo SQLite onde as respostas ficam guardadas
+        max_entries: Quantidade máxima de respostas (as menos usadas saem primeiro)
+        max_bytes: Soma máxima do tamanho das respostas (None = sem limite)
+        ttl: Validade de cada resposta em segundos (None = nunca expira)
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = None,
+        ttl: float = None
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # Contadores da sessão atual
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+        # Uma conexão compartilhada, protegida por lock (uso com threads)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def is_cacheable(temperature: float) -> bool:
+        """Só respostas determinísticas (temperature 0) entram no cache."""
+        return not temperature
+
+    def get(self, model: str, messages: list, temperature: float, params: dict = None):
+        """
+        Busca uma resposta no cache.
+
+        Returns:
+            O texto da resposta, ou None em caso de miss (ou bypass)
+        """
+        if not self.is_cacheable(temperature):
+            self.bypassed += 1
+            return None
+
+        key = make_cache_key(model, messages, temperature, params)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                # Expirada: remove e conta como miss
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def set(
+        self,
+        model: str,
+        messages: list,
+        temperature: float,
+        response: str,
+        params: dict = None
+    ):
+        """Guarda uma resposta e aplica as regras de despejo."""
+        if not self.is_cacheable(temperature) or response is None:
+            return
+
+        key = make_cache_key(model, messages, temperature, params)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO responses
+                   (key, model, response, size, created_at, last_access)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Remove entradas expiradas e, depois, as menos usadas (LRU)."""
+        if self.ttl is not None:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+            )
+
+        if self.max_entries is not None:
+            self._conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                       SELECT key FROM responses
+                       ORDER BY last_access DESC
+                       LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            )
+
+        if self.max_bytes is not None:
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC"
+            )
+            excess_keys = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                excess_keys.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", excess_keys)
+
+    def clear(self):
+        """Apaga todas as respostas guardadas."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Retorna os contadores de hit/miss da sessão."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# =============================================================================
+# INSTÂNCIA PADRÃO (configurada por variáveis de ambiente)
+# =============================================================================
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def _env_number(name: str, cast):
+    value = os.getenv(name)
+    return cast(value) if value else None
+
+
+def get_response_cache():
+    """
+    Retorna o cache padrão, ou None se LLM_CACHE não estiver ligado.
+
+    O cache é criado na primeira chamada, então importar este módulo
+    não abre nenhum arquivo.
+    """
+    global _default_cache
+
+    if os.getenv("LLM_CACHE", "0").lower() not in ("1", "true", "yes", "on"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_entries=_env_number("LLM_CACHE_MAX_ENTRIES", int) or DEFAULT_MAX_ENTRIES,
+                max_bytes=_env_number("LLM_CACHE_MAX_BYTES", int),
+                ttl=_env_number("LLM_CACHE_TTL", float),
+            )
+        return _default_cache
+
+
+def print_cache_stats():
+    """Imprime o resumo do cache (apenas se estiver ligado)."""
+    cache = get_response_cache()
+    if cache is None:
+        return
+
+    stats = cache.stats()
+    print(
+        f"Cache de respostas: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['bypassed']} ignoradas (temperature > 0) | "
+        f"taxa de acerto {stats['hit_rate']:.0%} | {stats['entries']} entradas"
+    )
@@ -0,0 +1,282 @@
+"""
+=============================================================================
+CASCATA: CLASSIFICADOR LOCAL NA FRENTE DO LLM
+=============================================================================
+
+Boa parte dos textos é óbvia ("Amei!", "travou de novo"). Em vez de mandar
+tudo para o LLM, um modelo local minúsculo responde primeiro:
+
+    texto -> modelo local (léxico de n-gramas, Naive Bayes)
+               confiança >= limiar?  sim -> responde em microssegundos
+                                     não -> LLM (few-shot) -> aprende o rótulo
+
+O modelo local começa com os próprios exemplos do few-shot e é retreinado
+continuamente com os rótulos dados pelo LLM: quanto mais uso, mais casos ele
+resolve sozinho. A taxa de desvio (deflection) mostra quantos textos não
+precisaram do LLM.
+
+Opcionalmente, uma fração dos casos que o modelo local resolveria também vai
+para o LLM (audit_rate), para medir a concordância e calibrar o limiar. Essas
+auditorias são chamadas pagas: contam à parte, fora dos casos locais e do
+desvio.
+
+Configuração via variável de ambiente:
+    LLM_CASCADE_THRESHOLD=0.9   Limiar padrão de confiança do modelo local
+
+Exemplo:
+    cascata = CascadeClassifier(classificar_com_llm, ["Positivo", "Negativo", "Neutro"],
+                                examples=exemplos, threshold=0.9)
+    cascata.classify("Amei o app!")   # CascadeResult(label="Positivo", source="local", ...)
+=============================================================================
+"""
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+DEFAULT_THRESHOLD = 0.9
+
+_WORD = re.compile(r"\w+")
+
+
+def cascade_threshold() -> float:
+    return float(os.getenv("LLM_CASCADE_THRESHOLD", DEFAULT_THRESHOLD))
+
+
+def extract_features(text: str, ngram: int = 2) -> list:
+    """Palavras em minúsculas e n-gramas de palavras (até `ngram`)."""
+    words = _WORD.findall(text.lower())
+    features = list(words)
+    for size in range(2, ngram + 1):
+        features += [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return features
+
+
+class LexiconModel:
+    """
+    Naive Bayes multinomial sobre palavras e n-gramas, treinado aos poucos.
+
+    Args:
+        labels: Rótulos possíveis
+        ngram: Tamanho máximo dos n-gramas de palavras
+        alpha: Suavização de Laplace
+    """
+
+    def __init__(self, labels: list, ngram: int = 2, alpha: float = 1.0):
+        self.labels = list(labels)
+        self.ngram = ngram
+        self.alpha = alpha
+        self.docs = dict.fromkeys(self.labels, 0)
+        self.counts = {label: defaultdict(int) for label in self.labels}
+        self.totals = dict.fromkeys(self.labels, 0)
+        self.vocabulary = set()
+        self._lock = threading.Lock()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.docs.values())
+
+    def learn(self, text: str, label: str):
+        """Acrescenta um exemplo rotulado (treino incremental)."""
+        if label not in self.docs:
+            return
+        features = extract_features(text, self.ngram)
+        with self._lock:
+            self.docs[label] += 1
+            for feature in features:
+                self.counts[label][feature] += 1
+            self.totals[label] += len(features)
+            self.vocabulary.update(features)
+
+    def predict_proba(self, text: str) -> dict:
+        """
+        Probabilidade de cada rótulo.
+
+        Só contam os n-gramas já vistos no treino; sem nenhum conhecido, a
+        distribuição é uniforme (o texto vai para o LLM).
+        """
+        with self._lock:
+            features = [f for f in extract_features(text, self.ngram) if f in self.vocabulary]
+            if not features or not self.samples:
+                return {label: 1 / len(self.labels) for label in self.labels}
+
+            size = len(self.vocabulary)
+            scores = {}
+            for label in self.labels:
+                score = math.log(
+                    (self.docs[label] + self.alpha) / (self.samples + self.alpha * len(self.labels))
+                )
+                denominator = self.totals[label] + self.alpha * size
+                for feature in features:
+                    score += math.log((self.counts[label].get(feature, 0) + self.alpha) / denominator)
+                scores[label] = score
+
+        top = max(scores.values())
+        exps = {label: math.exp(score - top) for label, score in scores.items()}
+        total = sum(exps.values())
+        return {label: value / total for label, value in exps.items()}
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "labels": self.labels,
+                "ngram": self.ngram,
+                "alpha": self.alpha,
+                "docs": self.docs,
+                "counts": {label: dict(counts) for label, counts in self.counts.items()},
+            }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LexiconModel":
+        model = cls(data["labels"], ngram=data["ngram"], alpha=data["alpha"])
+        model.docs = dict(data["docs"])
+        for label, counts in data["counts"].items():
+            model.counts[label].update(counts)
+            model.totals[label] = sum(counts.values())
+            model.vocabulary.update(counts)
+        return model
+
+
+@dataclass
+class CascadeResult:
+    """
+    Rótulo, confiança do modelo local e quem respondeu ("local", "llm" ou
+    "audit"). Na auditoria, o rótulo é o do modelo local e o do LLM fica em
+    audit_label (diferente dele = correção).
+    """
+    label: str
+    confidence: float
+    source: str
+    audit_label: str = None
+
+    @property
+    def corrected(self) -> bool:
+        return self.audit_label is not None and self.audit_label != self.label
+
+
+class CascadeClassifier:
+    """
+    Classificador local na frente de um classificador com LLM.
+
+    Args:
+        classify: Função texto -> rótulo que usa o LLM
+        labels: Rótulos possíveis
+        examples: Pares (texto, rótulo) para o treino inicial (ex.: o few-shot)
+        threshold: Confiança mínima do modelo local para responder sozinho
+            (padrão: LLM_CASCADE_THRESHOLD)
+        min_samples: Exemplos de treino antes de o modelo local poder responder
+        audit_rate: Fração dos casos locais conferida também pelo LLM
+        model: LexiconModel já treinado (ex.: carregado com load())
+    """
+
+    def __init__(
+        self,
+        classify,
+        labels: list,
+        examples: list = None,
+        threshold: float = None,
+        min_samples: int = 0,
+        audit_rate: float = 0.0,
+        model: LexiconModel = None
+    ):
+        self.classify_with_llm = classify
+        self.threshold = cascade_threshold() if threshold is None else threshold
+        self.min_samples = min_samples
+        self.audit_rate = audit_rate
+        self.model = model or LexiconModel(labels)
+        for text, label in examples or ():
+            self.model.learn(text, label)
+
+        self._lock = threading.Lock()
+        self.local = 0
+        self.forwarded = 0
+        self.audited = 0
+        self.audit_agreements = 0
+        self.local_seconds = 0.0
+
+    def classify(self, text: str) -> CascadeResult:
+        start = time.perf_counter()
+        probabilities = self.model.predict_proba(text)
+        label = max(probabilities, key=probabilities.get)
+        confidence = probabilities[label]
+        elapsed = time.perf_counter() - start
+
+        ready = self.model.samples >= self.min_samples
+        if ready and confidence >= self.threshold:
+            if self.audit_rate and random.random() < self.audit_rate:
+                # Auditoria: o LLM é chamado (e pago), então não conta como local
+                checked = self.classify_with_llm(text)
+                with self._lock:
+                    self.audited += 1
+                    self.audit_agreements += checked == label
+                if checked is not None:
+                    self.model.learn(text, checked)
+                return CascadeResult(label, confidence, "audit", audit_label=checked)
+
+            # Só nas estatísticas da cascata: nas métricas da sessão, "Por
+            # modelo" lista modelos de verdade (chamadas à API e caches)
+            with self._lock:
+                self.local += 1
+                self.local_seconds += elapsed
+            return CascadeResult(label, confidence, "local")
+
+        llm_label = self.classify_with_llm(text)
+        with self._lock:
+            self.forwarded += 1
+        # Retreino contínuo: o rótulo do LLM vira exemplo para o modelo local
+        if llm_label is not None:
+            self.model.learn(text, llm_label)
+        return CascadeResult(llm_label, confidence, "llm")
+
+    def classify_many(self, texts: list) -> list:
+        return [self.classify(text) for text in texts]
+
+    # ----- Métricas e persistência -----
+
+    @property
+    def deflection_rate(self) -> float:
+        """Fração dos textos resolvidos sem nenhuma chamada ao LLM."""
+        total = self.local + self.forwarded + self.audited
+        return self.local / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "local": self.local,
+            "llm": self.forwarded,
+            "deflection_rate": self.deflection_rate,
+            "local_avg_us": self.local_seconds / self.local * 1e6 if self.local else 0.0,
+            "audited": self.audited,
+            "audit_agreement": self.audit_agreements / self.audited if self.audited else None,
+            "training_samples": self.model.samples,
+        }
+
+    def summary(self) -> str:
+        stats = self.stats()
+        line = (
+            f"Cascata: {stats['local']} resolvidos localmente, {stats['llm']} pelo LLM "
+            f"(desvio {stats['deflection_rate']:.0%}, "
+            f"{stats['local_avg_us']:.0f} µs por caso local) | "
+            f"{stats['training_samples']} exemplos de treino"
+        )
+        if stats["audit_agreement"] is not None:
+            line += (
+                f" | {stats['audited']} auditados pelo LLM "
+                f"(concordância {stats['audit_agreement']:.0%})"
+            )
+        return line
+
+    def save(self, path: str):
+        """Grava o modelo local (para continuar o treino na próxima execução)."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.model.to_dict(), f, ensure_ascii=False)
+
+    @staticmethod
+    def load(path: str) -> LexiconModel:
+        with open(path, encoding="utf-8") as f:
+            return LexiconModel.from_dict(json.load(f))
@@ -0,0 +1,193 @@
+"""
+=============================================================================
+GRAVAÇÃO E REPRODUÇÃO DE CHAMADAS (CASSETE)
+=============================================================================
+
+Rodar todas as demos faz dezenas de chamadas em sequência à API. Com um
+cassete, as chamadas de call_llm/run_prompt (e das versões async) são
+gravadas em um arquivo JSONL e depois reproduzidas localmente, sem rede:
+
+    record   Chama a API e grava cada par requisição/resposta
+             (começa um cassete novo)
+    replay   Responde com o que foi gravado; o que faltar vai para a API
+             e é acrescentado ao cassete
+    strict   Só responde com o que foi gravado; qualquer requisição nova
+             é um erro (CassetteMiss). Ideal para CI: reprodutível e
+             sem chave de API
+
+Requisições iguais repetidas (ex.: a mesma pergunta com temperature alta)
+são reproduzidas na ordem em que foram gravadas.
+
+Configuração via variáveis de ambiente:
+    LLM_CASSETTE_MODE=off|record|replay|strict   (padrão: off)
+    LLM_CASSETTE=cassettes/aulas.jsonl           Arquivo do cassete
+=============================================================================
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+
+from llm.cache import make_cache_key
+
+DEFAULT_CASSETTE_PATH = "cassettes/aulas.jsonl"
+MODES = ("off", "record", "replay", "strict")
+
+
+class CassetteMiss(LookupError):
+    """Requisição não gravada no cassete (modo strict)."""
+
+
+class Cassette:
+    """
+    Arquivo JSONL com as respostas gravadas, indexadas como no cache.
+
+    Args:
+        path: Caminho do arquivo do cassete
+        mode: "record", "replay" ou "strict"
+    """
+
+    def __init__(self, path: str, mode: str):
+        if mode not in MODES or mode == "off":
+            raise ValueError(f"Modo de cassete inválido: {mode!r} (use record, replay ou strict)")
+        self.path = path
+        self.mode = mode
+        self._responses = defaultdict(list)  # chave -> respostas, na ordem gravada
+        self._played = defaultdict(int)      # chave -> quantas já foram reproduzidas
+        self._lock = threading.Lock()
+        self._truncate = mode == "record"
+
+        self.replayed = 0
+        self.recorded = 0
+        self.missing = 0
+
+        if mode != "record" and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    self._responses[entry["key"]].append(entry["response"])
+                except (json.JSONDecodeError, KeyError) as exc:
+                    raise ValueError(f"{self.path}:{number}: linha inválida no cassete ({exc})")
+
+    def __len__(self) -> int:
+        return sum(len(responses) for responses in self._responses.values())
+
+    def play(self, model: str, messages: list, temperature: float, params: dict = None):
+        """
+        Devolve a resposta gravada para a requisição, ou None.
+
+        Raises:
+            CassetteMiss: No modo strict, se a requisição não foi gravada
+        """
+        if self.mode == "record":
+            return None
+
+        key = make_cache_key(model, messages, temperature, params)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                self.missing += 1
+                if self.mode == "strict":
+                    prompt = messages[-1]["content"] if messages else ""
+                    raise CassetteMiss(
+                        f"Requisição não gravada em {self.path} (modo strict): "
+                        f"{prompt[:80]!r}. Grave de novo com LLM_CASSETTE_MODE=record."
+                    )
+                return None
+
+            index = self._played[key]
+            self._played[key] += 1
+            self.replayed += 1
+            # Mais repetições do que o gravado: recomeça a sequência
+            return responses[index % len(responses)]
+
+    def record(
+        self,
+        model: str,
+        messages: list,
+        temperature: float,
+        content: str,
+        params: dict = None
+    ):
+        """Acrescenta a resposta ao cassete (nada faz no modo strict)."""
+        if self.mode == "strict":
+            return
+
+        key = make_cache_key(model, messages, temperature, params)
+        entry = {
+            "key": key,
+            "model": model,
+            "temperature": temperature,
+            "messages": messages,
+            "response": content,
+        }
+        if params:
+            entry["params"] = params
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Modo record: a primeira gravação do processo começa um cassete novo
+            with open(self.path, "w" if self._truncate else "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._truncate = False
+            self._responses[key].append(content)
+            self.recorded += 1
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "replayed": self.replayed,
+            "recorded": self.recorded,
+            "missing": self.missing,
+            "entries": len(self),
+        }
+
+
+# =============================================================================
+# INSTÂNCIA COMPARTILHADA
+# =============================================================================
+
+_default_cassette = None
+_default_cassette_lock = threading.Lock()
+
+
+def cassette_mode() -> str:
+    return os.getenv("LLM_CASSETTE_MODE", "off").lower()
+
+
+def get_cassette():
+    """Retorna o cassete padrão, ou None se LLM_CASSETTE_MODE=off."""
+    global _default_cassette
+
+    mode = cassette_mode()
+    if mode == "off":
+        return None
+
+    with _default_cassette_lock:
+        if _default_cassette is None:
+            _default_cassette = Cassette(
+                path=os.getenv("LLM_CASSETTE", DEFAULT_CASSETTE_PATH),
+                mode=mode,
+            )
+        return _default_cassette
+
+
+def print_cassette_stats():
+    """Imprime o resumo do cassete (apenas se estiver ligado)."""
+    cassette = get_cassette()
+    if cassette is None:
+        return
+
+    stats = cassette.stats()
+    print(
+        f"Cassete ({stats['mode']}, {cassette.path}): {stats['replayed']} reproduzidas, "
+        f"{stats['recorded']} gravadas, {stats['missing']} não encontradas"
+    )
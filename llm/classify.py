@@ -0,0 +1,474 @@
+"""
+=============================================================================
+CLASSIFICAÇÃO RESTRITA A UM TOKEN, COM CONFIANÇA POR LOGPROBS
+=============================================================================
+
+Um classificador com texto livre gera várias palavras e ainda precisamos
+torcer para que a resposta seja exatamente "Positivo", "Negativo" ou
+"Neutro". Aqui a mesma chamada (call_llm/run_prompt) é feita com:
+
+    - max_tokens=1: o modelo gera um único token
+    - logit_bias: empurra a escolha para o primeiro token de cada rótulo
+    - logprobs/top_logprobs: probabilidade de cada alternativa
+
+O token gerado é mapeado de volta para o rótulo, e as probabilidades dos
+rótulos viram a confiança da classificação, sem uma segunda chamada.
+
+Se dois rótulos começam com o mesmo token (ex.: "Ne" em "Negativo" e
+"Neutro", conforme o tokenizador), um token só não basta: o modelo gera
+até o primeiro token que os distingue (max_tokens maior), o viés vale para
+todos os tokens até ali e a confiança sai dos logprobs ao longo do caminho
+gerado.
+
+O logit_bias precisa dos ids dos tokens, calculados com o tiktoken (em
+requirements.txt; baixa o vocabulário na primeira vez). Sem ele, a
+classificação continua com max_tokens=1 e logprobs, só sem o viés: o
+rótulo deixa de ser garantido.
+
+Para volumes grandes, BatchClassifier manda muitos textos numerados em uma
+só requisição (o system prompt e os exemplos vão uma vez por lote).
+
+Exemplo:
+    classificador = LabelClassifier(
+        ["Positivo", "Negativo", "Neutro"], call=call_llm,
+        system_prompt=system_prompt, model=MODEL,
+    )
+    resultado = classificador.classify('Texto: "Amei!"\\nSentimento:')
+    resultado.label          # "Positivo"
+    resultado.probabilities  # {"Positivo": 0.97, "Neutro": 0.02, "Negativo": 0.01}
+=============================================================================
+"""
+
+import math
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from llm.metrics import caller_scope, current_caller
+from llm.router import preferred_model
+
+# Viés máximo aceito pela API: praticamente só os rótulos podem sair
+DEFAULT_BIAS = 100
+
+# Máximo de alternativas que a API devolve por token
+MAX_TOP_LOGPROBS = 20
+
+
+@dataclass
+class Classification:
+    """Resultado de uma classificação (probabilidades normalizadas entre os rótulos)."""
+    label: str
+    probabilities: dict = field(default_factory=dict)
+    token: str = ""
+
+    @property
+    def confidence(self) -> float:
+        return self.probabilities.get(self.label, 0.0)
+
+    def __str__(self) -> str:
+        if self.label is None:
+            return f"? (token {self.token!r} não corresponde a nenhum rótulo)"
+        return f"{self.label} ({self.confidence:.0%})"
+
+
+def _encoding(model: str):
+    """Tokenizador do modelo, ou None se o tiktoken não estiver disponível."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # O tiktoken baixa o vocabulário na primeira vez (pode estar sem rede)
+        return None
+
+
+def _distinguishing_prefixes(labels: list, encoding) -> dict:
+    """
+    Menor sequência de tokens que identifica cada rótulo: o primeiro token,
+    ou mais, até o que o separa dos rótulos com o mesmo início.
+    """
+    encoded = {label: encoding.encode(label) for label in labels}
+    prefixes = {}
+    for label, tokens in encoded.items():
+        others = [other for name, other in encoded.items() if name != label]
+        size = 1
+        while size < len(tokens) and any(other[:size] == tokens[:size] for other in others):
+            size += 1
+        prefixes[label] = tokens[:size]
+    return prefixes
+
+
+_warned = False
+
+
+def _warn_no_tokenizer():
+    global _warned
+    if not _warned:
+        _warned = True
+        print("[aviso] tiktoken indisponível: classificação sem logit_bias (pip install tiktoken)")
+
+
+class LabelClassifier:
+    """
+    Classificador de rótulos fixos sobre call_llm/run_prompt.
+
+    Args:
+        labels: Rótulos possíveis (de preferência com primeiros tokens diferentes:
+                se dois coincidirem, cada classificação gera mais tokens)
+        call: Função de chamada (call_llm ou run_prompt)
+        system_prompt: Instruções do classificador
+        examples: Pares (entrada, rótulo) de few-shot
+        model: Modelo padrão do helper; os tokens do logit_bias vêm do modelo
+               para onde o roteador manda as classificações (se ligado)
+        bias: Viés aplicado ao primeiro token de cada rótulo
+    """
+
+    def __init__(
+        self,
+        labels: list,
+        call,
+        system_prompt: str = None,
+        examples: list = None,
+        model: str = None,
+        bias: float = DEFAULT_BIAS
+    ):
+        self.labels = list(labels)
+        self.call = call
+        self.system_prompt = system_prompt
+        self.examples = examples
+        self.logit_bias = None
+        self.max_tokens = 1
+        self._first_tokens = {}  # texto dos tokens que identificam o rótulo -> rótulo
+
+        # Com o roteador ligado, a chamada (task="classify") vai para outro modelo
+        if model:
+            model = preferred_model("classify", model)
+        self.model = model
+
+        encoding = _encoding(model) if model else None
+        if model and encoding is None:
+            _warn_no_tokenizer()
+        if encoding is not None:
+            token_ids = set()
+            for label, tokens in _distinguishing_prefixes(self.labels, encoding).items():
+                self.max_tokens = max(self.max_tokens, len(tokens))
+                token_ids.update(tokens)
+                self._first_tokens[encoding.decode(tokens)] = label
+            self.logit_bias = {str(token_id): bias for token_id in sorted(token_ids)}
+
+    def match(self, token: str):
+        """Rótulo correspondente a um token gerado (ou None)."""
+        if token in self._first_tokens:
+            return self._first_tokens[token]
+        prefix = token.strip().lower()
+        if not prefix:
+            return None
+        candidates = [label for label in self.labels if label.lower().startswith(prefix)]
+        if not candidates:
+            # Com max_tokens > 1, o texto pode passar do fim do rótulo
+            candidates = [label for label in self.labels if prefix.startswith(label.lower())]
+            candidates = [max(candidates, key=len)] if candidates else []
+        return candidates[0] if len(candidates) == 1 else None
+
+    def request_params(self) -> dict:
+        """Parâmetros da API usados em cada classificação."""
+        params = {
+            "max_tokens": self.max_tokens,
+            "logprobs": True,
+            "top_logprobs": min(MAX_TOP_LOGPROBS, max(5, 2 * len(self.labels))),
+        }
+        if self.logit_bias:
+            params["logit_bias"] = self.logit_bias
+        return params
+
+    def parse(self, response) -> Classification:
+        """Converte a resposta (Completion com logprobs) em Classification."""
+        token = str(response)
+        probabilities = dict.fromkeys(self.labels, 0.0)
+
+        logprobs = getattr(response, "logprobs", None)
+        prefix, mass = "", 1.0
+        for item in logprobs or ():
+            # Alternativas em cada posição, dado o que já foi gerado antes dela
+            for alternative, logprob in item["top_logprobs"].items():
+                label = self.match(prefix + alternative)
+                if label is not None:
+                    probabilities[label] += mass * math.exp(logprob)
+            prefix += item["token"]
+            if self.match(prefix) is not None:
+                break
+            mass *= math.exp(item["logprob"])
+
+        total = sum(probabilities.values())
+        label = self.match(token)
+        if total:
+            probabilities = {name: p / total for name, p in probabilities.items()}
+            if label is None:
+                label = max(probabilities, key=probabilities.get)
+        elif label is not None:
+            probabilities[label] = 1.0  # resposta sem logprobs: confiança cheia
+
+        ordered = dict(sorted(probabilities.items(), key=lambda item: -item[1]))
+        return Classification(label=label, probabilities=ordered, token=token)
+
+    def classify(self, prompt: str, examples: list = None) -> Classification:
+        """
+        Classifica um texto (já formatado como o prompt do usuário).
+
+        Args:
+            prompt: Texto a classificar, no formato dos exemplos
+            examples: Exemplos só desta chamada (ex.: os mais parecidos com o
+                      texto, vindos de um ExampleStore); padrão: os do construtor
+        """
+        response = self.call(
+            prompt,
+            system_prompt=self.system_prompt,
+            temperature=0,
+            examples=self.examples if examples is None else examples,
+            task="classify",
+            **self.request_params(),
+        )
+        return self.parse(response)
+
+
+# =============================================================================
+# CLASSIFICAÇÃO EM LOTE (VÁRIOS TEXTOS EM UMA REQUISIÇÃO)
+# =============================================================================
+
+# Limites padrão (gpt-4.1-mini aceita bem mais; valores conservadores)
+DEFAULT_CONTEXT_TOKENS = 128_000
+DEFAULT_MAX_OUTPUT_TOKENS = 4_096
+DEFAULT_MAX_BATCH = 100
+
+# Tokens de saída por item ("123. Positivo\n")
+OUTPUT_TOKENS_PER_ITEM = 8
+
+BATCH_INSTRUCTIONS = (
+    "Classifique cada texto numerado abaixo. Responda com uma linha por texto, "
+    'no formato "<número>. <rótulo>", na mesma ordem, usando apenas: {labels}.'
+)
+
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)\s*[.):\-]\s*(.+?)\s*$")
+
+
+def _estimate(text: str) -> int:
+    # Mesma regra prática do RateLimiter: ~4 caracteres por token
+    return len(text) // 4 + 1
+
+
+class BatchClassifier:
+    """
+    Classifica muitos textos por requisição, numerados, e confere a resposta.
+
+    Os lotes são montados pelo tamanho estimado em tokens (janela de contexto
+    e limite de saída). Itens sem rótulo válido na resposta são refeitos um a
+    um; se a resposta vier embaralhada (números repetidos ou fora do lote),
+    o lote inteiro é refeito item a item e os próximos lotes ficam menores.
+
+    Args:
+        labels: Rótulos possíveis
+        call: Função de chamada (call_llm ou run_prompt)
+        system_prompt: Instruções do classificador
+        examples: Pares (texto, rótulo) de few-shot, enviados como um lote de exemplo
+        max_batch: Máximo de textos por requisição
+        context_tokens: Janela de contexto do modelo
+        max_output_tokens: Limite de tokens de saída do modelo
+        fallback: Função texto -> rótulo usada nos itens que falharem
+                  (padrão: o mesmo formato numerado, com um único texto)
+    """
+
+    def __init__(
+        self,
+        labels: list,
+        call,
+        system_prompt: str = None,
+        examples: list = None,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+        max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS,
+        fallback=None
+    ):
+        self.labels = list(labels)
+        self.call = call
+        self.system_prompt = system_prompt
+        self.examples = list(examples or [])
+        self.max_batch = max_batch
+        self.context_tokens = context_tokens
+        self.max_output_tokens = max_output_tokens
+        self.fallback = fallback
+        self.batch_size = max_batch  # ajustado a cada lote
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.items = 0
+        self.fallbacks = 0
+
+    # ----- Montagem dos prompts -----
+
+    def render(self, texts: list) -> str:
+        """Prompt do usuário com as instruções e os textos numerados."""
+        numbered = "\n".join(
+            f"{i}. {' '.join(text.split())}" for i, text in enumerate(texts, start=1)
+        )
+        return BATCH_INSTRUCTIONS.format(labels=", ".join(self.labels)) + "\n\n" + numbered
+
+    def _few_shot_turns(self) -> list:
+        """Os exemplos viram um lote já respondido (prefixo fixo do prompt)."""
+        if not self.examples:
+            return []
+        texts = [text for text, _ in self.examples]
+        answer = "\n".join(f"{i}. {label}" for i, (_, label) in enumerate(self.examples, start=1))
+        return [(self.render(texts), answer)]
+
+    def _prefix_tokens(self) -> int:
+        parts = [self.system_prompt or "", BATCH_INSTRUCTIONS]
+        for prompt, answer in self._few_shot_turns():
+            parts += [prompt, answer]
+        return sum(_estimate(part) for part in parts) + 16
+
+    def iter_batches(self, texts):
+        """
+        Divide os textos em lotes que cabem na janela de contexto e na saída.
+
+        É um gerador: cada lote usa o batch_size do momento, já ajustado
+        pelos lotes anteriores.
+        """
+        prefix = self._prefix_tokens()
+        max_items_by_output = max(1, self.max_output_tokens // OUTPUT_TOKENS_PER_ITEM)
+        current, used = [], prefix
+
+        for text in texts:
+            cost = _estimate(text) + OUTPUT_TOKENS_PER_ITEM + 2
+            full = (
+                len(current) >= min(self.batch_size, max_items_by_output)
+                or used + cost > self.context_tokens
+            )
+            if current and full:
+                yield current
+                current, used = [], prefix
+            current.append(text)
+            used += cost
+        if current:
+            yield current
+
+    # ----- Leitura da resposta -----
+
+    def normalize(self, answer: str):
+        """Rótulo válido contido em uma linha da resposta (ou None)."""
+        cleaned = answer.strip().strip("*\"'.").lower()
+        for label in self.labels:
+            if cleaned == label.lower() or cleaned.startswith(label.lower()):
+                return label
+        return None
+
+    def parse(self, response: str, size: int):
+        """
+        Lê as linhas numeradas da resposta.
+
+        Returns:
+            Lista de rótulos (None nos itens sem resposta válida), ou None se a
+            numeração não for confiável (repetida ou fora do lote)
+        """
+        labels = [None] * size
+        seen = set()
+        for line in str(response).splitlines():
+            match = _NUMBERED_LINE.match(line)
+            if not match:
+                continue
+            number = int(match.group(1))
+            if number in seen or not 1 <= number <= size:
+                return None
+            seen.add(number)
+            labels[number - 1] = self.normalize(match.group(2))
+        return labels
+
+    # ----- Execução -----
+
+    def _request(self, texts: list) -> str:
+        with self._lock:
+            self.requests += 1
+        return self.call(
+            self.render(texts),
+            system_prompt=self.system_prompt,
+            temperature=0,
+            examples=self._few_shot_turns(),
+            task="classify",
+            max_tokens=len(texts) * OUTPUT_TOKENS_PER_ITEM + 16,
+        )
+
+    def _classify_one(self, text: str):
+        with self._lock:
+            self.fallbacks += 1
+        if self.fallback is not None:
+            return self.fallback(text)
+        labels = self.parse(self._request([text]), 1)
+        return labels[0] if labels else None
+
+    def classify_batch(self, texts: list) -> list:
+        """Classifica um lote em uma requisição (com refações item a item)."""
+        labels = self.parse(self._request(texts), len(texts))
+        with self._lock:
+            if labels is None:
+                # Resposta embaralhada: refaz tudo e diminui os próximos lotes
+                self.batch_size = max(1, len(texts) // 2)
+            elif all(label is not None for label in labels):
+                self.batch_size = min(self.max_batch, self.batch_size * 2)
+        if labels is None:
+            labels = [None] * len(texts)
+
+        return [
+            label if label is not None else self._classify_one(text)
+            for text, label in zip(texts, labels)
+        ]
+
+    def classify_many(self, texts: list, workers: int = 1) -> list:
+        """
+        Classifica todos os textos, em lotes.
+
+        Com workers > 1, o próximo lote só é cortado quando um worker fica
+        livre: ele já usa o batch_size ajustado pelos lotes que terminaram.
+
+        Args:
+            texts: Textos a classificar
+            workers: Lotes enviados em paralelo (threads)
+
+        Returns:
+            Rótulos na ordem dos textos (None se nem a refação resolveu)
+        """
+        texts = list(texts)
+        self.items += len(texts)
+        if workers <= 1:
+            return [label for batch in self.iter_batches(texts) for label in self.classify_batch(batch)]
+
+        caller = current_caller()
+
+        def classify_batch(batch):
+            with caller_scope(caller):
+                return self.classify_batch(batch)
+
+        futures, running = [], set()
+        batches = self.iter_batches(texts)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                if len(running) >= workers:
+                    _, running = wait(running, return_when=FIRST_COMPLETED)
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                futures.append(executor.submit(classify_batch, batch))
+                running.add(futures[-1])
+        return [label for future in futures for label in future.result()]
+
+    def stats(self) -> dict:
+        return {
+            "items": self.items,
+            "requests": self.requests,
+            "fallbacks": self.fallbacks,
+            "batch_size": self.batch_size,
+        }
@@ -0,0 +1,296 @@
+"""
+=============================================================================
+CLIENTE DA OPENAI COMPARTILHADO: LAZY, TRANSPORTE AJUSTADO E AQUECIMENTO
+=============================================================================
+
+Importar o SDK e construir o cliente custa centenas de milissegundos, e a
+primeira requisição ainda paga o handshake TLS. Aqui:
+
+    - get_client()/get_async_client() só importam o SDK e criam o cliente
+      na primeira chamada (o menu aparece antes)
+    - Um único pool de conexões HTTP é compartilhado por main.py e
+      challenges.py, com keep-alive, limites, HTTP/2 e timeouts ajustáveis
+    - start_warm_up() abre a conexão em segundo plano enquanto o menu
+      espera a escolha do usuário (opt-in: LLM_WARMUP=1)
+    - pool_stats mostra quantas requisições reaproveitaram conexões
+
+Configuração do transporte (variáveis de ambiente, todas opcionais):
+    LLM_HTTP_MAX_CONNECTIONS=100     Conexões simultâneas no pool
+    LLM_HTTP_MAX_KEEPALIVE=20        Conexões ociosas mantidas abertas
+    LLM_HTTP_KEEPALIVE_EXPIRY=60     Segundos até fechar uma conexão ociosa
+    LLM_HTTP2=0                      HTTP/2 (requer: pip install h2)
+    LLM_HTTP_CONNECT_TIMEOUT=5       Timeout de conexão (segundos)
+    LLM_HTTP_READ_TIMEOUT=120        Timeout de leitura (segundos)
+=============================================================================
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+
+from llm.startup import startup
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI
+_lock = threading.Lock()
+
+
+def _env_enabled(name: str) -> bool:
+    return os.getenv(name, "0").lower() in ("1", "true", "yes", "on")
+
+
+# =============================================================================
+# TRANSPORTE HTTP
+# =============================================================================
+
+@dataclass
+class TransportConfig:
+    """Parâmetros do pool de conexões HTTP."""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = False
+    connect_timeout: float = 5.0
+    read_timeout: float = 120.0
+
+    @classmethod
+    def from_env(cls) -> "TransportConfig":
+        config = cls(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive_connections=int(
+                os.getenv("LLM_HTTP_MAX_KEEPALIVE", cls.max_keepalive_connections)
+            ),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", cls.keepalive_expiry)),
+            http2=_env_enabled("LLM_HTTP2"),
+            connect_timeout=float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", cls.connect_timeout)),
+            read_timeout=float(os.getenv("LLM_HTTP_READ_TIMEOUT", cls.read_timeout)),
+        )
+        if config.http2 and importlib.util.find_spec("h2") is None:
+            print("[aviso] LLM_HTTP2=1, mas o pacote 'h2' não está instalado; usando HTTP/1.1")
+            config.http2 = False
+        return config
+
+
+class PoolStats:
+    """
+    Contadores de uso do pool: requisições vs. conexões novas.
+
+    Usa a extensão "trace" do httpx, que avisa quando uma conexão TCP
+    (e o handshake TLS) é aberta. Requisições sem conexão nova
+    reaproveitaram uma conexão do pool.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+
+    def _on_event(self, name: str):
+        with self._lock:
+            if name == "connection.connect_tcp.complete":
+                self.connections_opened += 1
+            elif name == "connection.start_tls.complete":
+                self.tls_handshakes += 1
+
+    def _count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    # Ganchos do httpx (versões síncrona e assíncrona)
+
+    def on_request(self, request):
+        self._count_request()
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, name, info):
+        self._on_event(name)
+
+    async def on_request_async(self, request):
+        self._count_request()
+        request.extensions["trace"] = self._trace_async
+
+    async def _trace_async(self, name, info):
+        self._on_event(name)
+
+    @property
+    def reuse_rate(self) -> float:
+        if not self.requests:
+            return 0.0
+        return max(0.0, 1 - self.connections_opened / self.requests)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_rate": self.reuse_rate,
+            "open_connections": _open_connections(),
+        }
+
+
+pool_stats = PoolStats()
+
+
+def _httpx():
+    # O httpx vem como dependência do SDK da OpenAI
+    # (versões mais novas do SDK usam o fork httpx2)
+    try:
+        import httpx
+    except ImportError:
+        import httpx2 as httpx
+    return httpx
+
+
+def _transport_kwargs(config: TransportConfig) -> dict:
+    httpx = _httpx()
+    return {
+        "limits": httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+        "http2": config.http2,
+    }
+
+
+def create_http_client(config: TransportConfig = None):
+    """Cria o cliente HTTP síncrono com o transporte ajustado."""
+    from openai import DefaultHttpxClient
+
+    config = config or TransportConfig.from_env()
+    return DefaultHttpxClient(
+        **_transport_kwargs(config),
+        event_hooks={"request": [pool_stats.on_request]},
+    )
+
+
+def create_async_http_client(config: TransportConfig = None):
+    """Cria o cliente HTTP assíncrono com o transporte ajustado."""
+    from openai import DefaultAsyncHttpxClient
+
+    config = config or TransportConfig.from_env()
+    return DefaultAsyncHttpxClient(
+        **_transport_kwargs(config),
+        event_hooks={"request": [pool_stats.on_request_async]},
+    )
+
+
+def _open_connections():
+    """Conexões abertas agora nos pools (None se o httpx não expuser o dado)."""
+    clients = list(_async_clients.values())
+    if _client is not None:
+        clients.append(_client)
+    http_clients = [getattr(client, "_client", None) for client in clients]
+
+    total = 0
+    for http_client in http_clients:
+        pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return None
+        total += len(connections)
+    return total
+
+
+def print_pool_stats():
+    """Imprime o uso do pool de conexões se LLM_POOL_STATS=1."""
+    if not _env_enabled("LLM_POOL_STATS"):
+        return
+
+    stats = pool_stats.snapshot()
+    line = (
+        f"Pool HTTP: {stats['requests']} requisições, "
+        f"{stats['connections_opened']} conexões abertas "
+        f"({stats['tls_handshakes']} handshakes TLS) | "
+        f"reaproveitamento {stats['reuse_rate']:.0%}"
+    )
+    if stats["open_connections"] is not None:
+        line += f" | {stats['open_connections']} conexões no pool agora"
+    print(line)
+
+
+# =============================================================================
+# CLIENTES COMPARTILHADOS
+# =============================================================================
+
+
+def get_client():
+    """
+    Retorna o cliente síncrono compartilhado (criado na primeira chamada).
+
+    É a mesma instância para call_llm e run_prompt: um único pool de conexões.
+    """
+    global _client
+
+    if _client is None:
+        with _lock:
+            if _client is None:
+                start = time.perf_counter()
+                from openai import OpenAI
+
+                _client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    http_client=create_http_client(),
+                )
+                startup.record("client", time.perf_counter() - start)
+                startup.mark("client")
+    return _client
+
+
+def get_async_client():
+    """
+    Retorna o cliente assíncrono do event loop atual.
+
+    As conexões de um cliente assíncrono ficam presas ao loop em que foram
+    abertas; como cada asyncio.run() cria um loop novo, mantemos um
+    cliente por loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=create_async_http_client(),
+            )
+            _async_clients[loop] = client
+    return client
+
+
+def warm_up(model: str):
+    """
+    Cria o cliente e abre a conexão HTTP com uma requisição leve e gratuita
+    (consulta do modelo). Erros são ignorados: é só uma otimização.
+    """
+    client = get_client()
+    try:
+        client.with_options(max_retries=0, timeout=10).models.retrieve(model)
+    except Exception:
+        return
+    startup.mark("warmup")
+
+
+def start_warm_up(model: str):
+    """
+    Inicia o aquecimento em uma thread de fundo, se LLM_WARMUP=1.
+
+    Returns:
+        A thread iniciada, ou None se o aquecimento estiver desligado
+    """
+    if not _env_enabled("LLM_WARMUP"):
+        return None
+    # Reproduzindo um cassete em modo strict, nenhuma chamada vai para a rede
+    if os.getenv("LLM_CASSETTE_MODE", "off").lower() == "strict":
+        return None
+
+    thread = threading.Thread(target=warm_up, args=(model,), name="llm-warmup", daemon=True)
+    thread.start()
+    return thread
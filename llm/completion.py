@@ -0,0 +1,304 @@
+"""
+=============================================================================
+CAMINHO ÚNICO DE CHAMADA AO LLM
+=============================================================================
+
+call_llm, run_prompt e as versões assíncronas montam as mensagens de jeito
+didático e delegam a chamada para cá. Assim cache, limite de taxa, cliente
+compartilhado, streaming, cassete e métricas ficam em um só lugar:
+
+    mensagens -> cassete? -> cache? -> cache aproximado? -> single-flight
+              -> hedging? -> RateLimiter -> API -> métricas -> cache/cassete
+
+O prazo (deadline=segundos, ou LLM_DEADLINE) vale para a chamada inteira,
+incluindo novas tentativas e a requisição de reserva do hedging.
+
+Parâmetros extras da API (max_tokens, logit_bias, logprobs...) passam por
+`**params` e fazem parte da chave do cache e do cassete. Com logprobs=True,
+a resposta (um Completion, que é um str) traz também os logprobs.
+=============================================================================
+"""
+
+import json
+import time
+from functools import partial
+
+from llm.cache import get_response_cache, make_cache_key
+from llm.cassette import get_cassette
+from llm.client import get_async_client, get_client
+from llm.hedging import deadline_at, get_hedger
+from llm.metrics import current_caller, metrics
+from llm.ratelimit import get_rate_limiter
+from llm.router import observe_call
+from llm.semantic_cache import get_semantic_cache
+from llm.singleflight import get_single_flight
+from llm.streaming import TimedStream, iter_chunk_text
+
+
+class Completion(str):
+    """
+    Texto da resposta (funciona como um str comum) com os logprobs, se pedidos.
+
+    `logprobs` é uma lista com um item por token gerado:
+        {"token": "Pos", "logprob": -0.01, "top_logprobs": {"Pos": -0.01, "Neg": -4.7}}
+
+    Com n > 1, o texto é o da primeira amostra e `choices` traz todas.
+    """
+    logprobs = None
+    choices = None
+
+    @classmethod
+    def from_response(cls, response) -> "Completion":
+        choice = response.choices[0]
+        completion = cls(choice.message.content or "")
+        if len(response.choices) > 1:
+            completion.choices = [item.message.content or "" for item in response.choices]
+        content = getattr(choice.logprobs, "content", None)
+        if content is not None:
+            completion.logprobs = [
+                {
+                    "token": item.token,
+                    "logprob": item.logprob,
+                    "top_logprobs": {top.token: top.logprob for top in item.top_logprobs or ()},
+                }
+                for item in content
+            ]
+        return completion
+
+    def pack(self) -> str:
+        """Serializa para o cache/cassete (texto puro se não houver logprobs nem amostras)."""
+        if self.logprobs is None and self.choices is None:
+            return str(self)
+        data = {"text": str(self), "logprobs": self.logprobs}
+        if self.choices is not None:
+            data["choices"] = self.choices
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def unpack(cls, value: str, params: dict) -> "Completion":
+        if not params.get("logprobs") and (params.get("n") or 1) <= 1:
+            return cls(value)
+        try:
+            data = json.loads(value)
+        except ValueError:
+            return cls(value)  # gravado sem logprobs (ex.: em streaming)
+        completion = cls(data["text"])
+        completion.logprobs = data["logprobs"]
+        completion.choices = data.get("choices")
+        return completion
+
+
+def _lookup(model: str, messages: list, temperature: float, params: dict, caller: str):
+    """
+    Procura uma resposta pronta: primeiro no cassete, depois no cache.
+
+    Returns:
+        (cache, Completion ou None); o cache é None se estiver desligado
+    """
+    start = time.perf_counter()
+    cassette = get_cassette()
+    if cassette is not None:
+        value = cassette.play(model, messages, temperature, params)
+        if value is not None:
+            metrics.record(model, caller, "cassette", time.perf_counter() - start)
+            return None, Completion.unpack(value, params)
+
+    cache = get_response_cache()
+    value, source = None, "cache"
+    if cache is not None:
+        value = cache.get(model, messages, temperature, params)
+
+    # Pergunta parecida (não idêntica) já respondida no mesmo escopo
+    if value is None:
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None:
+            value, source = semantic_cache.get(model, messages, temperature, params), "semantic"
+    if value is None:
+        return cache, None
+
+    metrics.record(model, caller, source, time.perf_counter() - start)
+    # Respostas vindas do cache também entram no cassete
+    if cassette is not None:
+        cassette.record(model, messages, temperature, value, params)
+    return cache, Completion.unpack(value, params)
+
+
+def _store(model: str, messages: list, temperature: float, params: dict, cache, content):
+    """Guarda uma resposta nova da API nos caches e no cassete (se ligados)."""
+    value = content.pack() if isinstance(content, Completion) else content
+    if cache is not None:
+        cache.set(model, messages, temperature, value, params)
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        semantic_cache.set(model, messages, temperature, value, params)
+    cassette = get_cassette()
+    if cassette is not None:
+        cassette.record(model, messages, temperature, value, params)
+
+
+def _flight_key(model: str, messages: list, temperature: float, params: dict):
+    """Chave para compartilhar a chamada em andamento, ou None (temperature > 0 ou desligado)."""
+    if temperature or get_single_flight() is None:
+        return None
+    return make_cache_key(model, messages, temperature, params)
+
+
+def _on_stream_complete(model, messages, temperature, params, caller, cache, task, stream):
+    observe_call(model, stream.timing.total, task=task, params=params)
+    metrics.record(
+        model, caller, "api", stream.timing.total,
+        usage=stream.usage, ttft=stream.timing.ttft,
+    )
+    _store(model, messages, temperature, params, cache, stream.text)
+
+
+def complete(
+    messages: list,
+    model: str,
+    temperature: float,
+    stream: bool = False,
+    deadline: float = None,
+    task: str = None,
+    **params
+) -> Completion | TimedStream:
+    """
+    Envia as mensagens ao modelo e devolve o texto da resposta.
+
+    Args:
+        messages: Mensagens no formato da API (system/user/assistant)
+        model: Modelo a usar
+        temperature: Temperatura da amostragem
+        stream: Se True, devolve um TimedStream (texto em pedaços)
+        deadline: Prazo da chamada em segundos (None = LLM_DEADLINE, se definido)
+        task: Dica de tarefa usada na escolha do modelo (histórico do roteador)
+        **params: Parâmetros extras da API (ex.: max_tokens, logit_bias)
+
+    Returns:
+        Texto da resposta (Completion), ou TimedStream se stream=True
+    """
+    caller = current_caller()
+    deadline = deadline_at(deadline)
+    cache, content = _lookup(model, messages, temperature, params, caller)
+    if content is not None:
+        return TimedStream.from_text(content) if stream else content
+
+    # Streaming: o texto chega em pedaços (mede TTFT e tempo total);
+    # include_usage faz a API mandar o uso de tokens no último chunk
+    if stream:
+        timed = None
+
+        def open_stream():
+            response = get_rate_limiter().create(
+                get_client(),
+                deadline=deadline,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+                **params
+            )
+            return iter_chunk_text(response, on_usage=lambda usage: setattr(timed, "usage", usage))
+
+        timed = TimedStream(
+            open_stream,
+            on_complete=partial(
+                _on_stream_complete, model, messages, temperature, params, caller, cache, task
+            )
+        )
+        return timed
+
+    def request():
+        return get_rate_limiter().create(
+            get_client(),
+            deadline=deadline,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            **params
+        )
+
+    # Resposta demorando mais que o normal: uma requisição de reserva concorre
+    hedger = get_hedger()
+    if hedger is not None:
+        request = partial(hedger.run, model, request, deadline)
+
+    def fetch():
+        response = request()
+        # Grava ainda dentro do single-flight: quem chegar depois acha no cache
+        _store(model, messages, temperature, params, cache, Completion.from_response(response))
+        return response
+
+    # Requisição idêntica já em andamento em outra thread ou task: espera por ela
+    key = _flight_key(model, messages, temperature, params)
+    start = time.perf_counter()
+    try:
+        response, shared = get_single_flight().do(key, fetch, deadline) if key else (fetch(), False)
+    except Exception:
+        observe_call(model, time.perf_counter() - start, ok=False, task=task, params=params)
+        metrics.record(model, caller, "error", time.perf_counter() - start)
+        raise
+
+    content = Completion.from_response(response)
+    if shared:
+        metrics.record(model, caller, "coalesced", time.perf_counter() - start)
+        return content
+    observe_call(model, time.perf_counter() - start, task=task, params=params)
+    metrics.record(model, caller, "api", time.perf_counter() - start, usage=response.usage)
+    return content
+
+
+async def acomplete(
+    messages: list,
+    model: str,
+    temperature: float,
+    deadline: float = None,
+    task: str = None,
+    **params
+) -> Completion:
+    """Versão assíncrona de complete (sem streaming)."""
+    caller = current_caller()
+    deadline = deadline_at(deadline)
+    cache, content = _lookup(model, messages, temperature, params, caller)
+    if content is not None:
+        return content
+
+    def request():
+        return get_rate_limiter().acreate(
+            get_async_client(),
+            deadline=deadline,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            **params
+        )
+
+    hedger = get_hedger()
+    if hedger is not None:
+        request = partial(hedger.arun, model, request, deadline)
+
+    async def fetch():
+        response = await request()
+        _store(model, messages, temperature, params, cache, Completion.from_response(response))
+        return response
+
+    # Requisição idêntica já em andamento em outra task ou thread: espera por ela
+    key = _flight_key(model, messages, temperature, params)
+    start = time.perf_counter()
+    try:
+        if key:
+            response, shared = await get_single_flight().ado(key, fetch, deadline)
+        else:
+            response, shared = await fetch(), False
+    except Exception:
+        observe_call(model, time.perf_counter() - start, ok=False, task=task, params=params)
+        metrics.record(model, caller, "error", time.perf_counter() - start)
+        raise
+
+    content = Completion.from_response(response)
+    if shared:
+        metrics.record(model, caller, "coalesced", time.perf_counter() - start)
+        return content
+    observe_call(model, time.perf_counter() - start, task=task, params=params)
+    metrics.record(model, caller, "api", time.perf_counter() - start, usage=response.usage)
+    return content
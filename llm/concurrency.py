@@ -0,0 +1,85 @@
+"""
+=============================================================================
+EXECUÇÃO CONCORRENTE DE PROMPTS (asyncio)
+=============================================================================
+
+call_llm/run_prompt bloqueiam uma requisição por vez. Com as versões
+assíncronas (acall_llm/arun_prompt) é possível disparar muitas chamadas ao
+mesmo tempo; gather_prompts faz isso com um limite de concorrência e
+devolve os resultados na mesma ordem da entrada.
+
+Exemplo:
+    from main import acall_llm
+    from llm.concurrency import gather_prompts_sync
+
+    textos = ["Amei!", "Travou tudo.", "Ok."]
+    rotulos = gather_prompts_sync(
+        acall_llm, textos, concurrency=10, system_prompt="Classifique..."
+    )
+=============================================================================
+"""
+
+import asyncio
+
+from llm.metrics import caller_scope, current_caller
+
+DEFAULT_CONCURRENCY = 8
+
+
+async def gather_prompts(
+    call,
+    prompts: list,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    return_exceptions: bool = False,
+    **common_kwargs
+) -> list:
+    """
+    Executa uma função assíncrona sobre vários prompts, com concorrência limitada.
+
+    Args:
+        call: Função assíncrona no formato de acall_llm/arun_prompt
+        prompts: Lista de prompts. Cada item pode ser uma string (o prompt)
+                 ou um dict com os argumentos da chamada (ex.: {"prompt": ...,
+                 "system_prompt": ..., "temperature": ...})
+        concurrency: Número máximo de chamadas em andamento ao mesmo tempo
+        return_exceptions: Se True, erros viram itens da lista de resultados
+                          em vez de interromper tudo
+        **common_kwargs: Argumentos repassados a todas as chamadas
+                        (ex.: system_prompt compartilhado)
+
+    Returns:
+        Lista de resultados na mesma ordem de `prompts`
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency deve ser >= 1")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(item):
+        kwargs = dict(common_kwargs)
+        if isinstance(item, dict):
+            kwargs.update(item)
+        else:
+            kwargs["prompt"] = item
+
+        async with semaphore:
+            return await call(**kwargs)
+
+    tasks = [asyncio.ensure_future(run_one(item)) for item in prompts]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    finally:
+        # Em caso de erro, não deixa chamadas órfãs rodando
+        for task in tasks:
+            task.cancel()
+
+
+def gather_prompts_sync(call, prompts: list, **kwargs) -> list:
+    """
+    Atalho síncrono para gather_prompts (para uso fora de código async).
+
+    Aceita os mesmos argumentos de gather_prompts.
+    """
+    # As métricas das chamadas ficam atribuídas a quem chamou esta função
+    with caller_scope(current_caller()):
+        return asyncio.run(gather_prompts(call, prompts, **kwargs))
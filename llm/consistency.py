@@ -0,0 +1,266 @@
+"""
+=============================================================================
+SELF-CONSISTENCY: VOTAÇÃO ENTRE RACIOCÍNIOS COM PARADA ANTECIPADA
+=============================================================================
+
+Uma única resposta com chain-of-thought pode errar uma conta no meio do
+caminho. Self-consistency amostra vários raciocínios (temperature > 0),
+extrai a resposta numérica final de cada um e fica com a mais votada.
+
+Votar com muitas amostras custa caro; na maioria das perguntas as
+primeiras já concordam. Por isso as amostras vêm em lotes (um lote = uma
+requisição com o parâmetro `n` da API) e a votação para assim que a
+maioria está estatisticamente decidida:
+
+    Com a contagem do 1º colocado (a) e do 2º (b), a chance de o 1º ser
+    de fato o mais provável é P(p1 > p2) = P(Beta(a+1, b+1) > 0.5).
+    Para quando essa chance passa de `confidence` (padrão: 95%) ou
+    quando as amostras restantes não conseguem mais virar o resultado.
+
+Com 4 amostras unânimes a votação já termina; só perguntas com
+divergência usam o orçamento todo (max_samples).
+
+    votacao = SelfConsistency(call_llm)
+    resultado = votacao.solve("Quanto é 17 * 24 + 38?", system_prompt=tutor)
+    print(resultado.answer, resultado.samples)   # 446 4
+=============================================================================
+"""
+
+import math
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from llm.metrics import caller_scope, current_caller, last_usage
+
+DEFAULT_MIN_SAMPLES = 4     # 1º lote (4 unânimes bastam com 95% de confiança)
+DEFAULT_STEP = 2            # lotes seguintes
+DEFAULT_MAX_SAMPLES = 16
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_TEMPERATURE = 0.7
+
+# Números em pt-BR e en: 1.234,5 | 1,234.5 | 446 | -3,5 | 0.25
+_NUMBER = re.compile(r"-?\d{1,3}(?:[.,]\d{3})+(?:[.,]\d+)?|-?\d+(?:[.,]\d+)?")
+# Depois destas palavras vem a resposta final ("logo" e "total" ficam de fora:
+# aparecem no meio das contas, "Logo, 17*24 = 408 e ...")
+_MARKERS = re.compile(r"resposta|resultado|answer|portanto", re.IGNORECASE)
+# Fim da frase: pontuação seguida de espaço (não "3.5") ou quebra de linha
+_SENTENCE_END = re.compile(r"[.!?;](?=\s|$)|\n")
+_PARENTHESES = re.compile(r"\([^)]*\)")
+
+
+def _parse_number(text: str) -> str:
+    """Normaliza um número (pt-BR ou en) para comparação: "1.234,0" -> "1234"."""
+    if "." in text and "," in text:
+        decimal = "." if text.rfind(".") > text.rfind(",") else ","
+    elif re.fullmatch(r"-?[1-9]\d{0,2}(?:[.,]\d{3})+", text):
+        decimal = None  # 1.234 / 1,234 / 12.345.678: separador de milhar
+    else:
+        decimal = "," if "," in text else "."
+    digits = re.sub(r"[.,]", lambda m: "." if m.group() == decimal else "", text)
+    value = float(digits)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def extract_number(text: str) -> str:
+    """
+    Resposta numérica final de um raciocínio, normalizada (ou None).
+
+    Procura na frase da última menção a "resposta", "resultado",
+    "portanto"...: o número depois do último "=" ("Portanto, 84 - 15 = 69"
+    -> 69) ou, sem conta, o último número da frase. Com a frase sem número
+    ("Resposta:" e o valor na linha de baixo), o primeiro número depois da
+    menção; sem menção, o último número do texto.
+    """
+    text = text.replace("**", "")
+    markers = list(_MARKERS.finditer(text))
+    if markers:
+        start = markers[-1].end()
+        end = _SENTENCE_END.search(text, start)
+        # Parênteses costumam conferir a conta: "446 (17*24 = 408 + 38)"
+        sentence = _PARENTHESES.sub("", text[start:end.start() if end else len(text)])
+        if "=" in sentence:
+            sentence = sentence[sentence.rindex("=") + 1:]
+            numbers = _NUMBER.findall(sentence)[:1]
+        else:
+            numbers = _NUMBER.findall(sentence)
+        if numbers:
+            return _parse_number(numbers[-1])
+        match = _NUMBER.search(text, start)
+        if match:
+            return _parse_number(match.group())
+    numbers = _NUMBER.findall(text)
+    return _parse_number(numbers[-1]) if numbers else None
+
+
+def leader_confidence(leader: int, runner_up: int) -> float:
+    """
+    P(Beta(leader+1, runner_up+1) > 0.5): chance de o 1º colocado ser o mais provável.
+
+    Para parâmetros inteiros, a cauda da Beta é uma soma binomial:
+    P(Beta(a+1, b+1) > 0.5) = P(Binomial(a+b+1, 0.5) <= a).
+    """
+    trials = leader + runner_up + 1
+    return sum(math.comb(trials, k) for k in range(leader + 1)) / 2 ** trials
+
+
+@dataclass
+class VoteResult:
+    """Resultado da votação de uma pergunta."""
+    question: str
+    answer: str                     # resposta mais votada (None se nenhuma amostra tinha número)
+    votes: dict                     # resposta -> votos
+    samples: int                    # amostras usadas
+    max_samples: int
+    confidence: float               # P(a mais votada ser de fato a mais provável)
+    requests: int = 0
+    tokens: int = 0
+    elapsed: float = 0.0
+    reasonings: list = field(default_factory=list, repr=False)
+
+    @property
+    def stopped_early(self) -> bool:
+        return self.samples < self.max_samples
+
+    def summary(self) -> str:
+        votes = ", ".join(f"{answer}: {total}" for answer, total in
+                          sorted(self.votes.items(), key=lambda item: -item[1]))
+        answer = self.answer if self.answer is not None else "sem resposta numérica"
+        return (
+            f"{answer} ({self.samples}/{self.max_samples} amostras, "
+            f"{self.confidence:.0%} de confiança, votos: {votes or '-'}, "
+            f"{self.tokens} tokens, {self.elapsed:.2f}s)"
+        )
+
+
+class SelfConsistency:
+    """
+    Votação entre raciocínios amostrados, com parada antecipada.
+
+    Args:
+        call: Função no formato de call_llm/run_prompt (aceita n= e temperature=)
+        min_samples: Amostras do primeiro lote
+        step: Amostras de cada lote seguinte
+        max_samples: Orçamento máximo de amostras por pergunta
+        confidence: Confiança na maioria para parar
+        temperature: Temperature das amostras (precisa variar o raciocínio)
+        extract: Função texto -> resposta (None = sem resposta, não vota)
+    """
+
+    def __init__(
+        self,
+        call,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        step: int = DEFAULT_STEP,
+        max_samples: int = DEFAULT_MAX_SAMPLES,
+        confidence: float = DEFAULT_CONFIDENCE,
+        temperature: float = DEFAULT_TEMPERATURE,
+        extract=extract_number
+    ):
+        self.call = call
+        self.min_samples = min_samples
+        self.step = step
+        self.max_samples = max_samples
+        self.confidence = confidence
+        self.temperature = temperature
+        self.extract = extract
+
+    def _sample(self, prompt: str, count: int, **kwargs) -> tuple:
+        """
+        `count` raciocínios em uma requisição (parâmetro n).
+
+        Se vierem menos amostras que o pedido (ex.: provedor sem suporte a
+        n), o restante é pedido em chamadas simples, em paralelo.
+
+        Returns:
+            (textos, requisições, tokens)
+        """
+        response = self.call(prompt, temperature=self.temperature, n=count, **kwargs)
+        texts = list(response.choices or [response])
+        usage = last_usage()
+        tokens = usage.total_tokens if usage is not None else 0
+        requests = 1
+
+        missing = count - len(texts)
+        if missing > 0:
+            # Threads do pool não herdam o contexto: as métricas ficam com quem chamou
+            caller = current_caller()
+
+            def single(_):
+                with caller_scope(caller):
+                    text = self.call(prompt, temperature=self.temperature, **kwargs)
+                    usage = last_usage()
+                return text, usage.total_tokens if usage is not None else 0
+
+            with ThreadPoolExecutor(max_workers=missing) as executor:
+                for text, used in executor.map(single, range(missing)):
+                    texts.append(text)
+                    tokens += used
+            requests += missing
+        return texts[:count], requests, tokens
+
+    def _settled(self, votes: Counter, remaining: int) -> tuple:
+        """(decidido?, confiança) a partir dos votos até agora."""
+        ranked = [total for _, total in votes.most_common(2)] + [0, 0]
+        leader, runner_up = ranked[0], ranked[1]
+        confidence = leader_confidence(leader, runner_up) if leader else 0.0
+        # As amostras que faltam não alcançam mais o 1º colocado
+        unbeatable = leader - runner_up > remaining
+        return leader > 0 and (confidence >= self.confidence or unbeatable), confidence
+
+    def solve(self, prompt: str, **kwargs) -> VoteResult:
+        """
+        Vota entre raciocínios para uma pergunta.
+
+        Args:
+            prompt: A pergunta
+            **kwargs: Repassados para a chamada (ex.: system_prompt)
+        """
+        start = time.perf_counter()
+        votes = Counter()
+        reasonings = []
+        requests = tokens = 0
+        confidence = 0.0
+
+        while len(reasonings) < self.max_samples:
+            batch = self.min_samples if not reasonings else self.step
+            batch = min(batch, self.max_samples - len(reasonings))
+            texts, used_requests, used_tokens = self._sample(prompt, batch, **kwargs)
+            requests += used_requests
+            tokens += used_tokens
+            for text in texts:
+                reasonings.append(text)
+                answer = self.extract(text)
+                if answer is not None:
+                    votes[answer] += 1
+
+            settled, confidence = self._settled(votes, self.max_samples - len(reasonings))
+            if settled:
+                break
+
+        return VoteResult(
+            question=prompt,
+            answer=votes.most_common(1)[0][0] if votes else None,
+            votes=dict(votes),
+            samples=len(reasonings),
+            max_samples=self.max_samples,
+            confidence=confidence,
+            requests=requests,
+            tokens=tokens,
+            elapsed=time.perf_counter() - start,
+            reasonings=reasonings,
+        )
+
+    def solve_many(self, prompts: list, workers: int = 4, **kwargs) -> list:
+        """Várias perguntas ao mesmo tempo (resultados na ordem de `prompts`)."""
+        # As métricas das threads ficam atribuídas à demo que chamou solve_many
+        caller = current_caller()
+
+        def solve(prompt):
+            with caller_scope(caller):
+                return self.solve(prompt, **kwargs)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(solve, prompts))
@@ -0,0 +1,183 @@
+"""
+=============================================================================
+BANCO DE EXEMPLOS COM BUSCA POR SIMILARIDADE (FEW-SHOT DINÂMICO)
+=============================================================================
+
+Exemplos fixos no prompt têm um custo: cada exemplo a mais é pago em toda
+chamada. Com um banco de exemplos rotulados, cada texto recebe só os k
+exemplos mais parecidos com ele:
+
+    banco (centenas de exemplos) -> top-k por similaridade -> prompt curto
+
+O índice é uma matriz NumPy de vetores TF-IDF sobre n-gramas com hashing
+(palavras e trigramas de caracteres, sem vocabulário a manter). A busca de
+muitos textos de uma vez é um único produto de matrizes:
+
+    similaridades = consultas (m x d) @ exemplos.T (d x n)
+
+Os exemplos escolhidos mudam a cada texto, então o prefixo fixo do prompt
+passa a ser só o system prompt (menos reaproveitamento do cache de prefixo
+da API, em troca de prompts bem menores com bancos grandes).
+
+Exemplo:
+    banco = ExampleStore([("Amei!", "Positivo"), ("Travou.", "Negativo"), ...])
+    banco.search(["Adorei o app", "Não abre"], k=3)   # uma lista de exemplos por texto
+=============================================================================
+"""
+
+import json
+import re
+import threading
+import zlib
+
+# numpy é importado dentro dos métodos: só quem usa o banco paga o import
+# (~90 ms), e não todo `import main`
+
+DEFAULT_DIMENSIONS = 2 ** 11
+DEFAULT_K = 3
+
+_WORD = re.compile(r"\w+")
+
+
+def _features(text: str) -> list:
+    """Palavras e trigramas de caracteres (robustos a flexões: "travou"/"travando")."""
+    features = []
+    for word in _WORD.findall(text.lower()):
+        features.append("w:" + word)
+        padded = f" {word} "
+        features += ["c:" + padded[i:i + 3] for i in range(len(padded) - 2)]
+    return features
+
+
+def _bucket(feature: str, dimensions: int) -> int:
+    # crc32 é estável entre execuções (hash() do Python muda a cada processo)
+    return zlib.crc32(feature.encode("utf-8")) % dimensions
+
+
+class ExampleStore:
+    """
+    Exemplos rotulados indexados para busca dos k mais parecidos.
+
+    Args:
+        examples: Pares (texto, rótulo)
+        dimensions: Tamanho dos vetores (buckets do hashing)
+    """
+
+    def __init__(self, examples: list = None, dimensions: int = DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+        self.examples = []
+        self._counts = None   # exemplos x dimensões, frequências brutas
+        self._matrix = None   # exemplos x dimensões, TF-IDF normalizado
+        self._idf = None
+        self._lock = threading.Lock()
+        self.extend(examples or [])
+
+    def __len__(self) -> int:
+        return len(self.examples)
+
+    @classmethod
+    def from_jsonl(cls, path: str, **kwargs) -> "ExampleStore":
+        """Carrega de um JSONL com {"text": ..., "label": ...} por linha."""
+        examples = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    examples.append((entry["text"], entry["label"]))
+        return cls(examples, **kwargs)
+
+    def _count(self, texts: list):
+        import numpy as np
+
+        counts = np.zeros((len(texts), self.dimensions), dtype=np.uint16)
+        for row, text in enumerate(texts):
+            for feature in _features(text):
+                counts[row, _bucket(feature, self.dimensions)] += 1
+        return counts
+
+    def _weigh(self, counts):
+        import numpy as np
+
+        # TF sublinear x IDF, normalizado: o produto escalar vira cosseno
+        vectors = np.log1p(counts, dtype=np.float32) * self._idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def extend(self, examples: list):
+        """Acrescenta exemplos e recalcula o IDF e a matriz do índice."""
+        examples = [(text, label) for text, label in examples]
+        if not examples:
+            return
+        import numpy as np
+
+        counts = self._count([text for text, _ in examples])
+        with self._lock:
+            self.examples += examples
+            self._counts = counts if self._counts is None else np.vstack([self._counts, counts])
+            total = len(self.examples)
+            frequency = np.count_nonzero(self._counts, axis=0)
+            self._idf = (np.log((1 + total) / (1 + frequency)) + 1).astype(np.float32)
+            self._matrix = self._weigh(self._counts)
+
+    def add(self, text: str, label: str):
+        self.extend([(text, label)])
+
+    def search(self, texts: list, k: int = DEFAULT_K) -> list:
+        """
+        Os k exemplos mais parecidos com cada texto, em uma única busca.
+
+        Returns:
+            Uma lista por texto com (texto, rótulo, similaridade), do menos para
+            o mais parecido: o exemplo mais próximo fica colado na entrada
+        """
+        if not texts:
+            return []
+        import numpy as np
+
+        with self._lock:
+            if not self.examples:
+                return [[] for _ in texts]
+            k = min(k, len(self.examples))
+            scores = self._weigh(self._count(texts)) @ self._matrix.T
+
+            # argpartition pega os k maiores sem ordenar o banco inteiro
+            if k < scores.shape[1]:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.tile(np.arange(k), (len(texts), 1))
+            results = []
+            for row, indexes in enumerate(top):
+                ordered = sorted(indexes, key=lambda index: scores[row, index])
+                results.append([
+                    (*self.examples[index], float(scores[row, index])) for index in ordered
+                ])
+            return results
+
+    def nearest(self, text: str, k: int = DEFAULT_K) -> list:
+        """Pares (texto, rótulo) mais parecidos com um texto."""
+        return [(example, label) for example, label, _ in self.search([text], k)[0]]
+
+    def few_shot(self, texts: list, k: int = DEFAULT_K, template: str = "{text}") -> list:
+        """
+        Exemplos de few-shot prontos para call_llm/run_prompt, um conjunto por texto.
+
+        Args:
+            texts: Textos a classificar
+            k: Exemplos por texto
+            template: Formato da entrada de cada exemplo (ex.: 'Texto: "{text}"')
+        """
+        return [
+            [(template.format(text=example), label) for example, label, _ in found]
+            for found in self.search(texts, k)
+        ]
+
+    def stats(self) -> dict:
+        labels = {}
+        for _, label in self.examples:
+            labels[label] = labels.get(label, 0) + 1
+        return {
+            "examples": len(self.examples),
+            "labels": labels,
+            "dimensions": self.dimensions,
+            "index_mb": round(self._matrix.nbytes / 2 ** 20, 2) if self._matrix is not None else 0.0,
+        }
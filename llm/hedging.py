@@ -0,0 +1,283 @@
+"""
+=============================================================================
+PRAZOS POR CHAMADA E REQUISIÇÕES DE RESERVA (HEDGING)
+=============================================================================
+
+Uma resposta lenta trava um pipeline inteiro (demo 4, desafio 4). Duas
+ferramentas para a cauda de latência:
+
+Prazo (deadline)
+    call_llm(..., deadline=10) limita a chamada inteira, com novas
+    tentativas e esperas do limite de taxa: cada tentativa recebe só o
+    tempo que resta. Estourou, a chamada termina com DeadlineExceeded.
+
+Hedging (requisição de reserva)
+    Se a resposta passar do percentil p95 (aprendido com as chamadas
+    recentes do mesmo modelo), uma segunda requisição igual é disparada.
+    A primeira resposta que chegar vence; a outra é cancelada (em asyncio
+    a requisição HTTP é interrompida; em threads, o resultado é descartado).
+
+    O orçamento limita as reservas a uma fração do tráfego (padrão: 5%):
+    nunca há mais reservas do que budget x chamadas.
+
+Configuração via variáveis de ambiente:
+    LLM_DEADLINE=30            Prazo padrão por chamada, em segundos (padrão: sem prazo)
+    LLM_HEDGE=1                Liga o hedging (padrão: desligado)
+    LLM_HEDGE_PERCENTILE=95    Percentil da latência que dispara a reserva
+    LLM_HEDGE_BUDGET=0.05      Fração máxima de chamadas com reserva
+    LLM_HEDGE_MIN_SAMPLES=20   Chamadas observadas antes de começar a disparar
+
+Para ver o efeito no p99 sem rede:
+    python -m llm.benchmark --scenarios hedging
+=============================================================================
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from llm.metrics import percentile
+
+DEFAULT_PERCENTILE = 95
+DEFAULT_BUDGET = 0.05
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_WINDOW = 200
+MIN_DELAY = 0.01  # nunca dispara a reserva antes disto (segundos)
+# Threads para as requisições com reserva (criadas sob demanda): cada
+# chamada ocupa uma ou duas, então o pool precisa acompanhar os workers
+MAX_THREADS = 256
+
+
+class DeadlineExceeded(TimeoutError):
+    """A chamada não terminou dentro do prazo."""
+
+
+def deadline_at(seconds: float = None) -> float:
+    """
+    Instante (time.monotonic) em que o prazo acaba, ou None (sem prazo).
+
+    Args:
+        seconds: Prazo da chamada (None = LLM_DEADLINE, se definido)
+    """
+    if seconds is None:
+        value = os.getenv("LLM_DEADLINE")
+        seconds = float(value) if value else None
+    return None if seconds is None else time.monotonic() + seconds
+
+
+def time_left(deadline: float) -> float:
+    """
+    Segundos que restam até o prazo (None se não houver prazo).
+
+    Raises:
+        DeadlineExceeded: Se o prazo já acabou
+    """
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("Prazo da chamada esgotado")
+    return left
+
+
+class Hedger:
+    """
+    Dispara uma requisição de reserva quando a primeira demora demais.
+
+    Args:
+        percentile: Percentil da latência recente que dispara a reserva
+        budget: Fração máxima de chamadas com reserva
+        min_samples: Latências observadas (por modelo) antes de disparar
+        window: Latências recentes guardadas por modelo
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_PERCENTILE,
+        budget: float = DEFAULT_BUDGET,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        window: int = DEFAULT_WINDOW
+    ):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        self._executor = None
+
+        self.calls = 0
+        self.hedged = 0        # reservas disparadas
+        self.hedge_wins = 0    # reservas que responderam primeiro
+        self.denied = 0        # reservas barradas pelo orçamento
+
+    # ----- Latência aprendida e orçamento -----
+
+    def observe(self, model: str, latency: float):
+        with self._lock:
+            self._latencies[model].append(latency)
+
+    def delay(self, model: str) -> float:
+        """Espera antes da reserva (o percentil recente), ou None se há poucos dados."""
+        with self._lock:
+            latencies = list(self._latencies[model])
+        if len(latencies) < self.min_samples:
+            return None
+        return max(MIN_DELAY, percentile(latencies, self.percentile))
+
+    def _start_call(self, model: str) -> float:
+        with self._lock:
+            self.calls += 1
+        return self.delay(model)
+
+    def _allow_hedge(self) -> bool:
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.calls:
+                self.denied += 1
+                return False
+            self.hedged += 1
+            return True
+
+    # ----- Threads -----
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix="hedge")
+            return self._executor
+
+    def run(self, model: str, fn, deadline: float = None):
+        """
+        Executa fn() com reserva, se demorar mais que o percentil aprendido.
+
+        Args:
+            model: Modelo da chamada (a latência é aprendida por modelo)
+            fn: Função sem argumentos que faz a requisição
+            deadline: Prazo (time.monotonic) para esperar as respostas
+        """
+        delay = self._start_call(model)
+        start = time.perf_counter()
+        if delay is None:
+            result = fn()
+            self.observe(model, time.perf_counter() - start)
+            return result
+
+        pool = self._pool()
+        primary = pool.submit(fn)
+        done, _ = wait([primary], timeout=min(delay, time_left(deadline) or delay))
+        futures = [primary]
+        if not done and self._allow_hedge():
+            futures.append(pool.submit(fn))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=time_left(deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                raise DeadlineExceeded("Prazo da chamada esgotado")
+            for future in done:
+                if future.exception() is None:
+                    # Perdedora: cancela se ainda não começou; senão o resultado é descartado
+                    for other in pending:
+                        other.cancel()
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    self.observe(model, time.perf_counter() - start)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    # ----- asyncio -----
+
+    async def arun(self, model: str, coroutine_fn, deadline: float = None):
+        """Versão assíncrona de run(): a requisição perdedora é cancelada."""
+        delay = self._start_call(model)
+        start = time.perf_counter()
+        if delay is None:
+            result = await coroutine_fn()
+            self.observe(model, time.perf_counter() - start)
+            return result
+
+        primary = asyncio.ensure_future(coroutine_fn())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=min(delay, time_left(deadline) or delay))
+            if not done and self._allow_hedge():
+                tasks.append(asyncio.ensure_future(coroutine_fn()))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=time_left(deadline), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise DeadlineExceeded("Prazo da chamada esgotado")
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        self.observe(model, time.perf_counter() - start)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # A perdedora (ou todas, se o prazo acabou) é cancelada de verdade
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "denied": self.denied,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+        }
+
+
+# =============================================================================
+# INSTÂNCIA COMPARTILHADA
+# =============================================================================
+
+_default_hedger = None
+_default_hedger_lock = threading.Lock()
+
+
+def hedging_enabled() -> bool:
+    return os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes", "on")
+
+
+def get_hedger():
+    """Retorna o hedger padrão, ou None se LLM_HEDGE não estiver ligado."""
+    global _default_hedger
+
+    if not hedging_enabled():
+        return None
+
+    with _default_hedger_lock:
+        if _default_hedger is None:
+            _default_hedger = Hedger(
+                percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", DEFAULT_PERCENTILE)),
+                budget=float(os.getenv("LLM_HEDGE_BUDGET", DEFAULT_BUDGET)),
+                min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", DEFAULT_MIN_SAMPLES)),
+            )
+        return _default_hedger
+
+
+def print_hedge_stats():
+    """Imprime o resumo do hedging (apenas se estiver ligado)."""
+    if _default_hedger is None:
+        return
+    stats = _default_hedger.stats()
+    print(
+        f"Hedging: {stats['hedged']} reservas em {stats['calls']} chamadas "
+        f"({stats['hedge_rate']:.1%}), {stats['hedge_wins']} responderam primeiro, "
+        f"{stats['denied']} barradas pelo orçamento"
+    )
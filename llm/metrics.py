@@ -0,0 +1,339 @@
+"""
+=============================================================================
+MÉTRICAS POR CHAMADA (LATÊNCIA E TOKENS)
+=============================================================================
+
+Toda chamada de call_llm/run_prompt (e das versões async) registra:
+
+    - latência (e TTFT, quando em streaming)
+    - tokens de prompt, de completion e em cache (prompt caching da API)
+    - modelo, origem (api/cache/erro) e a demo/desafio que fez a chamada
+
+Os valores vão para histogramas em memória, que podem ser exportados em
+formato Prometheus (texto) ou JSON. Ao sair do menu, um resumo com
+p50/p95/p99 é impresso.
+
+Para gravar as métricas em arquivo ao sair do menu:
+    LLM_METRICS_FILE=metricas.prom   (ou metricas.json)
+=============================================================================
+"""
+
+import contextvars
+import json
+import math
+import os
+import sys
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+
+# Quantas amostras recentes guardar por série para calcular percentis
+MAX_SAMPLES = 10_000
+
+# Nome da demo/desafio que está fazendo chamadas (propaga para tarefas async)
+_caller = contextvars.ContextVar("llm_caller", default=None)
+
+# `usage` da última chamada feita neste contexto (thread ou tarefa async)
+_last_usage = contextvars.ContextVar("llm_last_usage", default=None)
+
+
+@contextmanager
+def caller_scope(name: str):
+    """Atribui as chamadas feitas dentro do bloco a `name`."""
+    token = _caller.set(name)
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+def current_caller() -> str:
+    """
+    Descobre quem está chamando o LLM.
+
+    Usa o nome definido por caller_scope; sem ele, procura na pilha a
+    função demo_*/desafio_* mais próxima.
+    """
+    name = _caller.get()
+    if name:
+        return name
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_name.startswith(("demo_", "desafio_")):
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return "-"
+
+
+def last_usage():
+    """`usage` da última chamada feita nesta thread/tarefa (None se não veio da API)."""
+    return _last_usage.get()
+
+
+def cached_tokens(usage) -> int:
+    """Tokens de entrada servidos pelo cache de prefixo da API."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+def format_usage(usage) -> str:
+    """Resumo de uma chamada: tokens de prompt, quantos vieram do cache e de saída."""
+    if usage is None:
+        return "sem chamada à API (cache/cassete)"
+    cached = cached_tokens(usage)
+    rate = cached / usage.prompt_tokens if usage.prompt_tokens else 0.0
+    return (
+        f"{usage.prompt_tokens} tokens de prompt ({cached} em cache, {rate:.0%}) | "
+        f"{usage.completion_tokens} de saída"
+    )
+
+
+def percentile(values, q: float) -> float:
+    """Percentil por interpolação linear (q entre 0 e 100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    position = (len(ordered) - 1) * q / 100
+    low, high = math.floor(position), math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Histogram:
+    """
+    Histograma com buckets cumulativos (estilo Prometheus), separado por labels.
+
+    Também guarda as últimas amostras de cada série para percentis exatos.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.series = {}  # labels (tupla ordenada) -> dados da série
+
+    def observe(self, value: float, labels: dict):
+        key = tuple(sorted(labels.items()))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {
+                "counts": [0] * len(self.buckets),
+                "sum": 0.0,
+                "count": 0,
+                "samples": deque(maxlen=MAX_SAMPLES),
+            }
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["counts"][i] += 1
+        series["sum"] += value
+        series["count"] += 1
+        series["samples"].append(value)
+
+    def samples(self, **filters) -> list:
+        """Amostras de todas as séries que batem com os filtros de label."""
+        values = []
+        for key, series in self.series.items():
+            labels = dict(key)
+            if all(labels.get(k) == v for k, v in filters.items()):
+                values.extend(series["samples"])
+        return values
+
+    def total(self, **filters) -> float:
+        """Soma de todos os valores observados nas séries que batem com os filtros."""
+        return sum(
+            series["sum"] for key, series in self.series.items()
+            if all(dict(key).get(k) == v for k, v in filters.items())
+        )
+
+    def to_prometheus(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self.series.items():
+            labels = ",".join(f'{k}="{v}"' for k, v in key)
+            sep = "," if labels else ""
+            for bound, count in zip(self.buckets, series["counts"]):
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series["count"]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series['sum']}")
+            lines.append(f"{self.name}_count{{{labels}}} {series['count']}")
+        return lines
+
+    def to_json(self) -> list:
+        result = []
+        for key, series in self.series.items():
+            samples = list(series["samples"])
+            result.append({
+                "labels": dict(key),
+                "count": series["count"],
+                "sum": series["sum"],
+                "buckets": dict(zip(map(str, self.buckets), series["counts"])),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "p99": percentile(samples, 99),
+            })
+        return result
+
+
+class Metrics:
+    """Registro de métricas de todas as chamadas ao LLM do processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = Histogram(
+            "llm_request_duration_seconds", "Latência de cada chamada ao LLM.", LATENCY_BUCKETS
+        )
+        self.ttft = Histogram(
+            "llm_time_to_first_token_seconds", "Tempo até o primeiro token (streaming).",
+            LATENCY_BUCKETS,
+        )
+        self.prompt_tokens = Histogram(
+            "llm_prompt_tokens", "Tokens de entrada por chamada.", TOKEN_BUCKETS
+        )
+        self.completion_tokens = Histogram(
+            "llm_completion_tokens", "Tokens de saída por chamada.", TOKEN_BUCKETS
+        )
+        self.cached_tokens = Histogram(
+            "llm_cached_tokens", "Tokens de entrada servidos pelo prompt cache da API.",
+            TOKEN_BUCKETS,
+        )
+        self.calls = defaultdict(int)  # (model, caller, source) -> total
+
+    def record(
+        self,
+        model: str,
+        caller: str,
+        source: str,
+        latency: float,
+        usage=None,
+        ttft: float = None
+    ):
+        """
+        Registra uma chamada.
+
+        Args:
+            model: Modelo usado
+            caller: Demo/desafio que fez a chamada
+            source: "api", "cache", "semantic" (cache aproximado), "cassette",
+                "coalesced" (single-flight) ou "error"
+            latency: Duração total em segundos
+            usage: Objeto `usage` da resposta da API (ou None)
+            ttft: Tempo até o primeiro token, em streaming
+        """
+        labels = {"model": model, "caller": caller, "source": source}
+        _last_usage.set(usage)
+        with self._lock:
+            self.calls[(model, caller, source)] += 1
+            self.latency.observe(latency, labels)
+            if ttft is not None:
+                self.ttft.observe(ttft, labels)
+            if usage is not None:
+                token_labels = {"model": model, "caller": caller}
+                self.prompt_tokens.observe(usage.prompt_tokens or 0, token_labels)
+                self.completion_tokens.observe(usage.completion_tokens or 0, token_labels)
+                self.cached_tokens.observe(cached_tokens(usage), token_labels)
+
+    @property
+    def histograms(self) -> tuple:
+        return (self.latency, self.ttft, self.prompt_tokens, self.completion_tokens,
+                self.cached_tokens)
+
+    def to_prometheus(self) -> str:
+        """Exporta no formato de texto do Prometheus."""
+        with self._lock:
+            lines = ["# HELP llm_calls_total Chamadas ao LLM.", "# TYPE llm_calls_total counter"]
+            for (model, caller, source), total in self.calls.items():
+                lines.append(
+                    f'llm_calls_total{{model="{model}",caller="{caller}",source="{source}"}} {total}'
+                )
+            for histogram in self.histograms:
+                lines.extend(histogram.to_prometheus())
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> dict:
+        """Exporta como dicionário (serializável em JSON)."""
+        with self._lock:
+            return {
+                "calls": [
+                    {"model": m, "caller": c, "source": s, "total": total}
+                    for (m, c, s), total in self.calls.items()
+                ],
+                **{h.name: h.to_json() for h in self.histograms},
+            }
+
+    def summary(self) -> str:
+        """Resumo legível: percentis de latência e totais de tokens."""
+        with self._lock:
+            if not self.calls:
+                return ""
+
+            by_source = defaultdict(int)
+            by_caller = defaultdict(int)
+            by_model = defaultdict(int)
+            for (model, caller, source), total in self.calls.items():
+                by_source[source] += total
+                by_caller[caller] += total
+                by_model[model] += total
+
+            lines = [
+                "Métricas da sessão: "
+                + ", ".join(f"{total} {source}" for source, total in sorted(by_source.items()))
+            ]
+
+            api = self.latency.samples(source="api")
+            if api:
+                lines.append(
+                    f"  Latência (API): p50 {percentile(api, 50):.2f}s | "
+                    f"p95 {percentile(api, 95):.2f}s | p99 {percentile(api, 99):.2f}s"
+                )
+            ttft = self.ttft.samples(source="api")
+            if ttft:
+                lines.append(
+                    f"  TTFT (streaming): p50 {percentile(ttft, 50):.2f}s | "
+                    f"p95 {percentile(ttft, 95):.2f}s | p99 {percentile(ttft, 99):.2f}s"
+                )
+
+            prompt = self.prompt_tokens.total()
+            completion = self.completion_tokens.total()
+            cached = self.cached_tokens.total()
+            if prompt or completion:
+                lines.append(
+                    f"  Tokens: {prompt:.0f} prompt ({cached:.0f} em cache, "
+                    f"{cached / prompt if prompt else 0:.0%}) | "
+                    f"{completion:.0f} completion"
+                )
+
+            lines.append(
+                "  Por modelo: "
+                + ", ".join(f"{model} ({total})" for model, total in sorted(by_model.items()))
+            )
+            lines.append(
+                "  Por origem: "
+                + ", ".join(f"{caller} ({total})" for caller, total in sorted(by_caller.items()))
+            )
+            return "\n".join(lines)
+
+    def write(self, path: str):
+        """Grava as métricas em arquivo (.json = JSON, outro = Prometheus)."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.to_json(), f, ensure_ascii=False, indent=2)
+            else:
+                f.write(self.to_prometheus())
+
+
+# Registro único do processo
+metrics = Metrics()
+
+
+def print_metrics_summary():
+    """Imprime o resumo da sessão e grava LLM_METRICS_FILE, se definido."""
+    summary = metrics.summary()
+    if summary:
+        print(summary)
+
+    path = os.getenv("LLM_METRICS_FILE")
+    if path:
+        metrics.write(path)
+        print(f"Métricas gravadas em {path}")
@@ -0,0 +1,383 @@
+"""
+=============================================================================
+SERVIDOR LOCAL QUE IMITA A API DA OPENAI (PARA TESTES E BENCHMARKS)
+=============================================================================
+
+Implementa POST /v1/chat/completions (com e sem stream) e
+GET /v1/models/<modelo>, sem rede e sem custo. O comportamento é
+configurável:
+
+    - Latência até o primeiro token, sorteada de uma distribuição:
+        fixed:0.2              sempre 200 ms
+        uniform:0.1,0.5        entre 100 e 500 ms
+        normal:0.3,0.05        média 300 ms, desvio 50 ms
+        lognormal:0.3,0.5      mediana 300 ms, sigma 0.5 (cauda longa)
+    - Velocidade de geração (tokens por segundo) e tamanho da resposta
+    - Injeção de erros (ex.: 2% de 429/500), com Retry-After nos 429
+    - Cache de prefixo como o da API: mensagens iniciais já vistas contam
+      como `cached_tokens` (a partir de 1024 tokens, em blocos de 128)
+
+As respostas trazem `usage` e cabeçalhos x-ratelimit-*, como a API real.
+
+Uso:
+    python -m llm.mockserver --port 8000 --latency lognormal:0.3,0.5 --error-rate 0.02
+
+    # Em outro terminal:
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=mock python main.py
+=============================================================================
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Regras do cache de prefixo da OpenAI
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_BLOCK = 128
+
+# Corpos das últimas requisições guardados em MockStats (para os testes)
+RECENT_BODIES = 100
+
+# Palavras usadas para montar as respostas simuladas (1 palavra = 1 token)
+WORDS = (
+    "o", "modelo", "responde", "de", "forma", "clara", "e", "objetiva",
+    "seguindo", "as", "regras", "do", "prompt", "com", "exemplos", "práticos",
+)
+
+
+@dataclass
+class LatencySpec:
+    """Distribuição de latência, em segundos (ver formatos no topo do módulo)."""
+    kind: str = "fixed"
+    params: tuple = (0.0,)
+
+    @classmethod
+    def parse(cls, text: str) -> "LatencySpec":
+        kind, _, raw = text.partition(":")
+        params = tuple(float(value) for value in raw.split(",") if value)
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Latência inválida: {text!r} (ex.: fixed:0.2, lognormal:0.3,0.5)")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = rng.lognormvariate(0, sigma) * median
+        return max(0.0, value)
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{','.join(f'{p:g}' for p in self.params)}"
+
+
+@dataclass
+class MockConfig:
+    """
+    Comportamento do servidor simulado.
+
+    Args:
+        latency: Distribuição do tempo até o primeiro token
+        tokens_per_second: Velocidade de geração (0 = instantâneo)
+        completion_tokens: Tamanho de cada resposta, em tokens
+        error_rate: Fração das requisições que falham (0 a 1)
+        error_statuses: Status HTTP sorteados para as falhas
+        retry_after_ms: Valor de retry-after-ms enviado nos 429
+        seed: Semente do sorteio (None = aleatório)
+    """
+    latency: LatencySpec = field(default_factory=LatencySpec)
+    tokens_per_second: float = 0.0
+    completion_tokens: int = 32
+    error_rate: float = 0.0
+    error_statuses: tuple = (429, 500)
+    retry_after_ms: int = 50
+    seed: int = None
+
+
+class MockStats:
+    """Contadores do servidor (requisições e erros injetados) e os últimos corpos recebidos."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bodies = deque(maxlen=RECENT_BODIES)
+        self._lock = threading.Lock()
+
+    def count(self, error: bool = False, body: dict = None):
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            if body is not None:
+                self.bodies.append(body)
+
+
+def _count_tokens(messages: list) -> int:
+    # Mesma regra prática do RateLimiter: ~4 caracteres por token
+    return sum(len(message.get("content") or "") for message in messages) // 4 + 4 * len(messages)
+
+
+def _logprobs(tokens: list, top: int) -> dict:
+    """Logprobs simulados: o token gerado é o mais provável, os demais decaem."""
+    content = []
+    for token in tokens:
+        alternatives = [token] + [word for word in WORDS if word != token][:max(0, top - 1)]
+        content.append({
+            "token": token,
+            "logprob": -0.05,
+            "bytes": None,
+            "top_logprobs": [
+                {"token": word, "logprob": -0.05 - 3 * rank, "bytes": None}
+                for rank, word in enumerate(alternatives[:top])
+            ],
+        })
+    return {"content": content}
+
+
+class PrefixCache:
+    """Simula o cache de prefixo: lembra os prefixos de mensagens já enviados."""
+
+    def __init__(self):
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def cached_tokens(self, messages: list) -> int:
+        keys = [
+            json.dumps(messages[:end], sort_keys=True, ensure_ascii=False)
+            for end in range(1, len(messages))
+        ]
+        with self._lock:
+            hit = max((end for end, key in enumerate(keys, start=1) if key in self._seen), default=0)
+            self._seen.update(keys)
+
+        tokens = _count_tokens(messages[:hit])
+        if tokens < PREFIX_CACHE_MIN_TOKENS:
+            return 0
+        return tokens - tokens % PREFIX_CACHE_BLOCK
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Atende as requisições; a configuração fica no próprio servidor."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, como a API real
+    disable_nagle_algorithm = True  # sem isso, cada resposta espera ~40 ms (ACK atrasado)
+
+    def log_message(self, *args):
+        pass
+
+    # ----- Respostas -----
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        # Transfer-Encoding: chunked mantém a conexão reaproveitável
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_event(self, payload: dict):
+        self._write_chunk(b"data: " + json.dumps(payload, ensure_ascii=False).encode() + b"\n\n")
+
+    def _rate_limit_headers(self) -> dict:
+        return {
+            "x-ratelimit-limit-requests": "100000",
+            "x-ratelimit-remaining-requests": "99999",
+            "x-ratelimit-limit-tokens": "100000000",
+            "x-ratelimit-remaining-tokens": "99999999",
+        }
+
+    # ----- Rotas -----
+
+    def do_GET(self):
+        prefix = "/v1/models/"
+        if not self.path.startswith(prefix):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+        model = self.path[len(prefix):]
+        self._send_json(200, {"id": model, "object": "model", "created": 0, "owned_by": "mock"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        server = self.server
+        config = server.config
+        with server.rng_lock:
+            fail = server.rng.random() < config.error_rate
+            status = server.rng.choice(config.error_statuses) if fail else 200
+            delay = config.latency.sample(server.rng)
+        server.stats.count(error=fail, body=body)
+
+        time.sleep(delay)
+        if fail:
+            headers = {"retry-after-ms": str(config.retry_after_ms)} if status == 429 else {}
+            self._send_json(status, {
+                "error": {"message": f"Erro simulado ({status})", "type": "mock_error"}
+            }, headers)
+            return
+
+        model = body.get("model", "mock")
+        messages = body.get("messages", [])
+        limit = body.get("max_tokens") or body.get("max_completion_tokens") or config.completion_tokens
+        tokens = [WORDS[i % len(WORDS)] for i in range(min(limit, config.completion_tokens))]
+        samples = body.get("n") or 1  # n amostras: o uso de tokens de saída multiplica
+        usage = {
+            "prompt_tokens": _count_tokens(messages),
+            "completion_tokens": len(tokens) * samples,
+            "total_tokens": _count_tokens(messages) + len(tokens) * samples,
+            "prompt_tokens_details": {"cached_tokens": server.prefix_cache.cached_tokens(messages)},
+        }
+        interval = 1 / config.tokens_per_second if config.tokens_per_second else 0.0
+        completion_id = f"chatcmpl-mock-{next(server.ids)}"
+
+        if body.get("stream"):
+            self._stream(model, completion_id, tokens, usage, interval, body)
+            return
+
+        time.sleep(interval * len(tokens))
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": index,
+                "message": {"role": "assistant", "content": " ".join(tokens)},
+                "logprobs": _logprobs(tokens, body.get("top_logprobs") or 0) if body.get("logprobs") else None,
+                "finish_reason": "stop" if len(tokens) == config.completion_tokens else "length",
+            } for index in range(samples)],
+            "usage": usage,
+        }, self._rate_limit_headers())
+
+    def _stream(self, model, completion_id, tokens, usage, interval, body):
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        for name, value in self._rate_limit_headers().items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        base = {"id": completion_id, "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model}
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(interval)
+            text = token if i == 0 else " " + token
+            self._send_event({**base, "choices": [
+                {"index": 0, "delta": {"content": text}, "finish_reason": None}
+            ]})
+        self._send_event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._send_event({**base, "choices": [], "usage": usage})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class MockServer(ThreadingHTTPServer):
+    """Servidor HTTP com a configuração, o sorteio e os contadores compartilhados."""
+
+    daemon_threads = True
+    request_queue_size = 128  # o padrão (5) descarta conexões sob concorrência
+
+    def __init__(self, address: tuple, config: MockConfig):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.rng_lock = threading.Lock()
+        self.stats = MockStats()
+        self.prefix_cache = PrefixCache()
+        self.ids = itertools.count(1)
+
+    def handle_error(self, request, client_address):
+        # Cliente que desistiu da resposta (ex.: requisição perdedora do
+        # hedging, cancelada) não é erro do servidor
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_server(config: MockConfig = None, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    """
+    Sobe o servidor em uma thread de fundo (port=0 escolhe uma porta livre).
+
+    Use server.base_url como OPENAI_BASE_URL e server.shutdown() para parar.
+    """
+    server = MockServer((host, port), config or MockConfig())
+    thread = threading.Thread(target=server.serve_forever, name="llm-mockserver", daemon=True)
+    thread.start()
+    return server
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Argumentos de linha de comando que montam um MockConfig."""
+    parser.add_argument("--latency", type=LatencySpec.parse, default=LatencySpec(),
+                        help="Distribuição da latência (ex.: lognormal:0.3,0.5; padrão: fixed:0)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="Velocidade de geração (padrão: instantâneo)")
+    parser.add_argument("--completion-tokens", type=int, default=32,
+                        help="Tokens por resposta (padrão: %(default)s)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fração de requisições com erro (padrão: %(default)s)")
+    parser.add_argument("--error-status", default="429,500",
+                        help="Status dos erros injetados (padrão: %(default)s)")
+    parser.add_argument("--seed", type=int, help="Semente do sorteio")
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(status) for status in args.error_status.split(",")),
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Servidor local compatível com a API de chat da OpenAI."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer((args.host, args.port), config_from_args(args))
+    print(f"Servidor simulado em {server.base_url} (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"{server.stats.requests} requisições, {server.stats.errors} erros injetados")
+
+
+if __name__ == "__main__":
+    main()
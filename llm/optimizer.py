@@ -0,0 +1,414 @@
+"""
+=============================================================================
+OTIMIZADOR DE FEW-SHOT (ACURÁCIA x TOKENS x LATÊNCIA)
+=============================================================================
+
+Cada exemplo de few-shot é pago em toda chamada, mas quais exemplos fazem
+diferença? Dado um conjunto de avaliação rotulado, o otimizador testa
+combinações de:
+
+    - subconjuntos dos exemplos (de 0 a --max-examples)
+    - ordens diferentes dos mesmos exemplos
+    - variantes do system prompt
+
+e mede, para cada candidato, a acurácia, os tokens de prompt por chamada e
+a latência. O resultado é a fronteira de Pareto: os candidatos que nenhum
+outro supera em tudo ao mesmo tempo (mais acurado, mais barato e mais rápido).
+
+Só respostas da API contam para a latência: acertos de cache ou cassete
+levam milissegundos e fariam um candidato parecer rápido. Se algum
+candidato não tiver nenhuma medição da API, a fronteira usa só acurácia e
+tokens.
+
+As chamadas dos candidatos rodam em paralelo (threads). Cada resultado
+(candidato + texto avaliado) é gravado em um JSONL; rodar de novo só avalia
+o que ainda não foi medido (ex.: novos exemplos ou novos textos de avaliação).
+
+Especificação (JSON):
+    {
+      "labels": ["Positivo", "Negativo", "Neutro"],
+      "template": "Texto: \\"{text}\\"\\nSentimento:",
+      "system_prompts": {"completo": "...", "curto": "..."},
+      "examples": [["Amei!", "Positivo"], ...],
+      "eval": [["Chegou rápido.", "Positivo"], ...]
+    }
+
+Uso:
+    python -m llm.optimizer                      # especificação de exemplo (demo 5)
+    python -m llm.optimizer spec.json --workers 16 --max-candidates 60
+    python -m llm.optimizer spec.json --ignore-latency --json
+=============================================================================
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+from llm.classify import LabelClassifier
+from llm.metrics import caller_scope, last_usage
+from llm.ratelimit import estimate_tokens
+from llm.router import preferred_model
+
+DEFAULT_RESULTS_PATH = ".fewshot_optimizer.jsonl"
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_EXAMPLES = 3
+DEFAULT_ORDERINGS = 2
+DEFAULT_MAX_CANDIDATES = 40
+
+DEFAULT_SPEC = {
+    "labels": ["Positivo", "Negativo", "Neutro"],
+    "template": 'Texto: "{text}"\nSentimento:',
+    "system_prompts": {
+        "completo": (
+            "Você é um classificador de sentimentos especializado em feedback de usuários.\n\n"
+            "Regras:\n"
+            "- Classifique como: Positivo, Negativo ou Neutro\n"
+            "- Responda APENAS com a classificação, nada mais\n"
+            "- Seja consistente com os exemplos fornecidos"
+        ),
+        "curto": "Classifique o sentimento como Positivo, Negativo ou Neutro.",
+    },
+    "examples": [
+        ["O produto é excelente e superou minhas expectativas.", "Positivo"],
+        ["O atendimento foi péssimo e demorou muito.", "Negativo"],
+        ["Poderia ter mais opções.", "Neutro"],
+        ["Funciona perfeitamente, recomendo.", "Positivo"],
+        ["Parou de funcionar depois de uma semana.", "Negativo"],
+        ["O preço é justo, nada de especial.", "Neutro"],
+    ],
+    "eval": [
+        ["Chegou antes do prazo e funciona perfeitamente.", "Positivo"],
+        ["Veio com defeito e ninguém respondeu meu e-mail.", "Negativo"],
+        ["O serviço foi aceitável, nada extraordinário.", "Neutro"],
+        ["Melhor compra que fiz este ano.", "Positivo"],
+        ["Cobraram duas vezes e não devolveram.", "Negativo"],
+        ["Recebi o pedido.", "Neutro"],
+        ["A equipe foi muito atenciosa.", "Positivo"],
+        ["A bateria não dura nem um dia.", "Negativo"],
+        ["É parecido com o modelo anterior.", "Neutro"],
+        ["Superou o que eu esperava pelo preço.", "Positivo"],
+        ["O app fecha sozinho toda hora.", "Negativo"],
+        ["Tem nas cores preta e branca.", "Neutro"],
+    ],
+}
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """Uma variante do prompt: system prompt + exemplos (índices no banco, em ordem)."""
+    system_name: str
+    examples: tuple
+
+    @property
+    def name(self) -> str:
+        shown = ",".join(str(index) for index in self.examples) or "zero-shot"
+        return f"{self.system_name} [{shown}]"
+
+
+@dataclass
+class CandidateResult:
+    name: str
+    system_name: str
+    examples: list
+    accuracy: float
+    prompt_tokens: float   # média por chamada
+    latency: float         # mediana das chamadas à API, em segundos (None se nenhuma)
+    evaluated: int         # textos medidos agora (o resto veio do arquivo)
+
+
+def generate_candidates(
+    spec: dict,
+    max_examples: int = DEFAULT_MAX_EXAMPLES,
+    orderings: int = DEFAULT_ORDERINGS,
+    max_candidates: int = DEFAULT_MAX_CANDIDATES,
+    seed: int = 0
+) -> list:
+    """
+    Subconjuntos e ordens dos exemplos, para cada variante do system prompt.
+
+    Sempre inclui o zero-shot e o conjunto completo na ordem original; o
+    restante é sorteado (com semente) até max_candidates.
+    """
+    rng = random.Random(seed)
+    size = len(spec["examples"])
+    arrangements = []
+    for count in range(1, min(max_examples, size) + 1):
+        for subset in itertools.combinations(range(size), count):
+            permutations = list(itertools.permutations(subset))
+            rng.shuffle(permutations)
+            if subset not in permutations[:orderings]:
+                permutations = [subset] + permutations
+            arrangements += permutations[:orderings]
+
+    candidates = []
+    for system_name in spec["system_prompts"]:
+        fixed = [Candidate(system_name, ()), Candidate(system_name, tuple(range(size)))]
+        candidates += fixed
+        others = [Candidate(system_name, arrangement) for arrangement in arrangements]
+        candidates += [candidate for candidate in others if candidate not in fixed]
+
+    required = [c for c in candidates if c.examples in ((), tuple(range(size)))]
+    optional = [c for c in candidates if c not in required]
+    room = max(0, max_candidates - len(required))
+    chosen = set(rng.sample(optional, min(room, len(optional))))
+    return required + [c for c in optional if c in chosen]
+
+
+def pareto_front(results: list, use_latency: bool = True) -> list:
+    """
+    Resultados não dominados: ninguém tem acurácia >= com tokens e latência <=.
+
+    A latência só entra se todos os resultados tiverem uma (medida na API).
+    """
+    use_latency = use_latency and all(result.latency is not None for result in results)
+
+    def objectives(result):
+        values = (-result.accuracy, result.prompt_tokens)
+        return values + (result.latency,) if use_latency else values
+
+    front = []
+    for result in results:
+        mine = objectives(result)
+        dominated = any(
+            all(a <= b for a, b in zip(objectives(other), mine)) and objectives(other) != mine
+            for other in results
+        )
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda result: (result.prompt_tokens, -result.accuracy))
+
+
+class ResultStore:
+    """JSONL com uma medição por (candidato, texto avaliado), para reexecuções incrementais."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def get(self, key: str):
+        return self.entries.get(key)
+
+    def add(self, entry: dict):
+        with self._lock:
+            self.entries[entry["key"]] = entry
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class FewShotOptimizer:
+    """
+    Avalia candidatos de few-shot contra um conjunto rotulado.
+
+    Args:
+        spec: Especificação (labels, template, system_prompts, examples, eval)
+        call: Função de chamada (call_llm ou run_prompt)
+        model: Modelo padrão do helper; a chave dos resultados usa o modelo para
+               onde o roteador manda as classificações (se ligado)
+        results_path: JSONL com as medições (None desliga a reutilização)
+        workers: Chamadas simultâneas
+    """
+
+    def __init__(
+        self,
+        spec: dict,
+        call,
+        model: str = None,
+        results_path: str = DEFAULT_RESULTS_PATH,
+        workers: int = DEFAULT_WORKERS
+    ):
+        self.spec = spec
+        self.call = call
+        self.model = model
+        # Modelo que de fato responde (task="classify"): é o que entra na chave
+        self.routed_model = preferred_model("classify", model) if model else None
+        self.workers = workers
+        self.store = ResultStore(results_path)
+        self.labels = list(spec["labels"])
+        self.template = spec.get("template", "{text}")
+
+    def _examples(self, candidate: Candidate) -> list:
+        return [
+            (self.template.format(text=self.spec["examples"][index][0]), self.spec["examples"][index][1])
+            for index in candidate.examples
+        ]
+
+    def _key(self, candidate: Candidate, text: str, expected: str) -> str:
+        payload = json.dumps({
+            "model": self.routed_model,
+            "labels": self.labels,
+            "system_prompt": self.spec["system_prompts"][candidate.system_name],
+            "examples": self._examples(candidate),
+            "input": self.template.format(text=text),
+            "expected": expected,
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _measure(self, candidate: Candidate, classifier: LabelClassifier, text: str, expected: str, key: str):
+        prompt = self.template.format(text=text)
+        start = time.perf_counter()
+        result = classifier.classify(prompt)
+        latency = time.perf_counter() - start
+
+        usage = last_usage()
+        if usage is not None:
+            prompt_tokens = usage.prompt_tokens
+        else:
+            # Sem chamada à API (cache/cassete): estimativa pelo tamanho e sem latência
+            latency = None
+            messages = [{"role": "system", "content": self.spec["system_prompts"][candidate.system_name]}]
+            for entrada, rotulo in self._examples(candidate):
+                messages += [{"role": "user", "content": entrada}, {"role": "assistant", "content": rotulo}]
+            messages.append({"role": "user", "content": prompt})
+            prompt_tokens = estimate_tokens(messages, max_output_tokens=0)
+
+        self.store.add({
+            "key": key,
+            "candidate": candidate.name,
+            "predicted": result.label,
+            "correct": result.label == expected,
+            "prompt_tokens": prompt_tokens,
+            "latency": latency,
+        })
+
+    def evaluate(self, candidates: list) -> list:
+        """Mede todos os candidatos (em paralelo) e devolve um CandidateResult por candidato."""
+        classifiers = {
+            candidate: LabelClassifier(
+                self.labels, call=self.call,
+                system_prompt=self.spec["system_prompts"][candidate.system_name],
+                examples=self._examples(candidate), model=self.model,
+            )
+            for candidate in candidates
+        }
+
+        keys = {}
+        tasks = []
+        for candidate in candidates:
+            for text, expected in self.spec["eval"]:
+                key = self._key(candidate, text, expected)
+                keys.setdefault(candidate, []).append(key)
+                if self.store.get(key) is None:
+                    tasks.append((candidate, classifiers[candidate], text, expected, key))
+
+        def measure(task):
+            # Em cada thread: o contexto do caller_scope não passa para o pool
+            with caller_scope("otimizador-few-shot"):
+                self._measure(*task)
+
+        if self.workers <= 1:
+            for task in tasks:
+                measure(task)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for _ in executor.map(measure, tasks):
+                    pass
+
+        measured_now = {}
+        for candidate, *_ in tasks:
+            measured_now[candidate] = measured_now.get(candidate, 0) + 1
+
+        results = []
+        for candidate in candidates:
+            entries = [self.store.get(key) for key in keys[candidate]]
+            latencies = [entry["latency"] for entry in entries if entry["latency"] is not None]
+            results.append(CandidateResult(
+                name=candidate.name,
+                system_name=candidate.system_name,
+                examples=list(candidate.examples),
+                accuracy=sum(entry["correct"] for entry in entries) / len(entries),
+                prompt_tokens=statistics.fmean(entry["prompt_tokens"] for entry in entries),
+                latency=statistics.median(latencies) if latencies else None,
+                evaluated=measured_now.get(candidate, 0),
+            ))
+        return results
+
+
+def format_report(results: list, front: list) -> str:
+    lines = [
+        f"{len(results)} candidatos avaliados, {len(front)} na fronteira de Pareto:",
+        "",
+        f"{'acurácia':>9} {'tokens':>8} {'latência':>9}  candidato",
+    ]
+    for result in front:
+        latency = f"{result.latency * 1000:>7.0f}ms" if result.latency is not None else f"{'-':>9}"
+        lines.append(f"{result.accuracy:>9.0%} {result.prompt_tokens:>8.0f} {latency}  {result.name}")
+    measured = sum(result.evaluated for result in results)
+    lines += ["", f"Chamadas feitas agora: {measured} (as demais vieram do arquivo de resultados)"]
+    without_latency = sum(result.latency is None for result in results)
+    if without_latency:
+        lines.append(
+            f"Latência fora da fronteira: {without_latency} candidato(s) só com respostas "
+            "de cache/cassete (sem medição da API)"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Procura os exemplos de few-shot e system prompts com melhor acurácia por token."
+    )
+    parser.add_argument("spec", nargs="?", help="JSON com labels, system_prompts, examples e eval "
+                                                "(padrão: exemplo da demo 5)")
+    parser.add_argument("--helper", choices=("call_llm", "run_prompt"), default="call_llm",
+                        help="Helper usado nas chamadas (padrão: %(default)s)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Chamadas simultâneas (padrão: %(default)s)")
+    parser.add_argument("--max-examples", type=int, default=DEFAULT_MAX_EXAMPLES,
+                        help="Tamanho máximo dos subconjuntos (padrão: %(default)s)")
+    parser.add_argument("--orderings", type=int, default=DEFAULT_ORDERINGS,
+                        help="Ordens testadas por subconjunto (padrão: %(default)s)")
+    parser.add_argument("--max-candidates", type=int, default=DEFAULT_MAX_CANDIDATES,
+                        help="Candidatos por execução (padrão: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do sorteio de candidatos")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_PATH,
+                        help="JSONL de resultados reaproveitados (padrão: %(default)s)")
+    parser.add_argument("--ignore-latency", action="store_true",
+                        help="Fronteira só com acurácia x tokens")
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON")
+    args = parser.parse_args()
+
+    spec = DEFAULT_SPEC
+    if args.spec:
+        with open(args.spec, encoding="utf-8") as f:
+            spec = json.load(f)
+
+    if args.helper == "call_llm":
+        from main import MODEL, call_llm as call
+    else:
+        from challenges import MODEL, run_prompt as call
+
+    candidates = generate_candidates(
+        spec, max_examples=args.max_examples, orderings=args.orderings,
+        max_candidates=args.max_candidates, seed=args.seed,
+    )
+    optimizer = FewShotOptimizer(spec, call, model=MODEL, results_path=args.results, workers=args.workers)
+    results = optimizer.evaluate(candidates)
+    front = pareto_front(results, use_latency=not args.ignore_latency)
+
+    if args.json:
+        print(json.dumps({
+            "results": [asdict(result) for result in results],
+            "pareto": [result.name for result in front],
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(results, front))
+
+
+if __name__ == "__main__":
+    main()
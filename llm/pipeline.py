@@ -0,0 +1,343 @@
+"""
+=============================================================================
+PIPELINE DE PROMPTS COMO GRAFO (DAG)
+=============================================================================
+
+Cada etapa declara seu system prompt, o template do user prompt e de quais
+etapas anteriores depende. O executor dispara ao mesmo tempo todas as
+etapas cujas dependências já terminaram, então o tempo total passa a ser
+o do caminho crítico, e não a soma das etapas.
+
+Exemplo (desafio_04): PASSO 2 e PASSO 3 dependem só do PASSO 1,
+então rodam em paralelo.
+
+    pipeline = Pipeline([
+        Stage("analise", system_analista, "Analise o mercado de CRMs..."),
+        Stage("posts", system_social, "Diferenciais:\\n{analise}", depends_on=("analise",)),
+        Stage("seo", system_seo, "Diferenciais:\\n{analise}", depends_on=("analise",)),
+    ], call=arun_prompt)
+    resultado = pipeline.run()
+    print(resultado.outputs["seo"])
+
+Os templates usam a sintaxe de str.format: {nome_da_etapa} é substituído
+pela saída daquela etapa e {nome} pelos valores passados em run(nome=...).
+
+Reexecução incremental (memoização por etapa)
+    Com LLM_PIPELINE_MEMO=1, a saída de cada etapa fica guardada em disco,
+    indexada por um hash do system prompt, do template, do modelo, da
+    temperature e das entradas (saídas das dependências incluídas). Ao
+    rodar de novo, só são recalculadas as etapas cujas entradas mudaram e,
+    em cascata, as que dependem delas (se a saída recalculada for outra),
+    como num sistema de build. Mudou só o prompt de SEO no desafio 4? Só
+    a etapa de SEO vai para a API.
+
+    Só entram na memoização etapas com temperature=0 explícita: com
+    amostragem, repetir a saída anterior muda o comportamento. Para guardar
+    mesmo assim, a etapa declara memoize=True. O arquivo guarda no máximo
+    LLM_PIPELINE_MEMO_MAX_ENTRIES saídas (as usadas há mais tempo saem).
+
+    LLM_PIPELINE_MEMO=1                   Liga a memoização
+    LLM_PIPELINE_MEMO_PATH=...            Arquivo (padrão: .pipeline_memo.json)
+    LLM_PIPELINE_MEMO_MAX_ENTRIES=1000    Saídas guardadas (LRU)
+=============================================================================
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import string
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from llm.metrics import caller_scope, current_caller
+from llm.router import preferred_model
+
+DEFAULT_MEMO_PATH = ".pipeline_memo.json"
+DEFAULT_MEMO_MAX_ENTRIES = 1000
+
+
+@dataclass
+class Stage:
+    """
+    Uma etapa do pipeline.
+
+    Args:
+        name: Identificador da etapa (também usado como variável nos templates)
+        system_prompt: System prompt especializado desta etapa
+        user_template: Template do user prompt ({etapa} ou {entrada})
+        depends_on: Nomes das etapas cujas saídas esta etapa usa
+        temperature: Temperature da chamada (None = padrão do helper)
+        task: Dica de tarefa para o roteador de modelos (ex.: "edit", "generate")
+        memoize: Reaproveita a saída mesmo sem temperature=0 explícita
+    """
+    name: str
+    system_prompt: str
+    user_template: str
+    depends_on: tuple = ()
+    temperature: float = None
+    task: str = None
+    memoize: bool = False
+
+    @property
+    def memoizable(self) -> bool:
+        """Só saídas determinísticas (ou com opt-in) entram na memoização."""
+        return self.memoize or self.temperature == 0
+
+    def render(self, values: dict) -> str:
+        """Monta o user prompt com as entradas e saídas das dependências."""
+        return self.user_template.format_map(values)
+
+    def fields(self) -> set:
+        """Variáveis usadas no template ({analise}, {texto_original}...)."""
+        return {
+            name.split(".")[0].split("[")[0]
+            for _, name, _, _ in string.Formatter().parse(self.user_template)
+            if name
+        }
+
+    def memo_key(self, model: str, values: dict) -> str:
+        """
+        Hash de tudo que influencia a saída da etapa.
+
+        Args:
+            model: Modelo da etapa (rota preferida do roteador)
+            values: Entradas e saídas das dependências usadas no template
+        """
+        payload = json.dumps({
+            "system_prompt": self.system_prompt,
+            "user_template": self.user_template,
+            "model": model,
+            "temperature": self.temperature,
+            "inputs": {name: str(values[name]) for name in sorted(self.fields() & set(values))},
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageMemo:
+    """
+    Saídas de etapas já executadas, em um arquivo JSON (hash -> saída).
+
+    O arquivo fica na ordem de uso (LRU): passando de max_entries, saem as
+    saídas usadas há mais tempo.
+
+    Args:
+        path: Arquivo onde as saídas ficam guardadas
+        max_entries: Máximo de saídas guardadas
+    """
+
+    def __init__(self, path: str = DEFAULT_MEMO_PATH, max_entries: int = DEFAULT_MEMO_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._entries = OrderedDict(json.load(f))
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        return None if entry is None else entry["output"]
+
+    def set(self, key: str, stage: str, output: str):
+        with self._lock:
+            self._entries[key] = {"stage": stage, "output": str(output), "created": time.time()}
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def save(self):
+        """Grava o arquivo (escrita atômica: um arquivo pela metade nunca fica no lugar)."""
+        with self._lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_default_memo = None
+_default_memo_lock = threading.Lock()
+
+
+def get_stage_memo():
+    """Retorna a memoização padrão, ou None se LLM_PIPELINE_MEMO não estiver ligado."""
+    global _default_memo
+
+    if os.getenv("LLM_PIPELINE_MEMO", "0").lower() not in ("1", "true", "yes", "on"):
+        return None
+
+    with _default_memo_lock:
+        if _default_memo is None:
+            _default_memo = StageMemo(
+                os.getenv("LLM_PIPELINE_MEMO_PATH", DEFAULT_MEMO_PATH),
+                max_entries=int(os.getenv("LLM_PIPELINE_MEMO_MAX_ENTRIES", DEFAULT_MEMO_MAX_ENTRIES)),
+            )
+        return _default_memo
+
+
+@dataclass
+class PipelineResult:
+    """Saídas e tempos de uma execução do pipeline."""
+    outputs: dict = field(default_factory=dict)
+    durations: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+    reused: list = field(default_factory=list)      # etapas vindas da memoização
+    recomputed: list = field(default_factory=list)  # etapas executadas (com memoização ligada)
+
+    @property
+    def sequential_time(self) -> float:
+        """Tempo que a execução levaria com as etapas em sequência."""
+        return sum(self.durations.values())
+
+    def timing_report(self) -> str:
+        """Resumo de tempo: paralelo (caminho crítico) vs sequencial."""
+        return (
+            f"Tempo total: {self.elapsed:.2f}s "
+            f"(em sequência seriam {self.sequential_time:.2f}s)"
+        )
+
+    def memo_report(self) -> str:
+        """Etapas reaproveitadas vs recalculadas ("" se a memoização estiver desligada)."""
+        if not self.reused and not self.recomputed:
+            return ""
+        return (
+            f"Etapas reaproveitadas: {', '.join(self.reused) or '-'} | "
+            f"recalculadas: {', '.join(self.recomputed) or '-'}"
+        )
+
+
+class Pipeline:
+    """
+    Executor de etapas encadeadas com paralelismo entre etapas independentes.
+
+    Args:
+        stages: Lista de Stage (a ordem só importa para exibição)
+        call: Função assíncrona no formato de acall_llm/arun_prompt
+        model: Modelo padrão do helper (entra na chave da memoização)
+        memo: StageMemo para reexecução incremental (None = LLM_PIPELINE_MEMO)
+    """
+
+    def __init__(self, stages: list, call, model: str = None, memo: StageMemo = None):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Etapa duplicada: {stage.name}")
+            self.stages[stage.name] = stage
+        self.call = call
+        self.model = model
+        self.memo = memo
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> list:
+        """Valida as dependências e retorna uma ordem de execução possível."""
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(
+                        f"Etapa '{stage.name}' depende de '{dep}', que não existe"
+                    )
+
+        order = []
+        state = {}  # nome -> "visitando" | "ok"
+
+        def visit(name, path):
+            if state.get(name) == "ok":
+                return
+            if state.get(name) == "visitando":
+                ciclo = " -> ".join(path + [name])
+                raise ValueError(f"Dependência circular no pipeline: {ciclo}")
+            state[name] = "visitando"
+            for dep in self.stages[name].depends_on:
+                visit(dep, path + [name])
+            state[name] = "ok"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    async def _run_stage(
+        self, stage: Stage, inputs: dict, tasks: dict, result: PipelineResult, memo: StageMemo
+    ):
+        # Espera apenas as dependências desta etapa
+        upstream = {}
+        for dep in stage.depends_on:
+            upstream[dep] = await tasks[dep]
+
+        values = {**inputs, **upstream}
+        prompt = stage.render(values)
+
+        # As saídas das dependências estão na chave: se alguma mudou, a etapa
+        # (e, em cascata, as que dependem dela) é recalculada
+        key = None
+        memo = memo if stage.memoizable else None
+        if memo is not None:
+            key = stage.memo_key(preferred_model(stage.task, self.model), values)
+            output = memo.get(key)
+            if output is not None:
+                result.durations[stage.name] = 0.0
+                result.outputs[stage.name] = output
+                result.reused.append(stage.name)
+                return output
+
+        kwargs = {"system_prompt": stage.system_prompt}
+        if stage.temperature is not None:
+            kwargs["temperature"] = stage.temperature
+        if stage.task is not None:
+            kwargs["task"] = stage.task
+
+        start = time.perf_counter()
+        output = await self.call(prompt, **kwargs)
+        result.durations[stage.name] = time.perf_counter() - start
+        result.outputs[stage.name] = output
+        if memo is not None:
+            memo.set(key, stage.name, output)
+            result.recomputed.append(stage.name)
+        return output
+
+    async def arun(self, **inputs) -> PipelineResult:
+        """Executa o pipeline (versão assíncrona)."""
+        result = PipelineResult()
+        memo = self.memo if self.memo is not None else get_stage_memo()
+        tasks = {}
+        start = time.perf_counter()
+
+        # Cria as tarefas em ordem topológica: cada uma aguarda só suas dependências
+        for name in self.order:
+            tasks[name] = asyncio.ensure_future(
+                self._run_stage(self.stages[name], inputs, tasks, result, memo)
+            )
+
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            # Etapas concluídas ficam guardadas mesmo se outra falhou
+            if memo is not None and result.recomputed:
+                memo.save()
+
+        result.elapsed = time.perf_counter() - start
+        # Saídas e relatório na ordem em que as etapas foram declaradas
+        result.outputs = {name: result.outputs[name] for name in self.stages}
+        result.reused = [name for name in self.stages if name in result.reused]
+        result.recomputed = [name for name in self.stages if name in result.recomputed]
+        return result
+
+    def run(self, **inputs) -> PipelineResult:
+        """Executa o pipeline a partir de código síncrono."""
+        # As métricas das etapas ficam atribuídas à demo que chamou run()
+        with caller_scope(current_caller()):
+            return asyncio.run(self.arun(**inputs))
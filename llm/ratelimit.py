@@ -0,0 +1,386 @@
+"""
+=============================================================================
+LIMITE DE TAXA NO CLIENTE (RPM/TPM) COM BACKOFF ADAPTATIVO
+=============================================================================
+
+Com muitas chamadas concorrentes, a API responde 429 (rate limit) e os
+helpers simplesmente falhavam. O RateLimiter fica na frente do client:
+
+    1. Estima os tokens da requisição antes de enviar
+    2. Espera até haver saldo em dois "baldes de fichas" (token bucket):
+       requisições por minuto (RPM) e tokens por minuto (TPM)
+    3. Ajusta os baldes pelos cabeçalhos x-ratelimit-* de cada resposta
+    4. Em 429/5xx/erro de conexão, tenta de novo com backoff exponencial
+       e jitter (respeitando Retry-After quando o servidor envia)
+
+Uma única instância é compartilhada por call_llm, run_prompt e as versões
+assíncronas, então todas disputam o mesmo orçamento.
+
+Configuração via variáveis de ambiente (todas opcionais):
+    LLM_RPM=500            Requisições por minuto (padrão: aprende dos cabeçalhos)
+    LLM_TPM=200000         Tokens por minuto (padrão: aprende dos cabeçalhos)
+    LLM_MAX_RETRIES=5      Tentativas extras em erros transitórios
+=============================================================================
+"""
+
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+
+from llm.hedging import DeadlineExceeded, time_left
+from llm.startup import startup
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_EXPECTED_OUTPUT_TOKENS = 256
+
+# Status HTTP que valem uma nova tentativa
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def estimate_tokens(messages: list, max_output_tokens: int = DEFAULT_EXPECTED_OUTPUT_TOKENS) -> int:
+    """
+    Estimativa barata de tokens de uma requisição (entrada + saída esperada).
+
+    Usa a regra prática de ~4 caracteres por token, mais um pequeno custo
+    fixo por mensagem. O erro é corrigido depois com o `usage` real.
+    """
+    chars = sum(len(message.get("content") or "") for message in messages)
+    return chars // 4 + 4 * len(messages) + max_output_tokens
+
+
+def parse_reset_duration(value: str) -> float:
+    """Converte durações do tipo "6m0s", "1.5s" ou "20ms" em segundos."""
+    if not value:
+        return None
+    total = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|s|m|h)", value):
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total
+
+
+class TokenBucket:
+    """
+    Balde de fichas reabastecido continuamente (limite por minuto).
+
+    Args:
+        per_minute: Capacidade por minuto (None = sem limite)
+    """
+
+    def __init__(self, per_minute: float = None):
+        self.per_minute = per_minute
+        self.level = per_minute or 0.0
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute is None
+
+    def _refill(self, now: float):
+        if self.unlimited:
+            return
+        rate = self.per_minute / 60.0
+        self.level = min(self.per_minute, self.level + (now - self._updated) * rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Segundos até haver `amount` fichas (0 se já houver)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.per_minute)  # pedido maior que o balde: espera encher
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / (self.per_minute / 60.0)
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.level -= min(amount, self.per_minute)
+
+    def set_limit(self, per_minute: float):
+        if self.unlimited:
+            self.level = per_minute
+        else:
+            self._refill(time.monotonic())
+            self.level = min(self.level, per_minute)
+        self.per_minute = per_minute
+        self._updated = time.monotonic()
+
+    def sync_remaining(self, remaining: float):
+        """O servidor é a fonte da verdade: nunca acredita em mais saldo que ele."""
+        if not self.unlimited:
+            self._refill(time.monotonic())
+            self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """
+    Limitador de RPM/TPM compartilhado, com retry e backoff com jitter.
+
+    Args:
+        rpm: Requisições por minuto (None = usa o limite informado pela API)
+        tpm: Tokens por minuto (None = usa o limite informado pela API)
+        max_retries: Tentativas extras em 429/5xx/erros de conexão
+        base_delay: Espera inicial do backoff (segundos)
+        max_delay: Espera máxima do backoff (segundos)
+    """
+
+    def __init__(
+        self,
+        rpm: float = None,
+        tpm: float = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._fixed_rpm = rpm
+        self._fixed_tpm = tpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+
+        # Contadores para diagnóstico
+        self.throttled = 0       # vezes em que uma chamada esperou saldo
+        self.retries = 0         # novas tentativas após erro
+        self.rate_limited = 0    # respostas 429 recebidas
+
+    # ----- Reserva de saldo -----
+
+    def _reserve(self, tokens: int) -> float:
+        """Tenta reservar 1 requisição + `tokens`; retorna a espera necessária."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(tokens, now),
+            )
+            if wait == 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+            return wait
+
+    @staticmethod
+    def _throttle_wait(wait: float, deadline: float) -> float:
+        """Espera por saldo, ou DeadlineExceeded se o balde não encher a tempo."""
+        left = time_left(deadline)
+        if left is not None and wait > left:
+            raise DeadlineExceeded(
+                f"Prazo da chamada esgotado: o limite de taxa só libera em {wait:.2f}s"
+            )
+        return wait
+
+    def _count_throttled(self):
+        with self._lock:
+            self.throttled += 1
+
+    def acquire(self, tokens: int, deadline: float = None):
+        """
+        Bloqueia até haver saldo para a requisição.
+
+        Raises:
+            DeadlineExceeded: Se o saldo só voltar depois do prazo
+        """
+        waited = False
+        while (wait := self._reserve(tokens)) > 0:
+            waited = True
+            time.sleep(self._throttle_wait(wait, deadline))
+        if waited:
+            self._count_throttled()
+
+    async def acquire_async(self, tokens: int, deadline: float = None):
+        """Versão assíncrona de acquire (não bloqueia o event loop)."""
+        waited = False
+        while (wait := self._reserve(tokens)) > 0:
+            waited = True
+            await asyncio.sleep(self._throttle_wait(wait, deadline))
+        if waited:
+            self._count_throttled()
+
+    # ----- Adaptação pelas respostas -----
+
+    def observe_headers(self, headers):
+        """Ajusta os baldes com os cabeçalhos x-ratelimit-* da resposta."""
+        with self._lock:
+            for bucket, fixed, kind in (
+                (self.requests, self._fixed_rpm, "requests"),
+                (self.tokens, self._fixed_tpm, "tokens"),
+            ):
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if limit:
+                    limit = float(limit)
+                    if fixed is not None:
+                        limit = min(limit, fixed)
+                    if bucket.per_minute != limit:
+                        bucket.set_limit(limit)
+                if remaining:
+                    bucket.sync_remaining(float(remaining))
+
+    def settle(self, estimated: int, usage):
+        """Corrige o balde de tokens com o uso real informado pela API."""
+        if usage is None or self.tokens.unlimited:
+            return
+        with self._lock:
+            self.tokens.level -= usage.total_tokens - estimated
+
+    def _penalize(self):
+        """Após um 429, esvazia os baldes para que as outras chamadas também esperem."""
+        with self._lock:
+            for bucket in (self.requests, self.tokens):
+                if not bucket.unlimited:
+                    bucket.level = min(bucket.level, 0.0)
+
+    # ----- Retry com backoff -----
+
+    @staticmethod
+    def is_retryable(exc: Exception) -> bool:
+        import openai  # já carregado neste ponto; evita custo no import do módulo
+
+        if isinstance(exc, openai.APIConnectionError):
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code in RETRYABLE_STATUS or exc.status_code >= 500
+        return False
+
+    def backoff_delay(self, attempt: int, exc: Exception) -> float:
+        """Espera antes da próxima tentativa: Retry-After ou backoff com jitter."""
+        import openai
+
+        if isinstance(exc, openai.APIStatusError):
+            headers = exc.response.headers
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                try:
+                    return float(headers["retry-after"])
+                except ValueError:
+                    pass
+            reset = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+            if exc.status_code == 429 and reset:
+                return reset + random.uniform(0, self.base_delay)
+
+        # Full jitter: espera aleatória entre 0 e o teto exponencial
+        cap = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(0, cap)
+
+    def _handle_error(self, attempt: int, exc: Exception) -> float:
+        """Decide se tenta de novo; retorna a espera ou relança o erro."""
+        if attempt >= self.max_retries or not self.is_retryable(exc):
+            raise exc
+        if getattr(exc, "status_code", None) == 429:
+            with self._lock:
+                self.rate_limited += 1
+            self._penalize()
+        with self._lock:
+            self.retries += 1
+        return self.backoff_delay(attempt, exc)
+
+    @staticmethod
+    def _timeout(deadline: float) -> dict:
+        """Timeout da tentativa: o que resta do prazo (nada se não houver prazo)."""
+        left = time_left(deadline)
+        return {} if left is None else {"timeout": left}
+
+    def _retry_wait(self, attempt: int, exc: Exception, deadline: float) -> float:
+        """Espera antes da próxima tentativa, sem passar do prazo."""
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded("Prazo da chamada esgotado") from exc
+        wait = self._handle_error(attempt, exc)
+        left = time_left(deadline)
+        if left is not None and wait >= left:
+            raise DeadlineExceeded("Prazo da chamada esgotado antes da nova tentativa") from exc
+        return wait
+
+    # ----- Chamadas -----
+
+    def create(self, client, deadline: float = None, **kwargs):
+        """
+        Equivalente a client.chat.completions.create(**kwargs), com limite
+        de taxa, adaptação pelos cabeçalhos e retry.
+
+        Args:
+            client: Cliente OpenAI
+            deadline: Prazo da chamada inteira (time.monotonic), ou None
+        """
+        estimated = estimate_tokens(
+            kwargs["messages"], kwargs.get("max_tokens") or DEFAULT_EXPECTED_OUTPUT_TOKENS
+        )
+        # As novas tentativas são feitas aqui, não no SDK
+        raw_api = client.with_options(max_retries=0).chat.completions.with_raw_response
+
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimated, deadline)
+            start = time.perf_counter()
+            try:
+                raw = raw_api.create(**kwargs, **self._timeout(deadline))
+            except Exception as exc:
+                time.sleep(self._retry_wait(attempt, exc, deadline))
+                continue
+
+            startup.record("first_response", time.perf_counter() - start)
+            startup.mark("first_response")
+            self.observe_headers(raw.headers)
+            response = raw.parse()
+            self.settle(estimated, getattr(response, "usage", None))
+            return response
+
+    async def acreate(self, async_client, deadline: float = None, **kwargs):
+        """Versão assíncrona de create (para AsyncOpenAI)."""
+        estimated = estimate_tokens(
+            kwargs["messages"], kwargs.get("max_tokens") or DEFAULT_EXPECTED_OUTPUT_TOKENS
+        )
+        raw_api = async_client.with_options(max_retries=0).chat.completions.with_raw_response
+
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(estimated, deadline)
+            start = time.perf_counter()
+            try:
+                raw = await raw_api.create(**kwargs, **self._timeout(deadline))
+            except Exception as exc:
+                await asyncio.sleep(self._retry_wait(attempt, exc, deadline))
+                continue
+
+            startup.record("first_response", time.perf_counter() - start)
+            startup.mark("first_response")
+            self.observe_headers(raw.headers)
+            response = raw.parse()
+            self.settle(estimated, getattr(response, "usage", None))
+            return response
+
+    def stats(self) -> dict:
+        return {
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "rpm_limit": self.requests.per_minute,
+            "tpm_limit": self.tokens.per_minute,
+        }
+
+
+# =============================================================================
+# INSTÂNCIA COMPARTILHADA
+# =============================================================================
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Retorna o limitador compartilhado por todos os helpers."""
+    global _default_limiter
+
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            rpm = os.getenv("LLM_RPM")
+            tpm = os.getenv("LLM_TPM")
+            _default_limiter = RateLimiter(
+                rpm=float(rpm) if rpm else None,
+                tpm=float(tpm) if tpm else None,
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            )
+        return _default_limiter
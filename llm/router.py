@@ -0,0 +1,249 @@
+"""
+=============================================================================
+ROTEADOR DE MODELOS (POR TAREFA E POR LATÊNCIA)
+=============================================================================
+
+Um rótulo de sentimento de uma palavra e uma campanha de 5 posts para o
+LinkedIn não precisam do mesmo modelo. O roteador escolhe o modelo de cada
+chamada a partir de:
+
+    1. A dica de tarefa (task="classify", "edit", "generate"...), passada
+       para call_llm/run_prompt ou declarada na etapa do pipeline. Sem dica,
+       chamadas com max_tokens bem pequeno contam como "classify"
+    2. A política: para cada tarefa, os modelos em ordem de preferência e
+       a latência máxima aceitável (p95)
+    3. O histórico recente de cada modelo naquela tarefa (janela móvel de
+       latência e erros): um modelo lento ou falhando cede a vez ao
+       próximo da lista. O histórico é separado por tarefa: gerar 5 posts
+       demora mais que dar um rótulo, e isso não pode contar contra o
+       modelo no limite de latência das classificações
+
+A escolha aparece nas métricas (cada chamada é registrada com o modelo
+usado) e em print_router_stats.
+
+Política padrão (DEFAULT_POLICY) pode ser trocada por um JSON:
+    {
+      "tasks": {"classify": ["gpt-4.1-nano", "gpt-4.1-mini"], ...},
+      "latency_slo": {"classify": 2.0},
+      "max_error_rate": 0.2,
+      "window": 50,
+      "max_age": 300,
+      "min_samples": 5
+    }
+
+Configuração via variáveis de ambiente (desligado por padrão):
+    LLM_ROUTER=1                 Liga (desligado, toda chamada usa o modelo padrão)
+    LLM_ROUTER_POLICY=arq.json   Política própria
+=============================================================================
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from llm.metrics import percentile
+
+# max_tokens até este valor (sem dica de tarefa) = classificação
+CLASSIFY_MAX_TOKENS = 16
+
+DEFAULT_POLICY = {
+    # Tarefa -> modelos em ordem de preferência
+    # (tarefas sem entrada usam o modelo padrão do helper)
+    "tasks": {
+        "classify": ["gpt-4.1-nano", "gpt-4.1-mini"],
+        "edit": ["gpt-4.1-nano", "gpt-4.1-mini"],
+        "extract": ["gpt-4.1-nano", "gpt-4.1-mini"],
+        "generate": ["gpt-4.1", "gpt-4.1-mini"],
+    },
+    # p95 máximo (segundos) antes de passar para o próximo modelo da lista
+    "latency_slo": {
+        "classify": 2.0,
+        "edit": 5.0,
+        "extract": 5.0,
+    },
+    "max_error_rate": 0.2,
+    "window": 50,       # últimas chamadas consideradas por modelo e tarefa
+    # Segundos até uma chamada sair do histórico: um modelo evitado por estar
+    # lento volta a ser tentado quando o histórico ruim envelhece
+    "max_age": 300,
+    "min_samples": 5,   # antes disso, o modelo é considerado saudável
+}
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo de cada chamada pela tarefa e pelo histórico recente.
+
+    Args:
+        policy: Política (mesmo formato de DEFAULT_POLICY)
+    """
+
+    def __init__(self, policy: dict = None):
+        self.policy = {**DEFAULT_POLICY, **(policy or {})}
+        self._lock = threading.Lock()
+        # (modelo, tarefa) -> deque de (instante, latência, ok)
+        self._history = defaultdict(lambda: deque(maxlen=self.policy["window"]))
+        self.decisions = defaultdict(int)  # (tarefa, modelo, motivo) -> total
+
+    @staticmethod
+    def infer_task(params: dict) -> str:
+        """Tarefa provável de uma chamada sem dica."""
+        max_tokens = params.get("max_tokens") or params.get("max_completion_tokens")
+        if max_tokens is not None and max_tokens <= CLASSIFY_MAX_TOKENS:
+            return "classify"
+        return None
+
+    def observe(self, model: str, latency: float, ok: bool = True, task: str = None):
+        """Registra o resultado de uma chamada à API feita para `task`."""
+        with self._lock:
+            self._history[(model, task)].append((time.monotonic(), latency, ok))
+
+    def model_stats(self, model: str, task: str = None) -> dict:
+        """Amostras, taxa de erro e p95 recentes do modelo nesta tarefa."""
+        oldest = time.monotonic() - self.policy["max_age"]
+        with self._lock:
+            history = [
+                (latency, ok) for moment, latency, ok in self._history.get((model, task), ())
+                if moment >= oldest
+            ]
+        latencies = [latency for latency, ok in history if ok]
+        errors = sum(1 for _, ok in history if not ok)
+        return {
+            "samples": len(history),
+            "error_rate": errors / len(history) if history else 0.0,
+            "p95": percentile(latencies, 95) if latencies else None,
+        }
+
+    def _healthy(self, stats: dict, slo: float) -> bool:
+        if stats["samples"] < self.policy["min_samples"]:
+            return True
+        if stats["error_rate"] > self.policy["max_error_rate"]:
+            return False
+        return slo is None or stats["p95"] is None or stats["p95"] <= slo
+
+    def choose(self, task: str, default: str, params: dict = None) -> str:
+        """
+        Modelo para uma chamada.
+
+        Args:
+            task: Dica de tarefa (None = inferida pelos parâmetros)
+            default: Modelo padrão do helper (tarefas sem rota na política)
+            params: Parâmetros extras da chamada (ex.: max_tokens)
+
+        Returns:
+            O nome do modelo escolhido
+        """
+        task = task or self.infer_task(params or {})
+        candidates = self.policy["tasks"].get(task) or [default]
+        slo = self.policy["latency_slo"].get(task)
+
+        stats = {model: self.model_stats(model, task) for model in candidates}
+        chosen, reason = None, "preferido"
+        for model in candidates:
+            if self._healthy(stats[model], slo):
+                chosen = model
+                break
+            reason = "alternativa"
+        if chosen is None:
+            # Nenhum saudável: o que menos erra e, no empate, o mais rápido
+            chosen = min(
+                candidates,
+                key=lambda model: (stats[model]["error_rate"], stats[model]["p95"] or 0.0),
+            )
+            reason = "nenhum saudável"
+
+        with self._lock:
+            self.decisions[(task or "-", chosen, reason)] += 1
+        return chosen
+
+    def stats(self) -> dict:
+        with self._lock:
+            decisions = dict(self.decisions)
+            routes = list(self._history)
+        return {
+            "decisions": [
+                {"task": task, "model": model, "reason": reason, "total": total}
+                for (task, model, reason), total in sorted(decisions.items())
+            ],
+            "models": {
+                f"{model} ({task or '-'})": self.model_stats(model, task)
+                for model, task in routes
+            },
+        }
+
+
+# =============================================================================
+# INSTÂNCIA COMPARTILHADA
+# =============================================================================
+
+_default_router = None
+_default_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Roteador padrão (política de LLM_ROUTER_POLICY ou DEFAULT_POLICY)."""
+    global _default_router
+
+    with _default_router_lock:
+        if _default_router is None:
+            policy = None
+            path = os.getenv("LLM_ROUTER_POLICY")
+            if path:
+                with open(path, encoding="utf-8") as f:
+                    policy = json.load(f)
+            _default_router = ModelRouter(policy)
+        return _default_router
+
+
+def router_enabled() -> bool:
+    return os.getenv("LLM_ROUTER", "0").lower() in ("1", "true", "yes", "on")
+
+
+def choose_model(task: str, default: str, params: dict = None) -> str:
+    """Modelo para uma chamada de call_llm/run_prompt (o padrão se LLM_ROUTER=0)."""
+    if not router_enabled():
+        return default
+    return get_router().choose(task, default, params)
+
+
+def preferred_model(task: str, default: str) -> str:
+    """
+    Primeiro modelo da política para a tarefa (sem olhar o histórico).
+
+    Estável entre execuções: serve para identificar a rota de uma chamada
+    (ex.: na chave da memoização do pipeline) sem depender da latência.
+    """
+    if not router_enabled() or task is None:
+        return default
+    return (get_router().policy["tasks"].get(task) or [default])[0]
+
+
+def observe_call(model: str, latency: float, ok: bool = True, task: str = None, params: dict = None):
+    """
+    Alimenta o histórico do roteador (chamado pelo caminho de chamada).
+
+    A tarefa é a mesma usada na escolha: a dica, ou a inferida por `params`.
+    """
+    if router_enabled():
+        router = get_router()
+        router.observe(model, latency, ok, task or router.infer_task(params or {}))
+
+
+def print_router_stats():
+    """Imprime as escolhas do roteador (apenas se houve alguma)."""
+    if not router_enabled() or _default_router is None:
+        return
+    decisions = _default_router.stats()["decisions"]
+    if not decisions:
+        return
+    print(
+        "Roteador de modelos: "
+        + ", ".join(
+            f"{d['task']} -> {d['model']} ({d['total']}"
+            + ("" if d["reason"] == "preferido" else f", {d['reason']}")
+            + ")"
+            for d in decisions
+        )
+    )
@@ -0,0 +1,408 @@
+"""
+=============================================================================
+EXECUÇÃO DAS DEMOS E DESAFIOS PELA LINHA DE COMANDO (SEM MENU)
+=============================================================================
+
+Os menus de main.py e challenges.py esperam input(); para rodar em script,
+CI ou antes da aula, use:
+
+    python -m llm.runner demo:4 demo:7        # demos 4 e 7 (ids do menu)
+    python -m llm.runner demo:2-5             # demos 2 a 5, na ordem do menu
+    python -m llm.runner desafio:4b
+    python -m llm.runner demos --parallel 12  # todas as demos ao mesmo tempo
+    python -m llm.runner --all --parallel 8 --json > resultado.json
+    python -m llm.runner --list
+
+Ids: demo:<opção do menu>, desafio:<opção do menu>, um intervalo de
+opções (demo:2-5, desafio:3-4b), o nome da função (ex.: demo_05_few_shot)
+ou os grupos "demos" e "desafios".
+
+Com --parallel N, até N demos rodam ao mesmo tempo (cada uma em sua
+thread). A saída de cada demo fica em um buffer e é impressa inteira, na
+ordem pedida, assim que ela e as anteriores terminam: nada se mistura. As
+demos só esperam a API, então o tempo total fica perto do da demo mais
+lenta, e não da soma.
+
+O mesmo mecanismo adianta as próximas demos na opção "executar todas"
+dos menus (Prefetcher):
+    LLM_PREFETCH_AHEAD=1   Demos adiantadas além da que está na tela
+=============================================================================
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+# Demos executadas à frente da que está na tela, no modo "executar todas"
+DEFAULT_PREFETCH_AHEAD = 1
+
+# Intervalo de opções do menu: demo:2-5, desafio:3-4b
+_RANGE = re.compile(r"^(demo|desafio):(\w+)-(\w+)$")
+
+
+@dataclass
+class RunResult:
+    """Resultado de uma demo/desafio executado pela linha de comando."""
+    id: str
+    name: str
+    ok: bool
+    elapsed: float
+    output: str
+    error: str = None
+
+
+class ThreadOutput:
+    """
+    Substituto de sys.stdout que separa a saída por thread.
+
+    Dentro de capture(), tudo que a thread imprime vai para o buffer dela;
+    as demais threads continuam escrevendo no stream original.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    @contextmanager
+    def capture(self):
+        buffer = self._local.buffer = []
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            return self._stream.write(text)
+        buffer.append(text)
+        return len(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+# =============================================================================
+# SELEÇÃO
+# =============================================================================
+
+def registry() -> dict:
+    """Todas as demos e desafios: id -> (nome, função), na ordem dos menus."""
+    from challenges import DESAFIOS
+    from main import DEMOS
+
+    entries = {f"demo:{key}": entry for key, entry in DEMOS.items()}
+    entries.update({f"desafio:{key}": entry for key, entry in DESAFIOS.items()})
+    return entries
+
+
+def _expand_range(key: str, entries: dict) -> list:
+    """Ids de um intervalo (demo:2-5), na ordem do menu; None se não for intervalo."""
+    match = _RANGE.match(key)
+    if not match:
+        return None
+    kind, first, last = match.groups()
+    ids = list(entries)
+    try:
+        start, end = ids.index(f"{kind}:{first}"), ids.index(f"{kind}:{last}")
+    except ValueError:
+        raise ValueError(f"Intervalo com opção desconhecida: {key!r} (veja --list)") from None
+    if start > end:
+        raise ValueError(f"Intervalo invertido: {key!r}")
+    return ids[start:end + 1]
+
+
+def select(ids: list, entries: dict) -> list:
+    """
+    Traduz os ids pedidos (sem repetir, na ordem dada) para ids do registro.
+
+    Raises:
+        ValueError: Se algum id ou intervalo não existir
+    """
+    by_function = {func.__name__: entry_id for entry_id, (_, func) in entries.items()}
+    groups = {
+        "demos": [entry_id for entry_id in entries if entry_id.startswith("demo:")],
+        "desafios": [entry_id for entry_id in entries if entry_id.startswith("desafio:")],
+    }
+
+    selected = []
+    for raw in ids:
+        key = raw.strip().lower()
+        if key in groups:
+            matches = groups[key]
+        elif key in entries:
+            matches = [key]
+        elif _RANGE.match(key):
+            matches = _expand_range(key, entries)
+        elif raw in by_function:
+            matches = [by_function[raw]]
+        else:
+            raise ValueError(f"Demo/desafio desconhecido: {raw!r} (veja --list)")
+        selected.extend(entry_id for entry_id in matches if entry_id not in selected)
+    return selected
+
+
+# =============================================================================
+# EXECUÇÃO
+# =============================================================================
+
+def run_one(entry_id: str, name: str, func, output: ThreadOutput = None) -> RunResult:
+    """Executa uma demo; com `output`, o que ela imprime fica no buffer da thread."""
+    start = time.perf_counter()
+    error = None
+    with output.capture() if output is not None else _no_capture() as buffer:
+        try:
+            func()
+        except Exception:
+            error = traceback.format_exc()
+            print(error, end="")
+    return RunResult(
+        id=entry_id,
+        name=name,
+        ok=error is None,
+        elapsed=time.perf_counter() - start,
+        output="".join(buffer),
+        error=error,
+    )
+
+
+@contextmanager
+def _no_capture():
+    yield []
+
+
+def run(ids: list, parallel: int = 1, capture: bool = False, emit=None) -> list:
+    """
+    Executa as demos/desafios pedidos.
+
+    Args:
+        ids: Ids do registro (ver select)
+        parallel: Quantas rodam ao mesmo tempo
+        capture: Guarda a saída de cada uma em RunResult.output
+            (sempre ligado com parallel > 1, para a saída não se misturar)
+        emit: Chamada com cada RunResult, na ordem de `ids`, assim que ele
+            e os anteriores terminam
+
+    Returns:
+        Lista de RunResult, na ordem de `ids`
+    """
+    entries = registry()
+    capture = capture or parallel > 1
+    output = None
+    if capture:
+        output = ThreadOutput(sys.stdout)
+        sys.stdout = output
+
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            futures = [
+                executor.submit(run_one, entry_id, *entries[entry_id], output)
+                for entry_id in ids
+            ]
+            # Em ordem: a saída de uma demo só sai depois das anteriores
+            for future in futures:
+                result = future.result()
+                results.append(result)
+                if emit is not None:
+                    emit(result)
+    finally:
+        if output is not None:
+            sys.stdout = output._stream
+    return results
+
+
+class Prefetcher:
+    """
+    Executa uma sequência de demos adiantando as próximas em segundo plano.
+
+    Usado na opção "executar todas" dos menus: enquanto a saída de uma demo
+    está na tela (esperando ENTER), as chamadas das próximas `ahead` demos
+    já estão em andamento, e a saída aparece na hora.
+
+        with Prefetcher(DEMOS.values()) as demos:
+            for result in demos:
+                print(result.output, end="")
+                if input("...") == "q":
+                    break   # as adiantadas são descartadas
+
+    Ao sair antes do fim (ou com cancel()), demos adiantadas que ainda não começaram são
+    canceladas; as que já estão rodando terminam em segundo plano (threads
+    não podem ser interrompidas) e a saída delas é descartada.
+
+    Args:
+        entries: Pares (nome, função), na ordem de exibição
+        ahead: Demos adiantadas além da atual (None = LLM_PREFETCH_AHEAD)
+    """
+
+    def __init__(self, entries, ahead: int = None):
+        if ahead is None:
+            ahead = int(os.getenv("LLM_PREFETCH_AHEAD", DEFAULT_PREFETCH_AHEAD))
+        self.entries = list(entries)
+        self.ahead = max(0, ahead)
+        self.output = None
+        self._executor = None
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.output = ThreadOutput(sys.stdout)
+        sys.stdout = self.output
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.ahead + 1, thread_name_prefix="prefetch"
+        )
+        return self
+
+    def _submit_until(self, index: int):
+        while len(self._futures) <= min(index, len(self.entries) - 1):
+            name, func = self.entries[len(self._futures)]
+            self._futures.append(
+                self._executor.submit(run_one, str(len(self._futures) + 1), name, func, self.output)
+            )
+
+    def __iter__(self):
+        for index in range(len(self.entries)):
+            # A atual e as próximas `ahead` já estão (ou entram) na fila
+            self._submit_until(index + self.ahead)
+            yield self._futures[index].result()
+
+    def __exit__(self, *exc):
+        self.cancel()
+        return False
+
+    def cancel(self):
+        """
+        Descarta as demos adiantadas: as que não começaram são canceladas e
+        a saída das que estão rodando é descartada. Chamado ao sair do with.
+        """
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+
+        running = [future for future in self._futures if not future.done()]
+        if not running:
+            self._restore()
+            return
+
+        # As threads ainda rodando imprimem em self.output (descartado);
+        # o stdout original só volta quando a última terminar
+        remaining = [len(running)]
+
+        def finished(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    self._restore()
+
+        for future in running:
+            future.add_done_callback(finished)
+
+    def _restore(self):
+        # Só desfaz a troca se ninguém trocou o stdout de novo depois
+        if sys.stdout is self.output:
+            sys.stdout = self.output._stream
+
+
+def print_result(result: RunResult):
+    """Imprime a saída de uma demo capturada, com cabeçalho."""
+    status = "ok" if result.ok else "ERRO"
+    print("\n" + "=" * 60)
+    print(f"[{result.id}] {result.name} ({status}, {result.elapsed:.2f}s)")
+    print("=" * 60)
+    print(result.output, end="" if result.output.endswith("\n") else "\n")
+    sys.stdout.flush()
+
+
+def print_session_stats():
+    """Os mesmos resumos que os menus imprimem ao sair."""
+    from llm.cache import print_cache_stats
+    from llm.cassette import print_cassette_stats
+    from llm.client import print_pool_stats
+    from llm.hedging import print_hedge_stats
+    from llm.metrics import print_metrics_summary
+    from llm.router import print_router_stats
+    from llm.semantic_cache import print_semantic_cache_stats
+    from llm.singleflight import print_single_flight_stats
+
+    print_metrics_summary()
+    print_cache_stats()
+    print_semantic_cache_stats()
+    print_single_flight_stats()
+    print_router_stats()
+    print_hedge_stats()
+    print_cassette_stats()
+    print_pool_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Executa demos e desafios sem o menu interativo."
+    )
+    parser.add_argument("ids", nargs="*",
+                        help="demo:<n>, desafio:<n>, intervalo (demo:2-5), nome da função, "
+                             "'demos' ou 'desafios'")
+    parser.add_argument("--all", action="store_true", help="Executa todas as demos e desafios")
+    parser.add_argument("--parallel", type=int, default=1,
+                        help="Demos executadas ao mesmo tempo (padrão: %(default)s)")
+    parser.add_argument("--json", action="store_true",
+                        help="Imprime os resultados (com a saída de cada demo) em JSON")
+    parser.add_argument("--list", action="store_true", help="Lista os ids disponíveis")
+    args = parser.parse_args()
+
+    entries = registry()
+    if args.list:
+        for entry_id, (name, _) in entries.items():
+            print(f"{entry_id:<12} {name}")
+        return 0
+
+    try:
+        ids = list(entries) if args.all else select(args.ids, entries)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not ids:
+        parser.error("informe ids de demos/desafios ou --all (veja --list)")
+
+    from llm.client import start_warm_up
+    from main import MODEL
+
+    # Abre a conexão com a API em segundo plano (LLM_WARMUP=1)
+    start_warm_up(MODEL)
+
+    start = time.perf_counter()
+    if args.json:
+        results = run(ids, parallel=args.parallel, capture=True)
+        print(json.dumps({
+            "elapsed": time.perf_counter() - start,
+            "results": [asdict(result) for result in results],
+        }, ensure_ascii=False, indent=2))
+    else:
+        results = run(
+            ids, parallel=args.parallel,
+            emit=print_result if args.parallel > 1 else None,
+        )
+        print("\n" + "=" * 60)
+        failed = [result.id for result in results if not result.ok]
+        print(
+            f"{len(results)} executadas em {time.perf_counter() - start:.2f}s "
+            f"(soma das demos: {sum(result.elapsed for result in results):.2f}s)"
+            + (f" | com erro: {', '.join(failed)}" if failed else "")
+        )
+        print_session_stats()
+
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
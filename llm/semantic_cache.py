@@ -0,0 +1,333 @@
+"""
+=============================================================================
+CACHE DE QUASE-DUPLICATAS (MINHASH + LSH)
+=============================================================================
+
+O cache exato (llm/cache.py) só acerta quando a mensagem é idêntica.
+Paráfrases como "Explique o que é uma função em Python" e "O que é uma
+função em Python? Explique" são a mesma pergunta, mas geram chaves
+diferentes.
+
+Este cache aproximado compara as perguntas pelo conteúdo:
+
+    pergunta -> normaliza (minúsculas, sem acentos, sem pontuação e sem
+                palavras vazias) -> conjunto de palavras
+             -> palavras e pares de palavras vizinhas (a ordem conta)
+             -> assinatura MinHash (estima a similaridade de Jaccard)
+             -> índice LSH em faixas: só compara com candidatas parecidas
+
+Regras:
+    - Só vale para temperature 0 (como o cache exato)
+    - O escopo é tudo menos a última mensagem: modelo, system prompt,
+      exemplos e parâmetros. Uma resposta nunca é reaproveitada com outro
+      system prompt
+    - Os números da pergunta também entram no escopo, na ordem e exatos:
+      "12 vezes 13" e "12 vezes 14" nunca compartilham resposta
+    - As negações também: "não gostei" e "gostei" ficam em escopos diferentes
+    - A ordem das palavras conta: "de Celsius para Fahrenheit" e "de
+      Fahrenheit para Celsius" não são a mesma pergunta
+    - A similaridade estimada precisa atingir o limiar configurado
+    - Todo acerto aproximado vai para um log de auditoria (JSONL) com a
+      pergunta feita, a pergunta original e a similaridade
+
+Atenção: textos quase iguais ainda podem ter sentidos opostos (antônimos
+como "gostei" e "detestei"). Use limiares altos, principalmente em
+classificação.
+
+Ativação (opt-in) via variáveis de ambiente:
+    LLM_SEMANTIC_CACHE=1                  Liga o cache aproximado
+    LLM_SEMANTIC_CACHE_THRESHOLD=0.8      Similaridade mínima (0 a 1)
+    LLM_SEMANTIC_CACHE_MAX_ENTRIES=5000   Perguntas guardadas (LRU)
+    LLM_SEMANTIC_CACHE_AUDIT=...          Log dos acertos aproximados
+                                          (padrão: .llm_semantic_audit.jsonl)
+=============================================================================
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_AUDIT_PATH = ".llm_semantic_audit.jsonl"
+
+# 128 permutações em 32 faixas de 4 linhas: pares com Jaccard ~0.45 ou mais
+# já costumam cair na mesma faixa; o limiar final é conferido depois
+NUM_PERMUTATIONS = 128
+BANDS = 32
+
+_PRIME = (1 << 31) - 1
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+NEGATIONS = frozenset("nao nunca nem jamais nenhum nenhuma nada sem".split())
+
+STOPWORDS = frozenset(
+    "a o as os um uma uns umas de da do das dos em na no nas nos por para pra "
+    "com e ou que se me te eu voce isso isto esse essa este esta ao aos".split()
+)
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação e sem palavras vazias."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    words = [word for word in re.findall(r"\w+", text) if word not in STOPWORDS]
+    return " ".join(words)
+
+
+def numbers(text: str) -> list:
+    """Números da pergunta, na ordem (comparados exatamente, fora da similaridade)."""
+    return _NUMBER.findall(text)
+
+
+def negations(text: str) -> list:
+    """Palavras negadas da pergunta, na ordem ("não gostei" -> "nao gostei")."""
+    words = normalize(text).split()
+    return [
+        " ".join(words[i:i + 2]) for i, word in enumerate(words) if word in NEGATIONS
+    ]
+
+
+def shingles(text: str) -> set:
+    """
+    Palavras e pares de palavras vizinhas do texto normalizado (sem os números).
+
+    Palavras, e não trigramas de caracteres: uma palavra trocada pesa de
+    verdade. Os pares guardam a ordem: "celsius fahrenheit" e "fahrenheit
+    celsius" são shingles diferentes.
+    """
+    words = [word for word in normalize(text).split() if not word.isdigit()]
+    return set(words) | {f"{first} {second}" for first, second in zip(words, words[1:])}
+
+
+@lru_cache(maxsize=1)
+def _permutations():
+    # numpy só é carregado quando o cache aproximado é usado
+    import numpy as np
+
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+    b = rng.integers(0, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+    return a, b
+
+
+def minhash(text: str):
+    """Assinatura MinHash (array numpy): o menor hash de cada permutação sobre os shingles."""
+    import numpy as np
+
+    items = shingles(text)
+    if not items:
+        return None
+    a, b = _permutations()
+    values = np.array([zlib.crc32(item.encode("utf-8")) for item in items], dtype=np.uint64)
+    return ((a * (values % _PRIME) + b) % _PRIME).min(axis=1)
+
+
+def scope_key(model: str, messages: list, params: dict = None) -> str:
+    """
+    Escopo da busca: tudo que influencia a resposta, menos o texto da última
+    mensagem, mais os números e as negações que ela contém.
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "context": messages[:-1],
+            "params": params or {},
+            "numbers": numbers(messages[-1]["content"]) if messages else [],
+            "negations": negations(messages[-1]["content"]) if messages else [],
+        },
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class NearDuplicateCache:
+    """
+    Cache em memória de respostas para perguntas parecidas (temperature 0).
+
+    Args:
+        threshold: Similaridade de Jaccard estimada mínima para reaproveitar
+        max_entries: Perguntas guardadas (as menos usadas saem primeiro)
+        audit_path: JSONL com cada acerto aproximado (None desliga o log)
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        audit_path: str = DEFAULT_AUDIT_PATH
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.audit_path = audit_path
+
+        self._entries = OrderedDict()   # id -> (escopo, assinatura, pergunta, resposta)
+        self._bands = defaultdict(set)  # (escopo, faixa, valores) -> ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @staticmethod
+    def is_cacheable(temperature: float, messages: list) -> bool:
+        return not temperature and bool(messages) and messages[-1].get("role") == "user"
+
+    @staticmethod
+    def _band_keys(scope: str, signature) -> list:
+        rows = NUM_PERMUTATIONS // BANDS
+        return [
+            (scope, band, signature[band * rows:(band + 1) * rows].tobytes())
+            for band in range(BANDS)
+        ]
+
+    def get(self, model: str, messages: list, temperature: float, params: dict = None):
+        """
+        Procura a resposta de uma pergunta parecida no mesmo escopo.
+
+        Returns:
+            O texto da resposta, ou None
+        """
+        if not self.is_cacheable(temperature, messages):
+            self.bypassed += 1
+            return None
+
+        question = messages[-1]["content"]
+        signature = minhash(question)
+        if signature is None:
+            self.misses += 1
+            return None
+        scope = scope_key(model, messages, params)
+
+        import numpy as np
+
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(scope, signature):
+                candidates |= self._bands.get(key, set())
+
+            best_id, best = None, 0.0
+            if candidates:
+                ids = list(candidates)
+                signatures = np.stack([self._entries[entry_id][1] for entry_id in ids])
+                # Jaccard estimado: fração de posições iguais nas assinaturas
+                scores = (signatures == signature).mean(axis=1)
+                index = int(scores.argmax())
+                best_id, best = ids[index], float(scores[index])
+
+            if best_id is None or best < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            _, _, original, response = self._entries[best_id]
+            self.hits += 1
+
+        self._audit(model, question, original, best)
+        return response
+
+    def set(
+        self,
+        model: str,
+        messages: list,
+        temperature: float,
+        response: str,
+        params: dict = None
+    ):
+        """Indexa a pergunta e guarda a resposta."""
+        if not self.is_cacheable(temperature, messages) or response is None:
+            return
+        signature = minhash(messages[-1]["content"])
+        if signature is None:
+            return
+        scope = scope_key(model, messages, params)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, signature, messages[-1]["content"], response)
+            for key in self._band_keys(scope, signature):
+                self._bands[key].add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                old_id, (old_scope, old_signature, _, _) = self._entries.popitem(last=False)
+                for key in self._band_keys(old_scope, old_signature):
+                    ids = self._bands[key]
+                    ids.discard(old_id)
+                    if not ids:
+                        del self._bands[key]
+
+    def _audit(self, model: str, question: str, original: str, score: float):
+        if not self.audit_path:
+            return
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "model": model,
+            "similarity": round(score, 3),
+            "question": question,
+            "matched": original,
+        }
+        with self._lock:
+            with open(self.audit_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+
+# =============================================================================
+# INSTÂNCIA PADRÃO (configurada por variáveis de ambiente)
+# =============================================================================
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """Retorna o cache aproximado padrão, ou None se LLM_SEMANTIC_CACHE não estiver ligado."""
+    global _default_cache
+
+    if os.getenv("LLM_SEMANTIC_CACHE", "0").lower() not in ("1", "true", "yes", "on"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = NearDuplicateCache(
+                threshold=float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+                max_entries=int(os.getenv("LLM_SEMANTIC_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                audit_path=os.getenv("LLM_SEMANTIC_CACHE_AUDIT", DEFAULT_AUDIT_PATH) or None,
+            )
+        return _default_cache
+
+
+def print_semantic_cache_stats():
+    """Imprime o resumo do cache aproximado (apenas se estiver ligado)."""
+    cache = get_semantic_cache()
+    if cache is None:
+        return
+
+    stats = cache.stats()
+    audit = f" | auditoria em {cache.audit_path}" if cache.audit_path and stats["hits"] else ""
+    print(
+        f"Cache aproximado (limiar {cache.threshold:.0%}): {stats['hits']} acertos, "
+        f"{stats['misses']} misses | taxa de acerto {stats['hit_rate']:.0%} | "
+        f"{stats['entries']} perguntas{audit}"
+    )
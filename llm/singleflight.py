@@ -0,0 +1,193 @@
+"""
+=============================================================================
+SINGLE-FLIGHT: REQUISIÇÕES IGUAIS EM ANDAMENTO VIRAM UMA SÓ
+=============================================================================
+
+Quando vários workers mandam a mesma requisição determinística ao mesmo
+tempo (mesmo modelo, mesmas mensagens, temperature 0), o cache ainda está
+vazio para todos e cada um faria a sua chamada à API. Com o single-flight,
+a primeira chamada segue para a API e as outras esperam por ela:
+
+    thread A ──► API ───────────────► resposta ─┬─► A
+    thread B ──► (espera a chamada de A) ───────┼─► B
+    thread C ──► (espera a chamada de A) ───────┴─► C
+
+Funciona com threads (call_llm/run_prompt em um pool) e com asyncio
+(acall_llm/arun_prompt em gather), e os dois se encontram: uma task espera a
+chamada de uma thread e vice-versa, porque todos usam a mesma tabela de
+chamadas em andamento. A exceção é código síncrono rodando dentro do loop da
+task líder: esperar por ela travaria o loop, então faz a sua própria chamada.
+
+O resultado fica no Future da chamada antes de a chave sair da tabela, e o
+chamador grava a resposta no cache dentro de fn(): quem chegar depois da
+chamada acha a resposta no cache em vez de repetir a requisição. Se a
+chamada falhar, todos recebem a mesma exceção. Chamadas com temperature > 0
+nunca são compartilhadas: cada uma deve ter a sua amostra.
+
+Configuração via variável de ambiente:
+    LLM_SINGLEFLIGHT=0   Desliga o compartilhamento (padrão: ligado)
+=============================================================================
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+
+from llm.hedging import DeadlineExceeded, time_left
+
+
+class _Flight:
+    """Uma chamada em andamento: threads esperam o Future, tasks o aguardam."""
+
+    def __init__(self, loop=None):
+        self.future = concurrent.futures.Future()
+        self.loop = loop  # loop da task líder (None se a líder é uma thread)
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class SingleFlight:
+    """
+    Compartilha chamadas idênticas em andamento, entre threads e tasks.
+
+    As chamadas são identificadas por uma chave (ex.: a chave do cache).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}  # chave -> _Flight
+
+        self.calls = 0      # chamadas que foram de fato executadas
+        self.saved = 0      # chamadas que reaproveitaram uma em andamento
+
+    def do(self, key: str, fn, deadline: float = None):
+        """
+        Executa fn(), ou espera a execução igual que já está em andamento.
+
+        Args:
+            key: Identificador da chamada
+            fn: Função executada por quem chegar primeiro
+            deadline: Prazo de quem espera (time.monotonic), ou None
+
+        Returns:
+            (resultado, compartilhado): compartilhado é True se o resultado
+            veio da chamada de outra thread ou task
+        """
+        loop = _running_loop()
+        with self._lock:
+            flight = self._flights.get(key)
+            # Código síncrono no loop da task líder: esperar por ela travaria o loop
+            own_loop = flight is not None and loop is not None and flight.loop is loop
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            if leader or own_loop:
+                self.calls += 1
+            else:
+                self.saved += 1
+
+        if own_loop:
+            return fn(), False
+        if not leader:
+            try:
+                return flight.future.result(timeout=time_left(deadline)), True
+            except concurrent.futures.TimeoutError:
+                if flight.future.done():
+                    raise  # o próprio líder estourou o prazo dele
+                raise DeadlineExceeded("Prazo esgotado à espera da chamada igual") from None
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            flight.future.set_exception(exc)
+            raise
+        else:
+            flight.future.set_result(result)
+        finally:
+            # Só depois do resultado: quem chegar até aqui ainda o reaproveita
+            self._forget(key)
+        return result, False
+
+    async def ado(self, key: str, coroutine_fn, deadline: float = None):
+        """
+        Versão assíncrona de do(): coroutine_fn() roda em uma task compartilhada.
+
+        Se quem iniciou a chamada for cancelado, a task continua para os
+        demais que estão esperando.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(loop)
+                self.calls += 1
+            else:
+                self.saved += 1
+
+        if not leader:
+            # shield: cancelar quem espera (ou o prazo dele) não cancela a chamada dos outros
+            waiting = asyncio.shield(asyncio.wrap_future(flight.future))
+            try:
+                return await asyncio.wait_for(waiting, timeout=time_left(deadline)), True
+            except asyncio.TimeoutError:
+                if flight.future.done():
+                    raise
+                raise DeadlineExceeded("Prazo esgotado à espera da chamada igual") from None
+
+        task = loop.create_task(coroutine_fn())
+        task.add_done_callback(lambda done: self._settle(key, flight, done))
+        return await asyncio.shield(task), False
+
+    def _settle(self, key, flight, task):
+        """Passa o desfecho da task líder para o Future e libera a chave."""
+        if task.cancelled():
+            flight.future.cancel()
+        elif task.exception() is not None:
+            flight.future.set_exception(task.exception())
+        else:
+            flight.future.set_result(task.result())
+        self._forget(key)
+
+    def _forget(self, key):
+        with self._lock:
+            self._flights.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.calls + self.saved
+        return {
+            "calls": self.calls,
+            "saved": self.saved,
+            "saved_rate": self.saved / total if total else 0.0,
+        }
+
+
+# =============================================================================
+# INSTÂNCIA COMPARTILHADA
+# =============================================================================
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight():
+    """Retorna o single-flight padrão, ou None se LLM_SINGLEFLIGHT=0."""
+    if os.getenv("LLM_SINGLEFLIGHT", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    return _single_flight
+
+
+def print_single_flight_stats():
+    """Imprime quantas chamadas foram economizadas (se alguma foi)."""
+    stats = _single_flight.stats()
+    if not stats["saved"]:
+        return
+    print(
+        f"Single-flight: {stats['saved']} chamadas economizadas "
+        f"({stats['calls']} feitas, {stats['saved_rate']:.0%} compartilhadas)"
+    )
@@ -0,0 +1,65 @@
+"""
+=============================================================================
+MEDIÇÃO DO TEMPO DE INICIALIZAÇÃO
+=============================================================================
+
+Registra marcos da inicialização (menu pronto, cliente criado, conexão
+aquecida, primeira resposta da API) para comparar o tempo de import até
+o menu e a latência da primeira chamada.
+
+Para ver o relatório ao sair do menu: LLM_STARTUP_REPORT=1
+=============================================================================
+"""
+
+import os
+import threading
+import time
+
+LABELS = {
+    "menu": "Menu pronto",
+    "client": "Cliente criado",
+    "warmup": "Conexão aquecida",
+    "first_response": "1ª resposta da API",
+}
+
+
+class StartupTimer:
+    """Marcos de tempo desde o import (em segundos)."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = {}
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        """Registra o instante de um marco (só a primeira ocorrência conta)."""
+        with self._lock:
+            self.marks.setdefault(name, time.perf_counter() - self.t0)
+
+    def record(self, name: str, seconds: float):
+        """Registra a duração de uma etapa (só a primeira ocorrência conta)."""
+        with self._lock:
+            self.durations.setdefault(name, seconds)
+
+    def report(self) -> str:
+        parts = []
+        for name, label in LABELS.items():
+            if name in self.marks:
+                text = f"{label} em {self.marks[name] * 1000:.0f} ms"
+                if name in self.durations:
+                    text += f" (levou {self.durations[name] * 1000:.0f} ms)"
+                parts.append(text)
+        return "Inicialização: " + " | ".join(parts) if parts else ""
+
+
+# Instância única, criada no primeiro import (início da aplicação)
+startup = StartupTimer()
+
+
+def print_startup_report():
+    """Imprime o relatório de inicialização se LLM_STARTUP_REPORT=1."""
+    if os.getenv("LLM_STARTUP_REPORT", "0").lower() in ("1", "true", "yes", "on"):
+        report = startup.report()
+        if report:
+            print(report)
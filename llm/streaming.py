@@ -0,0 +1,126 @@
+"""
+=============================================================================
+STREAMING DE RESPOSTAS COM MEDIÇÃO DE LATÊNCIA
+=============================================================================
+
+Sem streaming, a demo fica em silêncio até a resposta inteira chegar.
+Com stream=True, call_llm/run_prompt devolvem um TimedStream: um iterador
+que entrega o texto em pedaços à medida que o modelo gera, e que mede:
+
+    - TTFT (time to first token): quanto tempo até o primeiro pedaço
+    - Tempo total de geração
+
+Exemplo:
+    resposta = print_stream(call_llm("Explique...", stream=True))
+=============================================================================
+"""
+
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+
+# Tempos das últimas chamadas em streaming (para relatórios)
+recent_timings = deque(maxlen=100)
+
+
+@dataclass
+class StreamTiming:
+    """Tempos de uma chamada em streaming (em segundos)."""
+    ttft: float
+    total: float
+    chunks: int
+
+    def __str__(self) -> str:
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "-"
+        return f"TTFT {ttft} | total {self.total:.2f}s | {self.chunks} pedaços"
+
+
+def iter_chunk_text(response, on_usage=None):
+    """
+    Extrai o texto de cada chunk de uma resposta com stream=True.
+
+    Com stream_options={"include_usage": True}, o último chunk traz o
+    `usage` (sem choices); ele é repassado para `on_usage`.
+    """
+    for chunk in response:
+        usage = getattr(chunk, "usage", None)
+        if usage is not None and on_usage is not None:
+            on_usage(usage)
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if content:
+            yield content
+
+
+class TimedStream:
+    """
+    Iterador sobre os pedaços de texto de uma resposta, com medição de tempo.
+
+    A requisição só é enviada quando a iteração começa. Ao final, `text`
+    contém a resposta completa e `timing` os tempos medidos.
+
+    Args:
+        open_stream: Função sem argumentos que inicia a requisição e
+                     retorna um iterável de pedaços de texto
+        on_complete: Chamada com o próprio stream ao fim do streaming
+                     (ex.: para gravar `text` no cache)
+    """
+
+    def __init__(self, open_stream, on_complete=None):
+        self._open_stream = open_stream
+        self._on_complete = on_complete
+        self._consumed = False
+        self.text = ""
+        self.timing = None
+        self.usage = None  # preenchido se a API informar o uso de tokens
+
+    @classmethod
+    def from_text(cls, text: str) -> "TimedStream":
+        """Cria um stream de um texto já pronto (ex.: resposta vinda do cache)."""
+        return cls(lambda: iter([text]))
+
+    def __iter__(self):
+        if self._consumed:
+            raise RuntimeError("Este stream já foi consumido")
+        self._consumed = True
+
+        start = time.perf_counter()
+        ttft = None
+        chunks = 0
+        parts = []
+
+        for piece in self._open_stream():
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            chunks += 1
+            parts.append(piece)
+            yield piece
+
+        self.text = "".join(parts)
+        self.timing = StreamTiming(
+            ttft=ttft, total=time.perf_counter() - start, chunks=chunks
+        )
+        recent_timings.append(self.timing)
+
+        if self._on_complete is not None:
+            self._on_complete(self)
+
+
+def print_stream(stream: TimedStream, show_timing: bool = True) -> str:
+    """
+    Imprime a resposta conforme ela chega e retorna o texto completo.
+
+    Args:
+        stream: Resultado de call_llm/run_prompt com stream=True
+        show_timing: Se True, imprime TTFT e tempo total ao final
+    """
+    for piece in stream:
+        sys.stdout.write(piece)
+        sys.stdout.flush()
+    print()
+
+    if show_timing and stream.timing is not None:
+        print(f"[{stream.timing}]")
+    return stream.text
@@ -17,22 +17,46 @@ Objetivos didáticos:
 # CONFIGURAÇÃO INICIAL (Base Técnica)
 # =============================================================================
 
-import os
 from dotenv import load_dotenv
 
-from openai import OpenAI
+from llm.cache import print_cache_stats
+from llm.cascade import CascadeClassifier
+from llm.cassette import print_cassette_stats
+from llm.classify import BatchClassifier, LabelClassifier
+from llm.client import print_pool_stats, start_warm_up
+from llm.completion import acomplete, complete
+from llm.consistency import SelfConsistency
+from llm.examples import ExampleStore
+from llm.hedging import print_hedge_stats
+from llm.metrics import format_usage, last_usage, print_metrics_summary
+from llm.pipeline import Pipeline, Stage
+from llm.router import choose_model, print_router_stats
+from llm.runner import Prefetcher
+from llm.semantic_cache import print_semantic_cache_stats
+from llm.singleflight import print_single_flight_stats
+from llm.startup import print_startup_report, startup
+from llm.streaming import TimedStream, print_stream
 
 load_dotenv()
 
-# Inicializa o cliente da OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# O cliente da OpenAI é criado sob demanda, na primeira chamada
+# (llm.client.get_client), para o menu abrir sem esperar o SDK
+
+# Modelo padrão. Com LLM_ROUTER=1, o roteador (llm/router.py) pode trocar por
+# chamada conforme a tarefa (ex.: um modelo menor para classificação) e a
+# latência recente
+MODEL = "gpt-4.1-mini"
 
 
 def call_llm(
     prompt: str,
     system_prompt: str = None,
-    temperature: float = 0
-) -> str:
+    temperature: float = 0,
+    stream: bool = False,
+    examples: list = None,
+    task: str = None,
+    **params
+) -> str | TimedStream:
     """
     Função base para chamar o LLM.
 
@@ -41,9 +65,19 @@ def call_llm(
         system_prompt: Instruções de sistema que definem o comportamento do modelo
                       (role, restrições, formato). BEST PRACTICE: sempre usar!
         temperature: Controla a criatividade (0 = determinístico, 1 = criativo)
+        stream: Se True, devolve a resposta em pedaços à medida que é gerada
+        examples: Pares (entrada, saída) de few-shot, enviados como turnos
+                  user/assistant logo após o system prompt
+        task: Dica de tarefa para o roteador de modelos ("classify", "edit",
+              "generate"...); sem dica, usa o modelo padrão (ou "classify"
+              se max_tokens for bem pequeno)
+        **params: Parâmetros extras da API (ex.: max_tokens, logit_bias,
+                  logprobs), repassados como estão; deadline=segundos
+                  limita a chamada inteira (DeadlineExceeded ao estourar)
 
     Returns:
-        Resposta do modelo como string
+        Resposta do modelo como string, ou um TimedStream com os pedaços
+        do texto se stream=True (use print_stream para exibir)
 
     Nota sobre System Prompt (Best Practice):
         - System prompt define QUEM o modelo é e COMO ele deve se comportar
@@ -56,15 +90,48 @@ def call_llm(
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
 
-    # User prompt contém a tarefa/pergunta específica
+    # Exemplos (few-shot) logo após o system: junto com ele formam um
+    # prefixo fixo, que a API reaproveita do cache entre chamadas
+    for example_input, example_output in examples or ():
+        messages.append({"role": "user", "content": example_input})
+        messages.append({"role": "assistant", "content": example_output})
+
+    # User prompt contém a tarefa/pergunta específica (a parte que varia
+    # fica por último)
     messages.append({"role": "user", "content": prompt})
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=messages,
-        temperature=temperature
-    )
-    return response.choices[0].message.content
+    # Cache, limite de taxa, streaming e métricas: llm/completion.py
+    # O roteador escolhe o modelo pela tarefa e pela latência recente
+    model = choose_model(task, MODEL, params)
+    return complete(messages, model=model, temperature=temperature, stream=stream,
+                    task=task, **params)
+
+
+async def acall_llm(
+    prompt: str,
+    system_prompt: str = None,
+    temperature: float = 0,
+    examples: list = None,
+    task: str = None,
+    **params
+) -> str:
+    """
+    Versão assíncrona de call_llm (mesmos argumentos e mesmo retorno).
+
+    Permite disparar várias chamadas ao mesmo tempo. Para muitos prompts,
+    use llm.concurrency.gather_prompts, que limita a concorrência e
+    mantém a ordem dos resultados.
+    """
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    for example_input, example_output in examples or ():
+        messages.append({"role": "user", "content": example_input})
+        messages.append({"role": "assistant", "content": example_output})
+    messages.append({"role": "user", "content": prompt})
+
+    model = choose_model(task, MODEL, params)
+    return await acomplete(messages, model=model, temperature=temperature, task=task, **params)
 
 
 # =============================================================================
@@ -92,7 +159,7 @@ def demo_01_prompt_vago():
     print(f"[User Prompt]: {prompt_vago}\n")
     print("-" * 40)
     print("Resposta:")
-    print(call_llm(prompt_vago))
+    print_stream(call_llm(prompt_vago, stream=True))
 
 
 def demo_02_prompt_estruturado():
@@ -130,7 +197,7 @@ Crie um resumo executivo destacando os pontos principais."""
     print(f"[User Prompt]:\n{user_prompt}")
     print("-" * 40)
     print("Resposta:")
-    print(call_llm(user_prompt, system_prompt=system_prompt))
+    print_stream(call_llm(user_prompt, system_prompt=system_prompt, stream=True))
 
     print("\n" + "-" * 40)
     print("Best Practice:")
@@ -167,7 +234,7 @@ Texto: A inteligência artificial tem mudado o mundo de forma rapida."""
     print(f"[User Prompt]:\n{prompt_frankenstein}")
     print("-" * 40)
     print("Resposta:")
-    print(call_llm(prompt_frankenstein, system_prompt=system_prompt))
+    print_stream(call_llm(prompt_frankenstein, system_prompt=system_prompt, stream=True))
 
     print("\n" + "-" * 40)
     print("Problema: 'Múltiplas tarefas = resultados inconsistentes'")
@@ -179,6 +246,9 @@ def demo_04_pipeline_correto():
 
     Técnica: Cada prompt faz uma coisa só - e faz bem.
     System prompt especializado para cada etapa.
+
+    As etapas são declaradas como um pipeline (llm.pipeline): o PASSO 2
+    depende da saída do PASSO 1, que é injetada no template {texto_revisado}.
     """
     print("\n" + "=" * 60)
     print("DEMO 4: PIPELINE CORRETO (ENCADEAMENTO)")
@@ -189,10 +259,6 @@ def demo_04_pipeline_correto():
     print(f"\nTexto original: {texto_original}")
 
     # ----- PASSO 1: Revisão gramatical -----
-    print("\n" + "-" * 40)
-    print("PASSO 1: Revisão Gramatical")
-    print("-" * 40)
-
     # System prompt especializado para revisão
     system_revisor = """Você é um revisor gramatical especializado em português brasileiro.
 
@@ -201,17 +267,9 @@ Regras:
 - Não altere o estilo ou tom do texto
 - Retorne apenas o texto corrigido, sem explicações"""
 
-    user_revisao = f"Revise o texto: {texto_original}"
-
-    print(f"[System]: Revisor gramatical especializado")
-    texto_revisado = call_llm(user_revisao, system_prompt=system_revisor)
-    print(f"Resultado: {texto_revisado}")
+    user_revisao = "Revise o texto: {texto_original}"
 
     # ----- PASSO 2: Resumo estruturado -----
-    print("\n" + "-" * 40)
-    print("PASSO 2: Resumo Estruturado")
-    print("-" * 40)
-
     # System prompt especializado para resumo
     system_resumidor = """Você é um especialista em síntese de conteúdo.
 
@@ -220,13 +278,33 @@ Regras:
 - Seja conciso e objetivo
 - Use no máximo 3 tópicos"""
 
-    user_resumo = f"Resuma em tópicos: {texto_revisado}"
+    user_resumo = "Resuma em tópicos: {texto_revisado}"
+
+    pipeline = Pipeline([
+        # Revisão gramatical é tarefa curta: com o roteador, um modelo menor
+        # temperature=0 explícita: as saídas podem ser reaproveitadas (LLM_PIPELINE_MEMO)
+        Stage("texto_revisado", system_revisor, user_revisao, temperature=0, task="edit"),
+        Stage("resumo", system_resumidor, user_resumo,
+              depends_on=("texto_revisado",), temperature=0),
+    ], call=acall_llm, model=MODEL)
 
+    resultado = pipeline.run(texto_original=texto_original)
+
+    print("\n" + "-" * 40)
+    print("PASSO 1: Revisão Gramatical")
+    print("-" * 40)
+    print(f"[System]: Revisor gramatical especializado")
+    print(f"Resultado: {resultado.outputs['texto_revisado']}")
+
+    print("\n" + "-" * 40)
+    print("PASSO 2: Resumo Estruturado")
+    print("-" * 40)
     print(f"[System]: Especialista em síntese")
-    resumo = call_llm(user_resumo, system_prompt=system_resumidor)
-    print(f"Resultado:\n{resumo}")
+    print(f"Resultado:\n{resultado.outputs['resumo']}")
 
     print("\n" + "-" * 40)
+    if resultado.memo_report():
+        print(resultado.memo_report())
     print("Best Practice: 'System prompt especializado por etapa'")
 
 
@@ -237,47 +315,148 @@ Regras:
 # "Não expliquei a regra. Mostrei exemplos. O modelo aprende pelo padrão."
 # -----------------------------------------------------------------------------
 
+# Classificador de sentimentos usado nas demos 5 e 11
+SYSTEM_SENTIMENTO = """Você é um classificador de sentimentos especializado em feedback de usuários.
+
+Regras:
+- Classifique como: Positivo, Negativo ou Neutro
+- Responda APENAS com a classificação, nada mais
+- Seja consistente com os exemplos fornecidos"""
+
+# Exemplos rotulados (banco do few-shot dinâmico)
+EXEMPLOS_SENTIMENTO = [
+    ("O produto é excelente e superou minhas expectativas.", "Positivo"),
+    ("O atendimento foi péssimo e demorou muito.", "Negativo"),
+    ("Poderia ter mais opções.", "Neutro"),
+    ("Entrega rápida, tudo certo com o pedido.", "Positivo"),
+    ("Funciona perfeitamente, recomendo.", "Positivo"),
+    ("Chegou quebrado e a troca foi uma novela.", "Negativo"),
+    ("Mandei e-mail para o suporte e nunca responderam.", "Negativo"),
+    ("Parou de funcionar depois de uma semana.", "Negativo"),
+    ("É um produto comum, faz o que promete.", "Neutro"),
+    ("O preço é justo, nada de especial.", "Neutro"),
+    ("Chegou no prazo informado.", "Neutro"),
+    ("Atendimento atencioso, resolveram na hora.", "Positivo"),
+]
+
+
 def demo_05_few_shot():
     """
     DEMONSTRAÇÃO 5: Classificação de Sentimento com Few-Shot
 
-    Técnica: System prompt define o papel + User prompt com exemplos
+    Técnica: System prompt define o papel + exemplos como turnos user/assistant
     """
     print("\n" + "=" * 60)
     print("DEMO 5: FEW-SHOT LEARNING")
     print("=" * 60)
 
     # System prompt define o classificador
-    system_prompt = """Você é um classificador de sentimentos especializado em feedback de usuários.
+    system_prompt = SYSTEM_SENTIMENTO
+
+    # Banco de exemplos rotulados (few-shot dinâmico): cada texto recebe só
+    # os k exemplos mais parecidos, enviados como turnos user/assistant.
+    # O banco pode crescer sem inflar o prompt de cada chamada
+    banco = ExampleStore(EXEMPLOS_SENTIMENTO)
+    # Exemplos fixos (prefixo que não muda) para o lote
+    exemplos_rotulados = banco.examples[:3]
+    modelo_entrada = 'Texto: "{text}"\nSentimento:'
+
+    # Só o texto a classificar varia, e vai por último
+    textos = [
+        "O serviço foi aceitável, nada extraordinário.",
+        "Chegou antes do prazo e funciona perfeitamente.",
+        "Veio com defeito e ninguém respondeu meu e-mail.",
+    ]
 
-Regras:
-- Classifique como: Positivo, Negativo ou Neutro
-- Responda APENAS com a classificação, nada mais
-- Seja consistente com os exemplos fornecidos"""
+    print(f"\n[System Prompt]:\n{system_prompt}\n")
+    print(f"[Banco de exemplos few-shot: {len(banco)}, os 3 mais parecidos vão em cada chamada]:")
+    for entrada, saida in banco.examples:
+        print(f'"{entrada}" -> {saida}')
+    print("-" * 40)
+    classificador = LabelClassifier(
+        ["Positivo", "Negativo", "Neutro"], call=call_llm,
+        system_prompt=system_prompt, model=MODEL,
+    )
+    # Sem logit_bias (tiktoken indisponível), o token mais provável pode não ser um rótulo
+    garantia = "rótulo garantido" if classificador.logit_bias else "rótulo provável"
+    print(f"Respostas (1 token + logprobs: {garantia} e confiança):")
+    # Uma única busca (produto de matrizes) escolhe os exemplos de todos os textos
+    exemplos_por_texto = banco.few_shot(textos, k=3, template=modelo_entrada)
+    for texto, exemplos in zip(textos, exemplos_por_texto):
+        resultado = classificador.classify(modelo_entrada.format(text=texto), examples=exemplos)
+        distribuicao = ", ".join(f"{rotulo} {p:.0%}" for rotulo, p in resultado.probabilities.items())
+        print(f'"{texto}" -> {resultado}')
+        print(f"   [{distribuicao}] [{format_usage(last_usage())}]")
+        print(f"   [exemplos: {', '.join(rotulo for _, rotulo in exemplos)}]")
+
+    # Em volume: vários textos numerados em uma só requisição
+    # (system prompt e exemplos vão uma vez por lote, não uma vez por texto)
+    em_lote = BatchClassifier(
+        ["Positivo", "Negativo", "Neutro"], call=call_llm, system_prompt=system_prompt,
+        examples=exemplos_rotulados,
+    )
+    rotulos = em_lote.classify_many(textos)
+    print(f"\nEm lote: {len(textos)} textos, {em_lote.requests} requisição(ões)")
+    for texto, rotulo in zip(textos, rotulos):
+        print(f'"{texto}" -> {rotulo or "?"}')
 
-    # User prompt contém os exemplos (few-shot) e a tarefa
-    user_prompt = """Exemplos:
-Texto: "O produto é excelente e superou minhas expectativas."
-Sentimento: Positivo
+    print("\nPrefixo fixo (system + exemplos) primeiro, texto variável por último:")
+    print("a API reaproveita o prefixo do cache (a partir de 1024 tokens de prompt).")
+    print("Com exemplos dinâmicos, o prefixo fixo é só o system prompt, mas o prompt fica curto.")
 
-Texto: "O atendimento foi péssimo e demorou muito."
-Sentimento: Negativo
+    print("\n" + "-" * 40)
+    print("Best Practice: 'System define o papel, exemplos fixos primeiro, entrada por último'")
 
-Texto: "Poderia ter mais opções."
-Sentimento: Neutro
 
-Agora classifique:
-Texto: "O serviço foi aceitável, nada extraordinário."
-Sentimento:"""
+def demo_11_cascata():
+    """
+    DEMONSTRAÇÃO 11: Cascata (Modelo Local na Frente do LLM)
 
-    print(f"\n[System Prompt]:\n{system_prompt}\n")
-    print(f"[User Prompt com Few-Shot]:\n{user_prompt}")
+    Técnica: um classificador local (n-gramas) treinado com os exemplos do
+    few-shot responde os casos óbvios; só os ambíguos vão para o LLM, e o
+    rótulo dado pelo LLM vira exemplo de treino do modelo local
+    """
+    print("\n" + "=" * 60)
+    print("DEMO 11: CASCATA (MODELO LOCAL + LLM)")
+    print("=" * 60)
+
+    banco = ExampleStore(EXEMPLOS_SENTIMENTO)
+    modelo_entrada = 'Texto: "{text}"\nSentimento:'
+    classificador = LabelClassifier(
+        ["Positivo", "Negativo", "Neutro"], call=call_llm,
+        system_prompt=SYSTEM_SENTIMENTO, model=MODEL,
+    )
+
+    # O LLM (few-shot com os exemplos mais parecidos) só recebe os casos ambíguos
+    def classificar_com_llm(texto):
+        exemplos = banco.few_shot([texto], template=modelo_entrada)[0]
+        return classificador.classify(modelo_entrada.format(text=texto), examples=exemplos).label
+
+    # O modelo local começa treinado com os mesmos exemplos do few-shot
+    cascata = CascadeClassifier(
+        classificar_com_llm, ["Positivo", "Negativo", "Neutro"], examples=banco.examples,
+    )
+
+    textos = [
+        "O serviço foi aceitável, nada extraordinário.",
+        "Chegou antes do prazo e funciona perfeitamente.",
+        "Veio com defeito e ninguém respondeu meu e-mail.",
+        "Superou minhas expectativas, excelente!",
+        "Péssimo, demorou muito.",
+    ]
+
+    print(f"\n[Modelo local: Naive Bayes treinado com {len(banco)} exemplos]")
+    print(f"[Limiar de confiança: {cascata.threshold:.0%}; abaixo disso, o texto vai para o LLM]")
     print("-" * 40)
-    print("Resposta:")
-    print(call_llm(user_prompt, system_prompt=system_prompt))
+    for texto in textos:
+        resultado = cascata.classify(texto)
+        origem = {"local": "local", "llm": "LLM", "audit": "local, auditado pelo LLM"}[resultado.source]
+        print(f'"{texto}" -> {resultado.label or "?"} ({origem}, local {resultado.confidence:.0%})')
+
+    print("\n" + cascata.summary())
 
     print("\n" + "-" * 40)
-    print("Best Practice: 'System define o papel, User fornece exemplos'")
+    print("Best Practice: 'Casos óbvios não precisam do LLM: ele fica para os ambíguos'")
 
 
 # =============================================================================
@@ -334,7 +513,21 @@ Sempre mostre seu raciocínio antes da resposta."""
     print(f"[User Prompt]: {user_prompt}")
     print("-" * 40)
     print("Resposta:")
-    print(call_llm(user_prompt, system_prompt=system_prompt))
+    print_stream(call_llm(user_prompt, system_prompt=system_prompt, stream=True))
+
+    # Self-consistency: vários raciocínios (temperature > 0) votam na resposta
+    # final; a votação para assim que a maioria está decidida
+    print("\n" + "-" * 40)
+    print("Self-consistency (votação entre raciocínios):")
+    perguntas = [
+        user_prompt,
+        "Uma turma tem 3 salas de 28 alunos e 15 desistem. Quantos alunos restam?",
+        "Quanto é (125 - 47) * 3?",
+    ]
+    votacao = SelfConsistency(call_llm)
+    for resultado in votacao.solve_many(perguntas, system_prompt=system_prompt):
+        print(f"\n[Pergunta]: {resultado.question}")
+        print(f"Resposta: {resultado.summary()}")
 
     print("\n" + "-" * 40)
     print("Best Practice: 'System prompt pode instruir o MÉTODO de raciocínio'")
@@ -374,8 +567,8 @@ Estilo:
     user_gerador = "Escreva um e-mail de vendas oferecendo um software de CRM corporativo."
 
     print(f"[System]: Redator corporativo B2B")
-    resposta_ia = call_llm(user_gerador, system_prompt=system_gerador)
-    print(f"E-mail gerado:\n{resposta_ia}")
+    print("E-mail gerado:")
+    resposta_ia = print_stream(call_llm(user_gerador, system_prompt=system_gerador, stream=True))
 
     # ----- AGENTE 2: Auditor -----
     print("\n" + "-" * 40)
@@ -399,7 +592,7 @@ Formato de resposta:
 
     print(f"[System]: Auditor de qualidade corporativa")
     print("Avaliação do auditor:")
-    print(call_llm(user_auditor, system_prompt=system_auditor))
+    print_stream(call_llm(user_auditor, system_prompt=system_auditor, stream=True))
 
     print("\n" + "-" * 40)
     print("Best Practice: 'Cada agente tem seu próprio system prompt'")
@@ -438,7 +631,7 @@ Estilo de resposta:
     print(f"[Temperature]: 0\n")
     print("-" * 40)
     print("Resposta:")
-    print(call_llm(user_prompt, system_prompt=system_prompt, temperature=0))
+    print_stream(call_llm(user_prompt, system_prompt=system_prompt, temperature=0, stream=True))
 
 
 def demo_10_temperature_alta():
@@ -502,7 +695,7 @@ Princípios:
 - Responda de forma breve e direta"""
 
     print(f"[System]: Consultor conservador")
-    print(call_llm(user_prompt, system_prompt=system_conservador))
+    print_stream(call_llm(user_prompt, system_prompt=system_conservador, stream=True))
 
     # Versão 2: Entusiasta de cripto
     print("\n" + "-" * 40)
@@ -518,7 +711,7 @@ Princípios:
 - Responda de forma breve e direta"""
 
     print(f"[System]: Entusiasta de tecnologia")
-    print(call_llm(user_prompt, system_prompt=system_entusiasta))
+    print_stream(call_llm(user_prompt, system_prompt=system_entusiasta, stream=True))
 
     print("\n" + "-" * 40)
     print("Conclusão: 'Mesmo prompt, comportamentos completamente diferentes'")
@@ -528,24 +721,31 @@ Princípios:
 # MENU PRINCIPAL - EXECUÇÃO DAS DEMOS
 # =============================================================================
 
+# Demos do menu (também usadas pela linha de comando: python -m llm.runner)
+DEMOS = {
+    "1": ("Prompt Vago (sem system)", demo_01_prompt_vago),
+    "2": ("Prompt Estruturado (com system)", demo_02_prompt_estruturado),
+    "3": ("Prompt Frankenstein (Anti-padrão)", demo_03_prompt_frankenstein),
+    "4": ("Pipeline Correto (Encadeamento)", demo_04_pipeline_correto),
+    "5": ("Few-Shot Learning", demo_05_few_shot),
+    "6": ("Sem Chain-of-Thought", demo_06_sem_chain_of_thought),
+    "7": ("Com Chain-of-Thought", demo_07_com_chain_of_thought),
+    "8": ("Temperature Baixa (Precisão)", demo_09_temperature_baixa),
+    "9": ("Temperature Alta (Criatividade)", demo_10_temperature_alta),
+    "10": ("Multi-Agentes (Auditor)", demo_08_multi_agentes),
+    "11": ("BÔNUS: Comparação System Prompts", demo_bonus_comparacao_system),
+    "12": ("Cascata (Modelo Local + LLM)", demo_11_cascata),
+}
+
+
 def menu_principal():
     """
     Menu interativo para executar as demonstrações individualmente.
     """
-    demos = {
-        "1": ("Prompt Vago (sem system)", demo_01_prompt_vago),
-        "2": ("Prompt Estruturado (com system)", demo_02_prompt_estruturado),
-        "3": ("Prompt Frankenstein (Anti-padrão)", demo_03_prompt_frankenstein),
-        "4": ("Pipeline Correto (Encadeamento)", demo_04_pipeline_correto),
-        "5": ("Few-Shot Learning", demo_05_few_shot),
-        "6": ("Sem Chain-of-Thought", demo_06_sem_chain_of_thought),
-        "7": ("Com Chain-of-Thought", demo_07_com_chain_of_thought),
-        "8": ("Temperature Baixa (Precisão)", demo_08_temperature_baixa),
-        "9": ("Temperature Alta (Criatividade)", demo_09_temperature_alta),
-        "10": ("Multi-Agentes (Auditor)", demo_10_multi_agentes),
-        "11": ("BÔNUS: Comparação System Prompts", demo_bonus_comparacao_system),
-        "0": ("Executar TODAS as demos", None),
-    }
+    demos = {**DEMOS, "0": ("Executar TODAS as demos", None)}
+
+    # Abre a conexão com a API em segundo plano (LLM_WARMUP=1)
+    start_warm_up(MODEL)
 
     while True:
         print("\n" + "=" * 60)
@@ -560,6 +760,7 @@ def menu_principal():
         print("\n  [q] Sair")
         print("=" * 60)
 
+        startup.mark("menu")
         escolha = input("\nDigite sua escolha: ").strip().lower()
 
         if escolha == "q":
@@ -571,14 +772,26 @@ def menu_principal():
             print(' Prompt Engineering é programação — só que em linguagem natural."')
             print("\nBest Practice: SEMPRE use System Prompt para definir comportamento!")
             print("=" * 60)
+            print_metrics_summary()
+            print_cache_stats()
+            print_semantic_cache_stats()
+            print_single_flight_stats()
+            print_router_stats()
+            print_hedge_stats()
+            print_cassette_stats()
+            print_startup_report()
+            print_pool_stats()
             break
 
         if escolha == "0":
-            # Executa todas as demos em sequência
-            for key, (_, func) in demos.items():
-                if func is not None:
-                    func()
-                    input("\n[Pressione ENTER para continuar...]")
+            # Executa todas as demos em sequência; as chamadas da próxima já
+            # começam em segundo plano enquanto a atual está na tela
+            with Prefetcher(DEMOS.values()) as execucoes:
+                for resultado in execucoes:
+                    print(resultado.output, end="")
+                    resposta = input("\n[Pressione ENTER para continuar, q para voltar ao menu...]")
+                    if resposta.strip().lower() == "q":
+                        break
         elif escolha in demos:
             _, func = demos[escolha]
             if func:
@@ -590,7 +803,9 @@ def menu_principal():
 # =============================================================================
 # EXECUÇÃO DIRETA (para rodar demos sem menu)
 # =============================================================================
-# Descomente a função que deseja executar:
+# Descomente a função que deseja executar, ou use a linha de comando:
+#     python -m llm.runner demo:4 demo:7
+#     python -m llm.runner demos --parallel 12
 
 if __name__ == "__main__":
 
@@ -603,9 +818,10 @@ if __name__ == "__main__":
     # demo_03_prompt_frankenstein()
     # demo_04_pipeline_correto()
     # demo_05_few_shot()
+    # demo_11_cascata()
     # demo_06_sem_chain_of_thought()
     # demo_07_com_chain_of_thought()
-    # demo_08_temperature_baixa()
-    # demo_09_temperature_alta()
-    # demo_10_multi_agentes()
+    # demo_08_multi_agentes()
+    # demo_09_temperature_baixa()
+    # demo_10_temperature_alta()
     # demo_bonus_comparacao_system()
@@ -0,0 +1,61 @@
+"""
+Fixtures compartilhadas: as chamadas dos testes vão para o servidor
+simulado (llm/mockserver.py), sem rede e sem custo.
+"""
+
+import os
+
+import pytest
+
+from llm import (
+    cache, cassette, client, hedging, pipeline, ratelimit, router, semantic_cache, singleflight,
+)
+from llm import mockserver
+from llm.metrics import metrics
+
+MODEL = "gpt-4.1-mini"
+
+
+def mock_config(**overrides) -> mockserver.MockConfig:
+    """Configuração padrão dos testes: respostas rápidas e sem erros."""
+    overrides.setdefault("latency", mockserver.LatencySpec.parse("fixed:0.01"))
+    return mockserver.MockConfig(seed=1, **overrides)
+
+
+@pytest.fixture(scope="session")
+def mock_server():
+    """Um servidor por sessão: o cliente da API é criado uma vez por processo."""
+    server = mockserver.start_server(mock_config())
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = "mock"
+    client._client = None
+    client.get_client()  # importa o SDK antes: não conta no tempo dos testes
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def server(mock_server, monkeypatch):
+    """
+    Servidor simulado com a configuração padrão e os recursos opcionais
+    desligados; cada teste liga só o que testa (via monkeypatch.setenv).
+    """
+    mock_server.config = mock_config()
+    mock_server.stats = mockserver.MockStats()
+    mock_server.prefix_cache = mockserver.PrefixCache()
+    for name in ("LLM_CACHE", "LLM_SEMANTIC_CACHE", "LLM_HEDGE", "LLM_ROUTER", "LLM_PIPELINE_MEMO"):
+        monkeypatch.setenv(name, "0")
+    for name in ("LLM_CASSETTE_MODE", "LLM_DEADLINE", "LLM_RPM", "LLM_TPM", "LLM_SINGLEFLIGHT"):
+        monkeypatch.delenv(name, raising=False)
+
+    # Instâncias padrão recriadas a partir do ambiente do teste
+    for module, name in (
+        (cache, "_default_cache"), (cassette, "_default_cassette"),
+        (hedging, "_default_hedger"), (pipeline, "_default_memo"),
+        (ratelimit, "_default_limiter"), (router, "_default_router"),
+        (semantic_cache, "_default_cache"),
+    ):
+        monkeypatch.setattr(module, name, None)
+    monkeypatch.setattr(singleflight, "_single_flight", singleflight.SingleFlight())
+    monkeypatch.setattr(metrics, "calls", metrics.calls.__class__(int))
+    return mock_server
@@ -0,0 +1,99 @@
+import json
+import time
+
+import pytest
+
+from llm import batch
+from llm.batch import run_batch
+from main import call_llm
+
+
+class Crash(BaseException):
+    """Simula a queda do processo no meio do lote."""
+
+
+def write_input(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write((record if isinstance(record, str) else json.dumps(record)) + "\n")
+
+
+def read_output(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_non_object_line_is_an_error_record(server, tmp_path):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(source, [{"prompt": "Oi"}, "[1, 2]", "42", "{quebrado", {"prompt": "Tchau"}])
+
+    stats = run_batch(str(source), str(output), call_llm, workers=2, progress_every=0)
+
+    assert stats["processed"] == 5 and stats["errors"] == 3
+    errors = {record["line"]: record["error"] for record in read_output(output) if "error" in record}
+    assert errors[1] == "Linha não é um objeto JSON: list"
+    assert errors[2] == "Linha não é um objeto JSON: int"
+    assert errors[3].startswith("JSON inválido")
+    assert server.stats.requests == 2
+
+
+def test_resume_after_crash_processes_each_line_once(server, tmp_path):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(source, [{"id": str(i), "prompt": f"Pergunta {i}"} for i in range(6)])
+
+    def crash_on_line_3(prompt, **kwargs):
+        if prompt == "Pergunta 3":
+            raise Crash()
+        return call_llm(prompt, **kwargs)
+
+    with pytest.raises(Crash):
+        run_batch(str(source), str(output), crash_on_line_3, workers=1, progress_every=0)
+    # Até 2 linhas por worker ficam em andamento: vizinhas da 3 podem ou não
+    # ter sido gravadas antes da queda
+    before = [record["line"] for record in read_output(output)]
+    assert 3 not in before and len(set(before)) == len(before)
+
+    stats = run_batch(str(source), str(output), call_llm, workers=1, progress_every=0)
+
+    assert stats["processed"] == 6 - len(before)
+    assert sorted(record["line"] for record in read_output(output)) == list(range(6))
+
+
+class RecordingCheckpoint(batch.Checkpoint):
+    """Checkpoint que anota o maior atraso da leitura e quantas vezes gravou."""
+
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_tracked = self.saves = 0
+        RecordingCheckpoint.instances.append(self)
+
+    def track(self, line, end_offset):
+        super().track(line, end_offset)
+        self.max_tracked = max(self.max_tracked, len(self._inflight))
+
+    def save(self):
+        super().save()
+        self.saves += 1
+
+
+def test_slow_line_holds_the_read_window(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "Checkpoint", RecordingCheckpoint)
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(source, [{"prompt": f"Pergunta {i}"} for i in range(40)])
+
+    def slow_first_line(prompt, **kwargs):
+        if prompt == "Pergunta 0":
+            time.sleep(0.3)
+        return call_llm(prompt, **kwargs)
+
+    stats = run_batch(str(source), str(output), slow_first_line, workers=2, progress_every=0)
+
+    checkpoint = RecordingCheckpoint.instances[-1]
+    assert stats["processed"] == 40
+    # Nunca mais que 2 x workers linhas lidas além da linha lenta
+    assert checkpoint.max_tracked <= 4 and not checkpoint.done
+    # Gravações a cada 1 s (e no fim), não a cada linha
+    assert checkpoint.saves <= 3
+    assert json.loads((tmp_path / "out.jsonl.checkpoint").read_text())["line"] == 40
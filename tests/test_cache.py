@@ -0,0 +1,88 @@
+import types
+
+import pytest
+
+from llm import cache as cache_module
+from llm.cache import ResponseCache
+from llm.completion import complete
+
+from conftest import MODEL
+
+
+def ask(text: str) -> list:
+    return [{"role": "user", "content": text}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio manual para o cache: clock.now avança só quando o teste manda."""
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def new_cache(tmp_path, **kwargs) -> ResponseCache:
+    return ResponseCache(path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = new_cache(tmp_path, ttl=10)
+    cache.set(MODEL, ask("Oi"), 0, "Olá")
+
+    clock.now += 5
+    assert cache.get(MODEL, ask("Oi"), 0) == "Olá"
+    clock.now += 6
+    assert cache.get(MODEL, ask("Oi"), 0) is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_max_entries_evicts_least_recently_used(tmp_path, clock):
+    cache = new_cache(tmp_path, max_entries=2)
+    cache.set(MODEL, ask("a"), 0, "A")
+    clock.now += 1
+    cache.set(MODEL, ask("b"), 0, "B")
+    clock.now += 1
+    cache.get(MODEL, ask("a"), 0)  # "a" passa a ser a mais recente
+    clock.now += 1
+    cache.set(MODEL, ask("c"), 0, "C")
+
+    assert len(cache) == 2
+    assert cache.get(MODEL, ask("b"), 0) is None
+    assert cache.get(MODEL, ask("a"), 0) == "A"
+    assert cache.get(MODEL, ask("c"), 0) == "C"
+
+
+def test_max_bytes_evicts_least_recently_used(tmp_path, clock):
+    cache = new_cache(tmp_path, max_bytes=25)
+    for text in ("a", "b", "c"):
+        cache.set(MODEL, ask(text), 0, text * 10)
+        clock.now += 1
+
+    assert len(cache) == 2
+    assert cache.get(MODEL, ask("a"), 0) is None
+    assert cache.get(MODEL, ask("c"), 0) == "c" * 10
+
+
+def test_temperature_above_zero_bypasses(tmp_path):
+    cache = new_cache(tmp_path)
+    cache.set(MODEL, ask("Oi"), 0.7, "Olá")
+    assert len(cache) == 0
+    assert cache.get(MODEL, ask("Oi"), 0.7) is None
+    assert cache.stats()["bypassed"] == 1
+    assert cache.stats()["misses"] == 0
+
+
+def test_survives_reopening(tmp_path):
+    new_cache(tmp_path).set(MODEL, ask("Oi"), 0, "Olá")
+    assert new_cache(tmp_path).get(MODEL, ask("Oi"), 0) == "Olá"
+
+
+def test_complete_serves_repeat_from_cache(server, monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    first = complete(ask("Oi"), MODEL, 0)
+    assert complete(ask("Oi"), MODEL, 0) == first
+    complete(ask("Oi"), MODEL, 0.7)
+    complete(ask("Oi"), MODEL, 0.7)
+    assert server.stats.requests == 3
@@ -0,0 +1,33 @@
+from llm.cascade import CascadeClassifier
+from llm.metrics import metrics
+
+EXAMPLES = [
+    ("Amei, excelente, recomendo", "Positivo"),
+    ("Excelente produto, amei", "Positivo"),
+    ("Péssimo, travou, horrível", "Negativo"),
+    ("Horrível, péssimo atendimento", "Negativo"),
+]
+
+
+def test_local_answers_stay_out_of_session_metrics(server):
+    forwarded = []
+    cascade = CascadeClassifier(lambda text: forwarded.append(text) or "Negativo",
+                                ["Positivo", "Negativo"], examples=EXAMPLES, threshold=0.9)
+
+    assert cascade.classify("Amei, excelente!").source == "local"
+    assert cascade.classify("Chegou ontem").source == "llm"
+    assert forwarded == ["Chegou ontem"]
+    assert cascade.stats()["local"] == 1
+    assert not metrics.calls
+
+
+def test_audits_are_paid_calls_not_local_hits(server):
+    cascade = CascadeClassifier(lambda text: "Negativo", ["Positivo", "Negativo"],
+                                examples=EXAMPLES, threshold=0.9, audit_rate=1.0)
+
+    result = cascade.classify("Amei, excelente!")
+    assert (result.source, result.label, result.audit_label) == ("audit", "Positivo", "Negativo")
+    assert result.corrected
+    stats = cascade.stats()
+    assert (stats["local"], stats["audited"], stats["deflection_rate"]) == (0, 1, 0.0)
+    assert stats["audit_agreement"] == 0.0
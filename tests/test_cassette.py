@@ -0,0 +1,59 @@
+import pytest
+
+from llm import cassette
+from llm.cassette import CassetteMiss
+from llm.completion import complete
+
+from conftest import MODEL
+
+
+def ask(text: str, temperature: float = 0):
+    return complete([{"role": "user", "content": text}], MODEL, temperature)
+
+
+def use_cassette(monkeypatch, path, mode: str):
+    """Troca o modo do cassete padrão (recriado na próxima chamada)."""
+    monkeypatch.setenv("LLM_CASSETTE_MODE", mode)
+    monkeypatch.setenv("LLM_CASSETTE", str(path))
+    monkeypatch.setattr(cassette, "_default_cassette", None)
+
+
+def test_strict_replays_recording_without_requests(server, monkeypatch, tmp_path):
+    path = tmp_path / "aulas.jsonl"
+    use_cassette(monkeypatch, path, "record")
+    recorded = [ask("Oi"), ask("Tchau"), ask("Oi", 0.9), ask("Oi", 0.9)]
+    assert server.stats.requests == 4
+
+    use_cassette(monkeypatch, path, "strict")
+    # Repetições da mesma requisição voltam na ordem em que foram gravadas
+    assert [ask("Oi"), ask("Tchau"), ask("Oi", 0.9), ask("Oi", 0.9)] == recorded
+    assert server.stats.requests == 4
+    assert cassette.get_cassette().stats()["replayed"] == 4
+
+
+def test_strict_miss_raises_without_calling_the_api(server, monkeypatch, tmp_path):
+    path = tmp_path / "aulas.jsonl"
+    use_cassette(monkeypatch, path, "record")
+    ask("Oi")
+
+    use_cassette(monkeypatch, path, "strict")
+    with pytest.raises(CassetteMiss, match="Nunca gravada"):
+        ask("Nunca gravada")
+    assert server.stats.requests == 1
+    assert cassette.get_cassette().stats()["missing"] == 1
+    assert path.read_text(encoding="utf-8").count("\n") == 1
+
+
+def test_replay_fills_misses_and_appends(server, monkeypatch, tmp_path):
+    path = tmp_path / "aulas.jsonl"
+    use_cassette(monkeypatch, path, "record")
+    ask("Oi")
+
+    use_cassette(monkeypatch, path, "replay")
+    ask("Oi")
+    ask("Nova")
+    assert server.stats.requests == 2
+
+    use_cassette(monkeypatch, path, "strict")
+    ask("Nova")
+    assert server.stats.requests == 2
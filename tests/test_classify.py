@@ -0,0 +1,177 @@
+import math
+import random
+import re
+import time
+
+import pytest
+
+from llm import classify
+from llm.classify import BatchClassifier, LabelClassifier
+from llm.completion import Completion
+
+from conftest import MODEL
+
+LABELS = ["Sim", "Não", "Talvez"]
+
+
+class FakeEncoding:
+    """Um token por letra inicial (basta para os rótulos de teste)."""
+
+    def encode(self, text):
+        return [ord(text[0])]
+
+    def decode(self, tokens):
+        return "".join(chr(token) for token in tokens)
+
+
+def use_fake_encoding(monkeypatch) -> list:
+    models = []
+    monkeypatch.setattr(classify, "_encoding", lambda model: models.append(model) or FakeEncoding())
+    return models
+
+
+def test_tokenizer_comes_from_routed_model(server, monkeypatch):
+    models = use_fake_encoding(monkeypatch)
+    monkeypatch.setenv("LLM_ROUTER", "1")
+    classifier = LabelClassifier(LABELS, call=None, model=MODEL)
+    assert models == ["gpt-4.1-nano"]
+    assert classifier.logit_bias == {str(ord(label[0])): 100 for label in LABELS}
+
+
+def test_tokenizer_uses_default_model_without_router(server, monkeypatch):
+    models = use_fake_encoding(monkeypatch)
+    LabelClassifier(LABELS, call=None, model=MODEL)
+    assert models == [MODEL]
+
+
+def test_without_tokenizer_there_is_no_bias(server, monkeypatch):
+    monkeypatch.setattr(classify, "_encoding", lambda model: None)
+    classifier = LabelClassifier(LABELS, call=None, model=MODEL)
+    assert classifier.logit_bias is None
+    assert "logit_bias" not in classifier.request_params()
+
+
+class PairEncoding:
+    """Um token a cada duas letras: "Negativo" e "Neutro" começam com "Ne"."""
+
+    def __init__(self):
+        self.vocabulary = {}
+
+    def encode(self, text):
+        pieces = [text[i:i + 2] for i in range(0, len(text), 2)]
+        return [self.vocabulary.setdefault(piece, len(self.vocabulary)) for piece in pieces]
+
+    def decode(self, tokens):
+        pieces = {token: piece for piece, token in self.vocabulary.items()}
+        return "".join(pieces[token] for token in tokens)
+
+
+def completion(text: str, steps: list) -> Completion:
+    """Resposta com logprobs: um (token gerado, {alternativa: probabilidade}) por posição."""
+    response = Completion(text)
+    response.logprobs = [
+        {
+            "token": token,
+            "logprob": math.log(top[token]),
+            "top_logprobs": {alternative: math.log(p) for alternative, p in top.items()},
+        }
+        for token, top in steps
+    ]
+    return response
+
+
+def test_shared_first_token_generates_until_labels_differ(server, monkeypatch):
+    encoding = PairEncoding()
+    monkeypatch.setattr(classify, "_encoding", lambda model: encoding)
+    classifier = LabelClassifier(["Positivo", "Negativo", "Neutro"], call=None, model=MODEL)
+
+    assert classifier.max_tokens == 2
+    assert classifier.request_params()["max_tokens"] == 2
+    biased = {encoding.decode([int(token)]) for token in classifier.logit_bias}
+    assert biased == {"Po", "Ne", "ga", "ut"}
+
+    result = classifier.parse(completion("Neut", [
+        ("Ne", {"Ne": 0.8, "Po": 0.2}),
+        ("ut", {"ut": 0.75, "ga": 0.25}),
+    ]))
+    assert result.label == "Neutro"
+    assert result.probabilities == pytest.approx({"Neutro": 0.6, "Positivo": 0.2, "Negativo": 0.2})
+
+    # Rótulo já identificado no primeiro token: o resto é ignorado
+    result = classifier.parse(completion("Posi", [
+        ("Po", {"Po": 0.9, "Ne": 0.1}),
+        ("si", {"si": 1.0}),
+    ]))
+    assert result.label == "Positivo"
+    assert result.confidence == pytest.approx(1.0)
+
+
+def test_distinct_first_tokens_keep_a_single_token(server, monkeypatch):
+    monkeypatch.setattr(classify, "_encoding", lambda model: PairEncoding())
+    classifier = LabelClassifier(["Positivo", "Negativo", "Talvez"], call=None, model=MODEL)
+    assert classifier.max_tokens == 1
+    assert len(classifier.logit_bias) == 3
+
+
+class FakeBatchModel:
+    """
+    Responde os lotes numerados com o rótulo escrito no próprio texto
+    ("texto 3: Talvez" -> "Talvez"). Lotes com mais de `garble_above` textos
+    voltam estragados do jeito escolhido.
+    """
+
+    def __init__(self, garble_above: int = None, garble: str = "numbers", delay: float = 0.0):
+        self.garble_above = garble_above
+        self.garble = garble
+        self.delay = delay
+        self.sizes = []
+
+    def __call__(self, prompt, **kwargs):
+        texts = re.findall(r"^\d+\. (.+)$", prompt, re.MULTILINE)
+        self.sizes.append(len(texts))
+        if self.delay:
+            time.sleep(random.uniform(0, self.delay))
+        if self.garble_above is not None and len(texts) > self.garble_above:
+            if self.garble == "numbers":
+                return "\n".join(f"1. {text.split(': ')[1]}" for text in texts)
+            return '{"rotulos": ["Sim", '
+        return "\n".join(f"{i}. {text.split(': ')[1]}" for i, text in enumerate(texts, start=1))
+
+
+def batch_texts(count: int) -> tuple:
+    texts = [f"texto {i}: {LABELS[i % 3]}" for i in range(count)]
+    return texts, [LABELS[i % 3] for i in range(count)]
+
+
+def test_malformed_batch_response_falls_back_item_by_item():
+    model = FakeBatchModel(garble_above=1, garble="json")
+    texts, expected = batch_texts(5)
+    classifier = BatchClassifier(LABELS, model, max_batch=5)
+
+    assert classifier.classify_many(texts) == expected
+    assert classifier.stats()["fallbacks"] == 5
+    assert model.sizes == [5, 1, 1, 1, 1, 1]
+
+
+def test_shuffled_numbering_halves_the_next_batches():
+    model = FakeBatchModel(garble_above=4)
+    texts, expected = batch_texts(16)
+    classifier = BatchClassifier(LABELS, model, max_batch=8)
+
+    assert classifier.classify_many(texts) == expected
+    # Lote de 8 embaralhado: refeito item a item, e o próximo lote já tem 4
+    assert model.sizes == [8] + [1] * 8 + [4, 4]
+    assert classifier.stats()["fallbacks"] == 8
+
+
+def test_parallel_batches_keep_order_and_adapt():
+    model = FakeBatchModel(garble_above=4, delay=0.01)
+    texts, expected = batch_texts(64)
+    classifier = BatchClassifier(LABELS, model, max_batch=8)
+
+    assert classifier.classify_many(texts, workers=3) == expected
+    batches = [size for size in model.sizes if size > 1]
+    # 64 textos em lotes de 8: um lote de 4 só aparece se os lotes seguintes
+    # foram cortados depois de o batch_size cair
+    assert batches[0] == 8 and 4 in batches
+    assert classifier.stats()["requests"] == len(model.sizes)
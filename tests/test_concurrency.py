@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from llm.concurrency import gather_prompts, gather_prompts_sync
+from main import acall_llm
+
+
+class Tracked:
+    """acall_llm com contagem de chamadas em andamento; os primeiros prompts demoram mais."""
+
+    def __init__(self, total: int, fail_on: str = None):
+        self.total = total
+        self.fail_on = fail_on
+        self.in_flight = self.peak = 0
+        self.started = []
+
+    async def __call__(self, prompt, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.started.append(prompt)
+        try:
+            await asyncio.sleep(0.005 * (self.total - int(prompt.split()[-1])))
+            if prompt == self.fail_on:
+                raise ValueError(f"falhou: {prompt}")
+            return prompt, await acall_llm(prompt, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+def prompts(count: int) -> list:
+    return [f"Pergunta {i}" for i in range(count)]
+
+
+def test_results_keep_input_order_and_respect_the_limit(server):
+    call = Tracked(12)
+    results = gather_prompts_sync(call, prompts(12), concurrency=3, system_prompt="Seja breve.")
+
+    assert [prompt for prompt, _ in results] == prompts(12)
+    assert all(answer for _, answer in results)
+    assert call.peak == 3
+    assert server.stats.requests == 12
+
+
+def test_first_error_propagates_and_cancels_the_rest(server):
+    call = Tracked(8, fail_on="Pergunta 2")
+    with pytest.raises(ValueError, match="Pergunta 2"):
+        gather_prompts_sync(call, prompts(8), concurrency=2)
+    assert len(call.started) < 8
+
+
+def test_return_exceptions_keeps_the_error_in_place(server):
+    call = Tracked(5, fail_on="Pergunta 1")
+    results = gather_prompts_sync(call, prompts(5), concurrency=2, return_exceptions=True)
+
+    assert isinstance(results[1], ValueError)
+    assert [result[0] for i, result in enumerate(results) if i != 1] == \
+        ["Pergunta 0", "Pergunta 2", "Pergunta 3", "Pergunta 4"]
+
+
+def test_concurrency_must_be_positive():
+    with pytest.raises(ValueError):
+        asyncio.run(gather_prompts(acall_llm, ["Oi"], concurrency=0))
@@ -0,0 +1,48 @@
+import pytest
+
+from llm.completion import complete
+from llm.consistency import SelfConsistency, extract_number
+from llm.metrics import caller_scope, metrics
+
+from conftest import MODEL
+
+
+def call(prompt, temperature=0, **params):
+    return complete([{"role": "user", "content": prompt}], MODEL, temperature, **params)
+
+
+def call_without_n(prompt, n=1, **params):
+    """Provedor sem suporte a n: as amostras que faltam vão em chamadas simples."""
+    return call(prompt, **params)
+
+
+def callers() -> set:
+    return {caller for (_, caller, _) in metrics.calls}
+
+
+def test_parallel_samples_keep_the_caller(server):
+    with caller_scope("demo_07_teste"):
+        result = SelfConsistency(call_without_n, min_samples=4, max_samples=4).solve("Quanto é 2 + 2?")
+    assert result.requests == 4
+    assert callers() == {"demo_07_teste"}
+
+
+def test_solve_many_keeps_the_caller(server):
+    with caller_scope("demo_07_teste"):
+        results = SelfConsistency(call, max_samples=4).solve_many(["1 + 1?", "2 + 2?", "3 + 3?"])
+    assert [result.samples for result in results] == [4, 4, 4]
+    assert callers() == {"demo_07_teste"}
+    assert server.stats.requests == 3
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("3*28=84 alunos. Portanto, 84 - 15 = 69", "69"),
+    ("Logo, 17*24 = 408 e 408+38 = 446", "446"),
+    ("17*24 = 408. Total parcial: 408. Somando 38, a resposta é 446.", "446"),
+    ("A resposta é 446 (17*24 = 408 + 38).", "446"),
+    ("Portanto, são 1.234,5 reais.", "1234.5"),
+    ("Resposta final:\n\n**446**", "446"),
+    ("Sem marcador: 12 + 30 = 42", "42"),
+])
+def test_extract_number_takes_the_final_result(text, expected):
+    assert extract_number(text) == expected
@@ -0,0 +1,14 @@
+import subprocess
+import sys
+
+from llm.examples import ExampleStore
+
+
+def test_import_main_does_not_load_numpy():
+    code = "import sys, main; assert 'numpy' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_nearest_example_comes_last():
+    store = ExampleStore([("O app travou de novo", "Negativo"), ("Amei o atendimento", "Positivo")])
+    assert store.nearest("O app travando sempre", k=2)[-1] == ("O app travou de novo", "Negativo")
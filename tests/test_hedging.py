@@ -0,0 +1,87 @@
+import asyncio
+import itertools
+import time
+
+import pytest
+
+from llm.client import get_async_client, get_client
+from llm.completion import complete
+from llm.hedging import DeadlineExceeded, Hedger, deadline_at
+from llm.mockserver import LatencySpec
+from llm.ratelimit import RateLimiter
+
+from conftest import MODEL
+
+MESSAGES = [{"role": "user", "content": "Oi"}]
+
+
+def trained_hedger(budget: float = 1.0) -> Hedger:
+    """Hedger que já viu respostas de 0.1 s: dispara a reserva aos 0.1 s."""
+    hedger = Hedger(budget=budget, min_samples=5)
+    for _ in range(5):
+        hedger.observe(MODEL, 0.1)
+    return hedger
+
+
+class SlowFirst(LatencySpec):
+    """A primeira requisição demora 1 s; as seguintes (a reserva), 10 ms."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = itertools.count()
+
+    def sample(self, rng) -> float:
+        return 1.0 if next(self.requests) == 0 else 0.01
+
+
+def slow_then_fast(server):
+    server.config.latency = SlowFirst()
+
+
+def request():
+    return RateLimiter().create(get_client(), model=MODEL, messages=MESSAGES, temperature=0)
+
+
+def test_hedge_wins_over_slow_primary(server):
+    hedger = trained_hedger()
+    slow_then_fast(server)
+    start = time.perf_counter()
+    hedger.run(MODEL, request)
+    assert time.perf_counter() - start < 0.5
+    assert hedger.stats()["hedge_wins"] == 1
+    assert server.stats.requests == 2
+
+
+def test_async_hedge_wins_over_slow_primary(server):
+    hedger = trained_hedger()
+
+    async def arequest():
+        return await RateLimiter().acreate(get_async_client(), model=MODEL,
+                                           messages=MESSAGES, temperature=0)
+
+    async def main():
+        slow_then_fast(server)
+        start = time.perf_counter()
+        await hedger.arun(MODEL, arequest)
+        return time.perf_counter() - start
+
+    assert asyncio.run(main()) < 0.5
+    assert hedger.stats()["hedge_wins"] == 1
+
+
+def test_budget_denies_hedges(server):
+    hedger = trained_hedger(budget=0.0)
+    server.config.latency = LatencySpec.parse("fixed:0.3")
+    hedger.run(MODEL, request)
+    assert hedger.stats()["hedged"] == 0
+    assert hedger.stats()["denied"] == 1
+    assert server.stats.requests == 1
+
+
+def test_complete_with_hedging_respects_deadline(server, monkeypatch):
+    monkeypatch.setenv("LLM_HEDGE", "1")
+    server.config.latency = LatencySpec.parse("fixed:1.0")
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        complete(MESSAGES, MODEL, 0, deadline=0.2)
+    assert time.perf_counter() - start < 0.6
@@ -0,0 +1,32 @@
+from llm.metrics import format_usage, last_usage
+from main import call_llm
+
+SYSTEM = "Classifique o sentimento. " + "Regras detalhadas do classificador. " * 150
+EXAMPLES = [("Amei o produto!", "Positivo"), ("Travou de novo.", "Negativo")]
+
+
+def test_examples_sit_between_system_and_the_input(server):
+    call_llm("Chegou ontem.", system_prompt=SYSTEM, examples=EXAMPLES)
+
+    assert server.stats.bodies[-1]["messages"] == [
+        {"role": "system", "content": SYSTEM},
+        {"role": "user", "content": "Amei o produto!"},
+        {"role": "assistant", "content": "Positivo"},
+        {"role": "user", "content": "Travou de novo."},
+        {"role": "assistant", "content": "Negativo"},
+        {"role": "user", "content": "Chegou ontem."},
+    ]
+
+
+def test_stable_prefix_is_reported_as_cached_tokens(server):
+    call_llm("Primeiro texto.", system_prompt=SYSTEM, examples=EXAMPLES)
+    first = last_usage()
+    call_llm("Segundo texto, diferente.", system_prompt=SYSTEM, examples=EXAMPLES)
+    second = last_usage()
+
+    first_messages, second_messages = (body["messages"] for body in list(server.stats.bodies)[-2:])
+    assert first_messages[:-1] == second_messages[:-1]
+    assert second.prompt_tokens_details.cached_tokens >= 1024
+    assert second.prompt_tokens_details.cached_tokens % 128 == 0
+    assert f"{second.prompt_tokens_details.cached_tokens} em cache" in format_usage(second)
+    assert first.prompt_tokens_details.cached_tokens == 0
@@ -0,0 +1,50 @@
+import json
+import types
+
+from llm.metrics import Metrics
+
+LABELS = 'caller="demo_01",model="gpt-4.1-mini",source="api"'
+
+
+def usage(prompt: int, completion: int, cached: int = 0):
+    return types.SimpleNamespace(
+        prompt_tokens=prompt, completion_tokens=completion,
+        prompt_tokens_details=types.SimpleNamespace(cached_tokens=cached),
+    )
+
+
+def recorded() -> Metrics:
+    metrics = Metrics()
+    for latency in (0.07, 0.3, 2.0):
+        metrics.record("gpt-4.1-mini", "demo_01", "api", latency, usage=usage(100, 20, cached=64))
+    metrics.record("gpt-4.1-mini", "demo_01", "cache", 0.001)
+    return metrics
+
+
+def test_prometheus_histogram_lines():
+    lines = recorded().to_prometheus().splitlines()
+
+    assert 'llm_calls_total{model="gpt-4.1-mini",caller="demo_01",source="api"} 3' in lines
+    assert "# TYPE llm_request_duration_seconds histogram" in lines
+    for bound, count in (("0.05", 0), ("0.1", 1), ("0.25", 1), ("0.5", 2), ("2.5", 3), ("+Inf", 3)):
+        assert f'llm_request_duration_seconds_bucket{{{LABELS},le="{bound}"}} {count}' in lines
+    assert f"llm_request_duration_seconds_count{{{LABELS}}} 3" in lines
+    assert any(line.startswith(f"llm_request_duration_seconds_sum{{{LABELS}}} 2.37") for line in lines)
+    assert 'llm_cached_tokens_bucket{caller="demo_01",model="gpt-4.1-mini",le="64"} 3' in lines
+
+
+def test_json_shape(tmp_path):
+    metrics = recorded()
+    path = tmp_path / "metricas.json"
+    metrics.write(str(path))
+    data = json.loads(path.read_text(encoding="utf-8"))
+
+    assert {"model": "gpt-4.1-mini", "caller": "demo_01", "source": "api", "total": 3} in data["calls"]
+    latency = next(series for series in data["llm_request_duration_seconds"]
+                   if series["labels"]["source"] == "api")
+    assert latency["count"] == 3
+    assert latency["buckets"]["0.5"] == 2 and latency["buckets"]["0.05"] == 0
+    assert latency["p50"] == 0.3
+    assert set(latency) == {"labels", "count", "sum", "buckets", "p50", "p95", "p99"}
+    assert data["llm_prompt_tokens"][0]["count"] == 3
+    assert data["llm_time_to_first_token_seconds"] == []
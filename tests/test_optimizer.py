@@ -0,0 +1,48 @@
+from llm.metrics import metrics
+from llm.optimizer import Candidate, CandidateResult, FewShotOptimizer, format_report, pareto_front
+from main import call_llm
+
+from conftest import MODEL
+
+SPEC = {
+    "labels": ["Sim", "Não"],
+    "template": "Texto: {text}",
+    "system_prompts": {"curto": "Responda Sim ou Não."},
+    "examples": [["Gostei.", "Sim"]],
+    "eval": [["Adorei.", "Sim"], ["Odiei.", "Não"]],
+}
+CANDIDATES = [Candidate("curto", ()), Candidate("curto", (0,))]
+
+
+def test_workers_keep_the_caller(server):
+    FewShotOptimizer(SPEC, call_llm, model=MODEL, results_path=None, workers=4).evaluate(CANDIDATES)
+    assert {caller for (_, caller, _) in metrics.calls} == {"otimizador-few-shot"}
+
+
+def test_cached_answers_do_not_count_as_latency(server, monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+
+    first = FewShotOptimizer(SPEC, call_llm, model=MODEL, results_path=None).evaluate(CANDIDATES)
+    assert all(result.latency is not None for result in first)
+
+    cached = FewShotOptimizer(SPEC, call_llm, model=MODEL, results_path=None).evaluate(CANDIDATES)
+    assert all(result.latency is None for result in cached)
+    assert server.stats.requests == 4
+    assert "Latência fora da fronteira" in format_report(cached, pareto_front(cached))
+
+
+def test_results_are_keyed_on_the_routed_model(server, monkeypatch):
+    plain = FewShotOptimizer(SPEC, call_llm, model=MODEL, results_path=None)
+    monkeypatch.setenv("LLM_ROUTER", "1")
+    routed = FewShotOptimizer(SPEC, call_llm, model=MODEL, results_path=None)
+
+    assert routed.routed_model == "gpt-4.1-nano"
+    key = (CANDIDATES[0], "Adorei.", "Sim")
+    assert plain._key(*key) != routed._key(*key)
+
+
+def test_pareto_ignores_latency_when_some_result_has_none():
+    fast = CandidateResult("a", "curto", [], accuracy=1.0, prompt_tokens=10, latency=None, evaluated=0)
+    slow = CandidateResult("b", "curto", [], accuracy=1.0, prompt_tokens=20, latency=0.5, evaluated=2)
+    assert pareto_front([fast, slow]) == [fast]
@@ -0,0 +1,146 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from llm.client import get_async_client, get_client
+from llm.hedging import DeadlineExceeded, deadline_at
+from llm.mockserver import LatencySpec
+from llm.ratelimit import RateLimiter
+
+from conftest import MODEL
+
+MESSAGES = [{"role": "user", "content": "Oi"}]
+
+
+class FailFirst(random.Random):
+    """Sorteio do servidor simulado: as `failures` primeiras requisições falham."""
+
+    def __init__(self, failures: int):
+        super().__init__(1)
+        self.failures = failures
+
+    def random(self):
+        if self.failures:
+            self.failures -= 1
+            return 0.0
+        return 1.0
+
+    def choice(self, seq):
+        return seq[0]
+
+
+def fail_first(server, monkeypatch, failures: int, status: int):
+    server.config.error_rate = 0.5
+    server.config.error_statuses = (status,)
+    server.config.retry_after_ms = 10
+    monkeypatch.setattr(server, "rng", FailFirst(failures))
+
+
+def empty_limiter(rpm: float) -> RateLimiter:
+    """Limitador sem saldo: a próxima requisição espera 60/rpm segundos."""
+    limiter = RateLimiter(rpm=rpm, base_delay=0.01)
+    limiter.requests.level = 0.0
+    return limiter
+
+
+def test_waits_for_the_bucket_and_counts_it(server):
+    limiter = empty_limiter(rpm=600)  # 0.1 s até a próxima ficha
+    start = time.perf_counter()
+    limiter.create(get_client(), model=MODEL, messages=MESSAGES, temperature=0)
+    assert time.perf_counter() - start >= 0.09
+    assert limiter.throttled == 1
+    assert server.stats.requests == 1
+
+
+def test_bucket_slower_than_deadline_fails_fast(server):
+    limiter = empty_limiter(rpm=60)  # 1 s até a próxima ficha
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        limiter.create(get_client(), deadline=deadline_at(0.2), model=MODEL,
+                       messages=MESSAGES, temperature=0)
+    assert time.perf_counter() - start < 0.1
+    assert server.stats.requests == 0
+
+
+def test_async_bucket_slower_than_deadline_fails_fast(server):
+    async def main():
+        limiter = empty_limiter(rpm=60)
+        await limiter.acreate(get_async_client(), deadline=deadline_at(0.2), model=MODEL,
+                              messages=MESSAGES, temperature=0)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert server.stats.requests == 0
+
+
+def test_retry_after_beyond_deadline_stops_retrying(server):
+    server.config.error_rate = 1.0
+    server.config.error_statuses = (429,)
+    server.config.retry_after_ms = 1000
+    limiter = RateLimiter(max_retries=5)
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        limiter.create(get_client(), deadline=deadline_at(0.3), model=MODEL,
+                       messages=MESSAGES, temperature=0)
+    assert time.perf_counter() - start < 0.3
+    assert server.stats.requests == 1
+
+
+def test_deadline_cuts_a_slow_response(server):
+    server.config.latency = LatencySpec.parse("fixed:1.0")
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        RateLimiter(max_retries=2).create(get_client(), deadline=deadline_at(0.2), model=MODEL,
+                                          messages=MESSAGES, temperature=0)
+    assert time.perf_counter() - start < 0.6
+
+
+def test_429_then_success_is_retried(server, monkeypatch):
+    fail_first(server, monkeypatch, failures=2, status=429)
+    limiter = RateLimiter(max_retries=3)
+    response = limiter.create(get_client(), model=MODEL, messages=MESSAGES, temperature=0)
+    assert response.choices[0].message.content
+    assert limiter.stats()["retries"] == 2
+    assert limiter.stats()["rate_limited"] == 2
+    assert server.stats.requests == 3
+
+
+def test_5xx_then_success_is_retried_async(server, monkeypatch):
+    fail_first(server, monkeypatch, failures=1, status=503)
+    limiter = RateLimiter(max_retries=3, base_delay=0.01)
+
+    async def main():
+        return await limiter.acreate(get_async_client(), model=MODEL,
+                                     messages=MESSAGES, temperature=0)
+
+    assert asyncio.run(main()).choices[0].message.content
+    assert limiter.stats()["retries"] == 1
+    assert limiter.stats()["rate_limited"] == 0
+    assert server.stats.requests == 2
+
+
+def test_gives_up_after_max_retries(server, monkeypatch):
+    import openai
+
+    fail_first(server, monkeypatch, failures=10, status=429)
+    limiter = RateLimiter(max_retries=2)
+    with pytest.raises(openai.RateLimitError):
+        limiter.create(get_client(), model=MODEL, messages=MESSAGES, temperature=0)
+    assert limiter.stats()["retries"] == 2
+    assert limiter.stats()["rate_limited"] == 2
+    assert server.stats.requests == 3
+
+
+def test_adopts_limits_from_response_headers(server):
+    limiter = RateLimiter()
+    limiter.create(get_client(), model=MODEL, messages=MESSAGES, temperature=0)
+    assert limiter.requests.per_minute == 100000
+    assert limiter.tokens.per_minute == 100000000
+
+    # Limite fixo menor que o da conta: vale o menor
+    capped = RateLimiter(rpm=600)
+    capped.create(get_client(), model=MODEL, messages=MESSAGES, temperature=0)
+    assert capped.requests.per_minute == 600
@@ -0,0 +1,35 @@
+from llm import router
+from llm.completion import complete
+from llm.mockserver import LatencySpec
+from llm.router import ModelRouter, choose_model
+
+from conftest import MODEL
+
+
+def test_disabled_by_default(server, monkeypatch):
+    monkeypatch.delenv("LLM_ROUTER")
+    assert choose_model("generate", MODEL) == MODEL
+    assert choose_model("classify", MODEL) == MODEL
+
+
+def test_slow_task_does_not_affect_other_tasks():
+    model_router = ModelRouter()
+    for _ in range(10):
+        model_router.observe("gpt-4.1-nano", 8.0, task="edit")
+
+    assert model_router.choose("edit", MODEL) == "gpt-4.1-mini"
+    assert model_router.choose("classify", MODEL) == "gpt-4.1-nano"
+
+
+def test_complete_records_history_per_task(server, monkeypatch):
+    monkeypatch.setenv("LLM_ROUTER", "1")
+    server.config.latency = LatencySpec.parse("fixed:0.05")
+    messages = [{"role": "user", "content": "Escreva 5 posts"}]
+
+    complete(messages, "gpt-4.1", 0, task="generate")
+    complete(messages, "gpt-4.1-nano", 0, max_tokens=1)
+
+    models = router.get_router().stats()["models"]
+    assert models["gpt-4.1 (generate)"]["samples"] == 1
+    assert models["gpt-4.1-nano (classify)"]["samples"] == 1
+    assert "gpt-4.1-nano (-)" not in models
@@ -0,0 +1,176 @@
+import io
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from llm import runner
+from llm.runner import select
+
+
+def fake_demo(name: str, delay: float = 0.0, lines: int = 3):
+    def demo():
+        for i in range(lines):
+            print(f"{name} linha {i}")
+            time.sleep(delay / lines)
+    demo.__name__ = name
+    return demo
+
+
+def fake_demo_output(name: str, lines: int = 3) -> str:
+    return "".join(f"{name} linha {i}\n" for i in range(lines))
+
+
+def fake_registry(delays: dict = None) -> dict:
+    delays = delays or {}
+    keys = [("demo", key) for key in ["1", "2", "3", "4", "5"]]
+    keys += [("desafio", key) for key in ["1", "2", "4a", "4b"]]
+    entries = {}
+    for kind, key in keys:
+        name = f"{kind}_{key}"
+        entries[f"{kind}:{key}"] = (name, fake_demo(name, delays.get(f"{kind}:{key}", 0.0)))
+    return entries
+
+
+# =============================================================================
+# SELEÇÃO
+# =============================================================================
+
+def test_select_groups_names_and_duplicates():
+    entries = fake_registry()
+    assert select(["desafios"], entries) == ["desafio:1", "desafio:2", "desafio:4a", "desafio:4b"]
+    assert select(["demo:3", "demo_1", "DEMO:3"], entries) == ["demo:3", "demo:1"]
+    assert select(["demo:2", "demos"], entries) == ["demo:2", "demo:1", "demo:3", "demo:4", "demo:5"]
+
+
+def test_select_ranges_follow_menu_order():
+    entries = fake_registry()
+    assert select(["demo:2-4"], entries) == ["demo:2", "demo:3", "demo:4"]
+    assert select(["desafio:2-4b", "demo:5-5"], entries) == [
+        "desafio:2", "desafio:4a", "desafio:4b", "demo:5",
+    ]
+
+
+@pytest.mark.parametrize("key", ["demo:9", "demo:4-9", "demo:4-2", "desafio:3", "nada"])
+def test_select_rejects_unknown_keys(key):
+    with pytest.raises(ValueError):
+        select([key], fake_registry())
+
+
+# =============================================================================
+# LINHA DE COMANDO
+# =============================================================================
+
+def run_main(monkeypatch, *argv) -> int:
+    monkeypatch.setattr(runner, "registry", fake_registry)
+    monkeypatch.setattr(sys, "argv", ["llm.runner", *argv])
+    return runner.main()
+
+
+def test_main_all_runs_every_entry(server, monkeypatch, capsys):
+    assert run_main(monkeypatch, "--all", "--json", "--parallel", "4") == 0
+    results = json.loads(capsys.readouterr().out)["results"]
+    assert [result["id"] for result in results] == list(fake_registry())
+    assert results[0]["output"] == fake_demo_output("demo_1")
+
+
+def test_main_unknown_id_is_a_usage_error(monkeypatch, capsys):
+    with pytest.raises(SystemExit) as exc:
+        run_main(monkeypatch, "demo:1", "demo:99")
+    assert exc.value.code == 2
+    assert "demo:99" in capsys.readouterr().err
+
+
+# =============================================================================
+# EXECUÇÃO PARALELA
+# =============================================================================
+
+def test_parallel_output_keeps_order_and_does_not_interleave(monkeypatch):
+    # As primeiras demoram mais: terminam depois das seguintes
+    delays = {"demo:1": 0.3, "demo:2": 0.2, "demo:3": 0.1}
+    monkeypatch.setattr(runner, "registry", lambda: fake_registry(delays))
+    stdout = sys.stdout
+    emitted = []
+
+    ids = ["demo:1", "demo:2", "demo:3", "demo:4", "demo:5"]
+    start = time.perf_counter()
+    results = runner.run(ids, parallel=3, emit=lambda result: emitted.append(result.id))
+
+    assert time.perf_counter() - start < 0.5
+    assert [result.id for result in results] == ids
+    assert emitted == ids
+    assert [result.output for result in results] == [fake_demo_output(result.name) for result in results]
+    assert sys.stdout is stdout
+
+
+# =============================================================================
+# PREFETCHER E THREADOUTPUT
+# =============================================================================
+
+def test_thread_output_isolates_each_thread():
+    stream = io.StringIO()
+    output = runner.ThreadOutput(stream)
+    captured = {}
+
+    def worker(name):
+        with output.capture() as buffer:
+            output.write(f"{name}\n")
+            time.sleep(0.05)
+        captured[name] = "".join(buffer)
+        output.write(f"{name} depois\n")
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ["a", "b"]]
+    for thread in threads:
+        thread.start()
+    output.write("principal\n")
+    for thread in threads:
+        thread.join()
+
+    assert captured == {"a": "a\n", "b": "b\n"}
+    assert sorted(stream.getvalue().splitlines()) == ["a depois", "b depois", "principal"]
+
+
+def test_prefetcher_cancel_stops_pending_work_and_restores_stdout(capsys):
+    started = []
+    blocked, release = threading.Event(), threading.Event()
+
+    def entry(name, block=False):
+        def demo():
+            started.append(name)
+            if block:
+                blocked.set()
+                release.wait(5)
+            print(f"saída de {name}")
+        return name, demo
+
+    entries = [entry("primeira"), entry("segunda", block=True), entry("terceira"), entry("quarta")]
+    stdout = sys.stdout
+    with runner.Prefetcher(entries, ahead=1) as demos:
+        for result in demos:
+            assert result.output == "saída de primeira\n"
+            # A segunda (adiantada) já está rodando; a terceira nem entrou na fila
+            assert blocked.wait(5)
+            break
+
+    # A segunda já rodava: termina em segundo plano, com a saída descartada,
+    # e só então o stdout original volta
+    assert isinstance(sys.stdout, runner.ThreadOutput)
+    release.set()
+    for _ in range(100):
+        if sys.stdout is stdout:
+            break
+        time.sleep(0.01)
+    assert sys.stdout is stdout
+    assert started == ["primeira", "segunda"]
+    assert "saída de segunda" not in capsys.readouterr().out
+
+
+def test_prefetcher_restores_stdout_when_nothing_is_running():
+    stdout = sys.stdout
+    entries = [(name, fake_demo(name)) for name in ["a", "b"]]
+    with runner.Prefetcher(entries, ahead=1) as demos:
+        outputs = [result.output for result in demos]
+    assert outputs == [fake_demo_output("a"), fake_demo_output("b")]
+    assert sys.stdout is stdout
@@ -0,0 +1,77 @@
+import subprocess
+import sys
+
+from llm.completion import complete
+from llm.semantic_cache import NearDuplicateCache, numbers, scope_key, shingles
+
+from conftest import MODEL
+
+SYSTEM = {"role": "system", "content": "Você é um tutor de Python."}
+
+
+def ask(question: str) -> list:
+    return [SYSTEM, {"role": "user", "content": question}]
+
+
+def test_paraphrase_hits():
+    cache = NearDuplicateCache(audit_path=None)
+    cache.set(MODEL, ask("Como faço para ler um arquivo CSV em Python usando pandas?"), 0, "resposta")
+    paraphrase = ask("Como eu faço pra ler arquivo CSV no Python usando o pandas")
+    assert cache.get(MODEL, paraphrase, 0) == "resposta"
+
+
+def test_reversed_direction_misses():
+    assert shingles("Converta 30 graus de Celsius para Fahrenheit") != \
+        shingles("Converta 30 graus de Fahrenheit para Celsius")
+    cache = NearDuplicateCache(audit_path=None)
+    cache.set(MODEL, ask("Converta 30 graus de Celsius para Fahrenheit"), 0, "86 °F")
+    assert cache.get(MODEL, ask("Converta 30 graus de Fahrenheit para Celsius"), 0) is None
+
+
+def test_negation_misses():
+    liked = "Eu gostei do filme que vi ontem no cinema com meus amigos e minha família"
+    disliked = "Eu não gostei do filme que vi ontem no cinema com meus amigos e minha família"
+    cache = NearDuplicateCache(threshold=0.5, audit_path=None)
+    cache.set(MODEL, ask(liked), 0, "Positivo")
+    assert cache.get(MODEL, ask(disliked), 0) is None
+    cache.set(MODEL, ask(disliked), 0, "Negativo")
+    shorter = ask("Eu não gostei do filme que vi ontem no cinema com meus amigos")
+    assert cache.get(MODEL, shorter, 0) == "Negativo"
+
+
+def test_different_numbers_never_match():
+    cache = NearDuplicateCache(threshold=0.0, audit_path=None)
+    cache.set(MODEL, ask("Quanto é 12 vezes 13?"), 0, "156")
+    assert cache.get(MODEL, ask("Quanto é 12 vezes 14?"), 0) is None
+    assert cache.get(MODEL, ask("Quanto é 13 vezes 12?"), 0) is None
+    assert cache.get(MODEL, ask("quanto e 12 vezes 13"), 0) == "156"
+
+
+def test_numbers_are_part_of_the_scope():
+    assert numbers("Some 1.234,5 com 7") == ["1.234,5", "7"]
+    assert scope_key(MODEL, ask("12 vezes 13")) != scope_key(MODEL, ask("12 vezes 14"))
+
+
+def test_different_word_misses():
+    cache = NearDuplicateCache(audit_path=None)
+    cache.set(MODEL, ask("O que é uma função em Python?"), 0, "resposta")
+    assert cache.get(MODEL, ask("O que é uma classe em Python?"), 0) is None
+
+
+def test_import_does_not_load_numpy():
+    code = "import sys, llm.semantic_cache; assert 'numpy' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_complete_serves_paraphrase_without_request(server, monkeypatch):
+    monkeypatch.setenv("LLM_SEMANTIC_CACHE", "1")
+    monkeypatch.setenv("LLM_SEMANTIC_CACHE_AUDIT", "")
+
+    first = complete(ask("Explique o que é uma função em Python"), MODEL, 0)
+    before = server.stats.requests
+    assert complete(ask("Explique: o que é a função no Python?"), MODEL, 0) == first
+    assert server.stats.requests == before
+
+    complete(ask("Quanto é 12 vezes 13?"), MODEL, 0)
+    complete(ask("Quanto é 12 vezes 14?"), MODEL, 0)
+    assert server.stats.requests == before + 2
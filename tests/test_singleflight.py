@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm import singleflight
+from llm.completion import acomplete, complete
+from llm.hedging import DeadlineExceeded
+from llm.mockserver import LatencySpec
+from llm.singleflight import SingleFlight
+
+from conftest import MODEL
+
+MESSAGES = [{"role": "user", "content": "Oi"}]
+
+
+def test_concurrent_threads_share_one_request(server):
+    server.config.latency = LatencySpec.parse("fixed:0.2")
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        answers = list(pool.map(lambda _: complete(MESSAGES, MODEL, 0), range(5)))
+
+    assert len(set(answers)) == 1
+    assert server.stats.requests == 1
+    assert singleflight._single_flight.stats()["saved"] == 4
+
+
+def test_temperature_above_zero_is_never_shared(server):
+    server.config.latency = LatencySpec.parse("fixed:0.1")
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(lambda _: complete(MESSAGES, MODEL, 0.7), range(3)))
+    assert server.stats.requests == 3
+
+
+def test_async_caller_joins_thread_flight(server):
+    server.config.latency = LatencySpec.parse("fixed:0.3")
+    leader = threading.Thread(target=complete, args=(MESSAGES, MODEL, 0))
+    leader.start()
+    time.sleep(0.1)
+    asyncio.run(acomplete(MESSAGES, MODEL, 0))
+    leader.join()
+
+    assert server.stats.requests == 1
+    assert singleflight._single_flight.stats()["saved"] == 1
+
+
+def test_thread_caller_joins_async_flight():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.2)
+        return "resposta"
+
+    def follower():
+        started.wait()
+        return flight.do("chave", lambda: "outra chamada")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        joined = pool.submit(follower)
+        assert asyncio.run(flight.ado("chave", slow)) == ("resposta", False)
+        assert joined.result() == ("resposta", True)
+    assert flight.stats() == {"calls": 1, "saved": 1, "saved_rate": 0.5}
+
+
+def test_caller_right_after_the_flight_finds_the_cache(server, monkeypatch, tmp_path):
+    """Quem chega logo depois de a chave sair da tabela já acha a resposta no cache."""
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    forget = SingleFlight._forget
+    late = []
+
+    def forget_then_call(self, key):
+        forget(self, key)
+        if not late:
+            late.append(complete(MESSAGES, MODEL, 0))
+
+    monkeypatch.setattr(SingleFlight, "_forget", forget_then_call)
+    first = complete(MESSAGES, MODEL, 0)
+
+    assert late == [first]
+    assert server.stats.requests == 1
+
+
+def test_follower_gives_up_at_its_own_deadline(server):
+    server.config.latency = LatencySpec.parse("fixed:1.0")
+    leader = threading.Thread(target=complete, args=(MESSAGES, MODEL, 0))
+    leader.start()
+    time.sleep(0.1)
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        complete(MESSAGES, MODEL, 0, deadline=0.2)
+    assert time.perf_counter() - start < 0.5
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(acomplete(MESSAGES, MODEL, 0, deadline=0.2))
+    leader.join()
+    assert server.stats.requests == 1
@@ -0,0 +1,66 @@
+from llm.completion import complete
+from llm.metrics import metrics
+from llm.mockserver import LatencySpec
+
+from conftest import MODEL
+
+MESSAGES = [{"role": "user", "content": "Conte uma história"}]
+
+
+def use_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+
+
+def ttft_count() -> int:
+    return sum(series["count"] for series in metrics.ttft.series.values())
+
+
+def slow_stream(server):
+    """Primeiro pedaço depois de 0.1 s; os demais a 100 tokens/s."""
+    server.config.latency = LatencySpec.parse("fixed:0.1")
+    server.config.tokens_per_second = 100
+    server.config.completion_tokens = 10
+
+
+def test_consumed_stream_records_timing_and_fills_the_cache(server, monkeypatch, tmp_path):
+    use_cache(monkeypatch, tmp_path)
+    slow_stream(server)
+
+    ttfts = ttft_count()
+    stream = complete(MESSAGES, MODEL, 0, stream=True)
+    pieces = list(stream)
+
+    assert stream.text == "".join(pieces) and stream.text
+    assert stream.timing.chunks == len(pieces)
+    assert 0.1 <= stream.timing.ttft < stream.timing.total
+    assert stream.timing.total >= 0.1 + 9 / 100
+    assert stream.usage.completion_tokens == 10
+    assert [source for (_, _, source) in metrics.calls] == ["api"]
+    assert ttft_count() == ttfts + 1
+
+    assert complete(MESSAGES, MODEL, 0) == stream.text
+    assert server.stats.requests == 1
+
+
+def test_partially_consumed_stream_is_not_cached(server, monkeypatch, tmp_path):
+    use_cache(monkeypatch, tmp_path)
+    slow_stream(server)
+
+    stream = complete(MESSAGES, MODEL, 0, stream=True)
+    for _ in stream:
+        break
+
+    assert stream.timing is None and stream.text == ""
+    complete(MESSAGES, MODEL, 0)
+    assert server.stats.requests == 2
+
+
+def test_cached_answer_streams_without_request(server, monkeypatch, tmp_path):
+    use_cache(monkeypatch, tmp_path)
+    answer = complete(MESSAGES, MODEL, 0)
+    stream = complete(MESSAGES, MODEL, 0, stream=True)
+
+    assert "".join(stream) == answer
+    assert stream.timing.chunks == 1
+    assert server.stats.requests == 1